@@ -0,0 +1,117 @@
+import json
+import random
+import re
+import sys
+import time
+from datetime import datetime
+
+from db_manager import _scan_order_lines, _scan_trade_lines, _json_loads
+
+# Order states as they appear in Orders.log; most lines are status updates
+ORDER_STATES = ['NEW', 'OPEN', 'PARTIALLY_FILLED', 'FILLED', 'FILLED', 'CANCELED', 'CANCELED']
+STRATEGIES = ['MM_LONG_BTC', 'MM_SHORT_BTC', 'GRID_LONG_ETH', 'GRID_SHORT_SOL']
+
+def generate_corpus(num_lines: int, seed: int = 7):
+    """Generate synthetic (orders_lines, trades_lines) in the exchange log format."""
+    rng = random.Random(seed)
+    orders_lines = []
+    trades_lines = []
+    for i in range(num_lines):
+        strategy_id = rng.choice(STRATEGIES)
+        client_order_id = f"{strategy_id}{1718693033751 + i:011d}"[-(len(strategy_id) + 11):]
+        create_at = 1718693033751 + i * 250
+        order = {
+            'type': 'order',
+            'data': {
+                'orderId': f"ord-{i // 3}",
+                'clientOrderId': client_order_id,
+                'orderState': rng.choice(ORDER_STATES),
+                'sym': 'BINANCE_PERP_BTC_USDT',
+                'side': rng.choice(['BUY', 'SELL']),
+                'limitPrice': f"{rng.uniform(60000, 70000):.1f}",
+                'orderQty': f"{rng.uniform(0.001, 0.05):.3f}",
+                'createAt': create_at
+            }
+        }
+        trade = {
+            'type': 'trade',
+            'data': {
+                'transactionId': f"tx-{i}",
+                'clientOrderId': client_order_id,
+                'sym': 'BINANCE_PERP_BTC_USDT',
+                'side': rng.choice(['BUY', 'SELL']),
+                'price': f"{rng.uniform(60000, 70000):.1f}",
+                'quantity': f"{rng.uniform(0.001, 0.05):.3f}",
+                'createAt': create_at
+            }
+        }
+        orders_lines.append(f"[2024-06-18 06:23:53.751] [info] Received data: {json.dumps(order)}\n")
+        trades_lines.append(f"[2024-06-18 06:23:53.751] [info] Received data: {json.dumps(trade)}\n")
+    return orders_lines, trades_lines
+
+def baseline_orders(lines):
+    """The original Orders.log loop: regex search and full json.loads on every line."""
+    processed_orders = set()
+    orders = []
+    for line in lines:
+        match = re.search(r'Received data: (\{.*\})', line)
+        if match:
+            data = json.loads(match.group(1)).get('data', {})
+            order_id = data.get('orderId', '')
+            if order_id in processed_orders or data.get('orderState', '') not in ['NEW', 'OPEN']:
+                continue
+            processed_orders.add(order_id)
+            client_order_id = data.get('clientOrderId', '')
+            strategy_id = client_order_id[:-11] if len(client_order_id) > 11 else ''
+            orders.append((order_id, datetime.fromtimestamp(int(data.get('createAt')) / 1000), strategy_id,
+                           float(data.get('limitPrice', 0)), float(data.get('orderQty', 0)),
+                           data.get('side', '').lower(), data.get('sym', '')))
+    return len(orders)
+
+def baseline_trades(lines):
+    """The original Trades.log loop: regex search and full json.loads on every line."""
+    trades = []
+    for line in lines:
+        match = re.search(r'Received data: (\{.*\})', line)
+        if match:
+            data = json.loads(match.group(1)).get('data', {})
+            client_order_id = data.get('clientOrderId', '')
+            strategy_id = client_order_id[:-11] if len(client_order_id) > 11 else ''
+            price = float(data.get('price', 0))
+            qty = float(data.get('quantity', 0))
+            trades.append((data.get('transactionId', ''), datetime.fromtimestamp(int(data.get('createAt')) / 1000),
+                           strategy_id, price, qty, data.get('side', '').lower(), data.get('sym', ''), price * qty))
+    return len(trades)
+
+def fast_orders(lines):
+    return sum(1 for _ in _scan_order_lines(lines, set()))
+
+def fast_trades(lines):
+    return sum(1 for _ in _scan_trade_lines(lines, {}))
+
+def measure(name, func, lines, repeat=3):
+    """Run func over lines and report the best lines/sec over repeat runs."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(lines)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    rate = len(lines) / best
+    print(f"{name:<32} {rate:>14,.0f} lines/sec")
+    return rate
+
+if __name__ == "__main__":
+    num_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    orders_lines, trades_lines = generate_corpus(num_lines)
+    print(f"Synthetic corpus: {num_lines} order lines, {num_lines} trade lines")
+    print(f"JSON backend: {_json_loads.__module__}")
+    print()
+
+    before = measure("Orders.log regex + json.loads", baseline_orders, orders_lines)
+    after = measure("Orders.log fast-path decoder", fast_orders, orders_lines)
+    print(f"{'speedup':<32} {after / before:>14.2f}x")
+    print()
+    before = measure("Trades.log regex + json.loads", baseline_trades, trades_lines)
+    after = measure("Trades.log fast-path decoder", fast_trades, trades_lines)
+    print(f"{'speedup':<32} {after / before:>14.2f}x")
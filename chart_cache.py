@@ -0,0 +1,104 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+class ChartCache:
+    """
+    Thread-safe LRU cache for rendered charts, validated by a data watermark.
+
+    Each entry is stored under a chart key together with the watermark that
+    was current when it was rendered. A lookup only hits when the caller's
+    watermark matches and the entry is younger than the TTL ceiling, so new
+    rows invalidate a chart on the next request while idle data is still
+    re-rendered every ttl seconds.
+    """
+
+    def __init__(self, max_entries: int = 64, ttl: float = 300.0):
+        """
+        Initialize the chart cache
+
+        Args:
+            max_entries: Maximum number of charts kept before evicting the least recently used
+            ttl: Maximum age of an entry in seconds, regardless of the watermark
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, watermark):
+        """
+        Look up a chart rendered at the given watermark
+
+        Args:
+            key: Chart key (function name and arguments)
+            watermark: Current data watermark for the chart
+
+        Returns:
+            Tuple of (hit, value)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_watermark, value, created_at = entry
+                if stored_watermark == watermark and time.monotonic() - created_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                # Stale: the data moved on or the entry outlived its TTL
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, watermark, value):
+        """
+        Store a chart rendered at the given watermark, evicting the LRU entry if full
+
+        Args:
+            key: Chart key (function name and arguments)
+            watermark: Data watermark the chart was rendered from
+            value: Rendered chart
+        """
+        with self._lock:
+            self._entries[key] = (watermark, value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached chart"""
+        with self._lock:
+            self._entries.clear()
+
+def cached_chart(cache: ChartCache, watermark):
+    """
+    Decorate a chart generator so it is only re-run when its data changes.
+
+    The wrapped function must take a DatabaseManager as its first argument.
+    watermark(db_manager, *args) is called first with the same arguments and
+    should be a cheap query (e.g. MAX(time) and COUNT(*)); on a hit neither
+    the chart's SQL nor its rendering runs. None results are not cached so
+    an empty table or a failed render is retried on the next request.
+
+    Args:
+        cache: ChartCache instance to store results in
+        watermark: Function returning a hashable watermark for the chart's data
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(db_manager, *args):
+            key = (func.__name__,) + args
+            mark = watermark(db_manager, *args)
+            hit, value = cache.get(key, mark)
+            if hit:
+                return value
+
+            value = func(db_manager, *args)
+            if value is not None:
+                cache.put(key, mark, value)
+            return value
+        return wrapper
+    return decorator
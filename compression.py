@@ -0,0 +1,129 @@
+import zlib
+from typing import Iterable, Iterator, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Only text bodies are worth compressing; PNGs are already compressed and
+# event streams must reach the client unbuffered
+COMPRESSIBLE_MIMETYPES = {'text/html', 'text/plain', 'text/css', 'application/json', 'application/javascript'}
+MIN_COMPRESS_SIZE = 1024
+STREAM_FLUSH_SIZE = 16 * 1024
+
+def choose_encoding(accept_encodings) -> Optional[str]:
+    """
+    Pick the best content coding the client accepts
+
+    Args:
+        accept_encodings: The request's parsed Accept-Encoding header (request.accept_encodings)
+
+    Returns:
+        'br', 'gzip', or None to send the body uncompressed
+    """
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return accept_encodings.best_match(offered)
+
+def _compressor(encoding: str):
+    """Return (compress, flush, finish) callables for an incremental compressor"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=5)
+        return compressor.process, compressor.flush, compressor.finish
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return (compressor.compress,
+            lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+            compressor.flush)
+
+def buffer_chunks(chunks: Iterable, size: int = STREAM_FLUSH_SIZE) -> Iterator[bytes]:
+    """
+    Coalesce many small chunks (e.g. from a streamed template) into writes of about size bytes
+
+    Args:
+        chunks: Iterable of str or bytes
+        size: Number of bytes to collect before yielding
+
+    Yields:
+        Byte strings of at least size bytes, except possibly the last
+    """
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield b''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield b''.join(buffer)
+
+def compress_chunks(chunks: Iterable, encoding: str, size: int = STREAM_FLUSH_SIZE) -> Iterator[bytes]:
+    """
+    Compress a streamed body incrementally
+
+    Each buffered chunk is followed by a sync flush so the client can decode and
+    render what it has so far instead of waiting for the end of the stream.
+
+    Args:
+        chunks: Iterable of str or bytes
+        encoding: 'br' or 'gzip'
+        size: Number of uncompressed bytes collected before each flush
+
+    Yields:
+        Compressed byte strings
+    """
+    compress, flush, finish = _compressor(encoding)
+    try:
+        for chunk in buffer_chunks(chunks, size):
+            data = compress(chunk) + flush()
+            if data:
+                yield data
+        yield finish()
+    finally:
+        # Closes the wrapped generator (and anything it holds open) when the client disconnects
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+def compress_response(response, accept_encodings):
+    """
+    Compress a Flask response for the client, streamed or not
+
+    Responses that are not 200, not text, already encoded, served as files, or too
+    small to benefit are returned unchanged. Vary: Accept-Encoding is always set on
+    compressible responses so shared caches keep the encodings apart.
+
+    Args:
+        response: The response from the view
+        accept_encodings: The request's parsed Accept-Encoding header
+
+    Returns:
+        The response, compressed in place when worthwhile
+    """
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_chunks(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return response
+        compress, _, finish = _compressor(encoding)
+        response.set_data(compress(data) + finish())
+
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -1,13 +1,89 @@
 import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2.extras import execute_values
+from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Iterator, Iterable, Callable
+from concurrent.futures import ProcessPoolExecutor
+import io
 import json
-import re
+import os
+import queue
+import threading
+import time as time_module
+import uuid
 from datetime import timedelta
 
+import numpy as np
+
+import pnl_engine
+from metrics import timed
+
+# Default ingest sources produced by the trading system
+ORDERS_LOG_PATH = "../Maker-Trade-System/build/logs_temp/Orders.log"
+TRADES_LOG_PATH = "../Maker-Trade-System/build/logs_temp/Trades.log"
+DEFAULT_PORTFOLIO_ID = 1718693033751000
+
+# Marker that precedes the JSON record in exchange log lines
+RECEIVED_DATA_MARKER = 'Received data: '
+
+# Prefer orjson for decoding log records when it is installed; its JSONDecodeError
+# subclasses json.JSONDecodeError, so error handling is unchanged
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Tables supported by the COPY bulk path: (columns in tuple order, conflict key)
+BULK_TABLES = {
+    'Trade': (['trade_id', 'time', 'strategy_id', 'price', 'qty', 'side', 'symbol', 'volume'], ['trade_id']),
+    'Trade_Order': (['order_id', 'time', 'strategy_id', 'price', 'qty', 'side', 'symbol'], ['order_id']),
+    'Log': (['log_id', 'time', 'message', 'portfolio_id'], ['log_id']),
+    'Portfolio_Snapshot': (['portfolio_id', 'time', 'fund', 'leverage', 'position', 'order_value'],
+                           ['portfolio_id', 'time']),
+}
+
+# Multi-row statements used by batch() for the single-row insert helpers, in foreign key order
+BATCH_STATEMENTS = {
+    'System': "INSERT INTO System (portfolio_id) VALUES %s ON CONFLICT (portfolio_id) DO NOTHING",
+    'Portfolio': "INSERT INTO Portfolio (portfolio_id, name) VALUES %s ON CONFLICT (portfolio_id) DO NOTHING",
+    'Strategy': """INSERT INTO Strategy (strategy_id, direction, symbol, portfolio_id) VALUES %s 
+                ON CONFLICT (strategy_id) DO NOTHING""",
+    'Trade_Order': """INSERT INTO Trade_Order (order_id, time, strategy_id, price, qty, side, symbol) VALUES %s 
+                   ON CONFLICT (order_id) DO NOTHING""",
+    'Log': "INSERT INTO Log (log_id, time, message, portfolio_id) VALUES %s ON CONFLICT (log_id) DO NOTHING",
+    'Portfolio_Snapshot': """INSERT INTO Portfolio_Snapshot (portfolio_id, time, fund, leverage, position, order_value) 
+                          VALUES %s ON CONFLICT (portfolio_id, time) DO NOTHING""",
+    'Trade': """INSERT INTO Trade (trade_id, time, strategy_id, price, qty, side, symbol, volume) VALUES %s 
+             ON CONFLICT (trade_id) DO NOTHING""",
+}
+
+def _copy_value(value: Any) -> str:
+    """Format a single value for COPY's text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
 class DatabaseManager:
-    def __init__(self, host: str, database: str, user: str, password: str, port: int = 5432):
-        """Initialize database connection parameters."""
+    def __init__(self, host: str, database: str, user: str, password: str, port: int = 5432,
+                 pool_min: int = 1, pool_max: Optional[int] = None, checkout_timeout: float = 30.0,
+                 bulk_threshold: int = 1000):
+        """
+        Initialize database connection parameters.
+        
+        Batch inserts of bulk_threshold rows or more are loaded through COPY
+        (see bulk_load) instead of executemany.
+        
+        Passing pool_max enables pooled mode: connections are opened lazily into a
+        thread-safe pool of pool_min..pool_max connections and handed out per
+        request through checkout(), waiting up to checkout_timeout seconds when
+        every connection is in use.
+        """
         self.db_params = {
             'host': host,
             'database': database,
@@ -17,6 +93,22 @@ class DatabaseManager:
         }
         self.conn = None
         self.cursor = None
+        self.pool_min = pool_min
+        self.pool_max = pool_max
+        self.checkout_timeout = checkout_timeout
+        self.bulk_threshold = bulk_threshold
+        self._pool = None
+        self._pool_slots = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+        self._batch_rows = None
+        self._batch_size = 0
+        self._batch_uncommitted = 0
+        self._batch_flush_every = 0
+        self._batch_commit_every = None
+        self._write_queue = None
+        self._write_thread = None
+        self._write_errors = []
     
     def connect(self) -> None:
         """Establish connection to the database."""
@@ -29,12 +121,236 @@ class DatabaseManager:
             raise
     
     def disconnect(self) -> None:
-        """Close database connection."""
+        """Close database connection (and the connection pool, if one is open)."""
+        self.disable_write_behind()
         if self.cursor:
             self.cursor.close()
         if self.conn:
             self.conn.close()
             print("Database connection closed.")
+        self.close_pool()
+    
+    # Write-behind buffering
+    def enable_write_behind(self, flush_size: int = 1000, flush_interval: float = 1.0, max_queue: int = 10000,
+                            on_error: Optional[Callable[[str, List[Tuple], Exception], None]] = None) -> None:
+        """
+        Buffer insert_trade and insert_log calls and write them from a background thread.
+        
+        The calls only enqueue their row. A writer thread with its own connection
+        flushes the queued rows through bulk_load whenever flush_size rows are queued
+        or flush_interval seconds have passed. When max_queue rows are waiting, the
+        callers block until the writer catches up. Failed flushes are reported to
+        on_error(table_name, rows, exception). disconnect() drains the queue. If the
+        writer thread dies, the next insert (or disable_write_behind) raises its error
+        instead of blocking on a queue nobody drains.
+        
+        Args:
+            flush_size: Number of queued rows that triggers a flush
+            flush_interval: Maximum seconds a row waits before being flushed
+            max_queue: Queue capacity before producers block
+            on_error: Callback for rows that could not be written
+        """
+        if self._write_thread is not None:
+            return
+        writer = DatabaseManager(**self.db_params, bulk_threshold=self.bulk_threshold)
+        writer.connect()
+        self._write_queue = queue.Queue(maxsize=max_queue)
+        self._write_errors = []
+        self._write_thread = threading.Thread(
+            target=self._write_behind_loop,
+            args=(writer, self._write_queue, flush_size, flush_interval, on_error, self._write_errors),
+            name="db-write-behind",
+            daemon=True
+        )
+        self._write_thread.start()
+        print(f"Write-behind buffer enabled (flush every {flush_size} rows or {flush_interval}s)")
+    
+    def disable_write_behind(self) -> None:
+        """Flush every queued row and stop the write-behind thread."""
+        if self._write_thread is None:
+            return
+        try:
+            if self._write_thread.is_alive():
+                self._put_write(None)  # Stop marker, queued after every pending row
+                self._write_thread.join()
+        finally:
+            self._write_thread = None
+            self._write_queue = None
+        if self._write_errors:
+            raise RuntimeError("Write-behind thread failed; queued rows were lost") from self._write_errors[0]
+        print("Write-behind buffer drained.")
+    
+    def _put_write(self, item) -> None:
+        """Put an item on the write-behind queue, raising instead of blocking forever if the writer died."""
+        while True:
+            if not self._write_thread.is_alive():
+                cause = self._write_errors[0] if self._write_errors else None
+                raise RuntimeError("Write-behind thread is not running") from cause
+            try:
+                self._write_queue.put(item, timeout=1.0)
+                return
+            except queue.Full:
+                continue
+    
+    def _enqueue_write(self, table_name: str, row: Tuple) -> bool:
+        """Queue a row for the write-behind thread if it is running; returns False otherwise."""
+        if self._write_queue is None:
+            return False
+        self._put_write((table_name, row))
+        return True
+    
+    @staticmethod
+    def _write_behind_loop(writer: 'DatabaseManager', write_queue: queue.Queue, flush_size: int,
+                           flush_interval: float, on_error: Optional[Callable], errors: List[BaseException]) -> None:
+        """Background thread: collect queued rows and bulk load them by size or time; fatal errors go to errors."""
+        try:
+            DatabaseManager._write_behind_batches(writer, write_queue, flush_size, flush_interval, on_error)
+        except BaseException as e:
+            print(f"Write-behind thread failed: {e}")
+            errors.append(e)
+        finally:
+            writer.disconnect()
+    
+    @staticmethod
+    def _write_behind_batches(writer: 'DatabaseManager', write_queue: queue.Queue, flush_size: int,
+                              flush_interval: float, on_error: Optional[Callable]) -> None:
+        """Collect queued rows and bulk load them until the stop marker arrives."""
+        pending = {}
+        pending_count = 0
+        deadline = time_module.monotonic() + flush_interval
+        stopping = False
+        
+        while not stopping:
+            try:
+                item = write_queue.get(timeout=max(0.0, deadline - time_module.monotonic()))
+            except queue.Empty:
+                item = ()
+            if item is None:
+                stopping = True
+            elif item:
+                table_name, row = item
+                pending.setdefault(table_name, []).append(row)
+                pending_count += 1
+            
+            if stopping or pending_count >= flush_size or time_module.monotonic() >= deadline:
+                for table_name, rows in pending.items():
+                    try:
+                        writer.bulk_load(table_name, rows)
+                    except Exception as e:
+                        if on_error:
+                            try:
+                                on_error(table_name, rows, e)
+                            except Exception as callback_error:
+                                print(f"Write-behind on_error callback failed: {callback_error}")
+                        else:
+                            print(f"Write-behind flush of {len(rows)} {table_name} records failed: {e}")
+                pending = {}
+                pending_count = 0
+                deadline = time_module.monotonic() + flush_interval
+    
+    # Connection pool functions
+    def _get_pool(self) -> pg_pool.ThreadedConnectionPool:
+        """Return the connection pool, creating it on first use."""
+        if self._pool_pid is not None and self._pool_pid != os.getpid():
+            # Forked after the pool was opened: those sockets belong to the parent
+            self.reset_after_fork()
+        with self._pool_lock:
+            if self._pool is None:
+                if not self.pool_max:
+                    raise RuntimeError("Connection pooling is disabled; pass pool_max to DatabaseManager")
+                self._pool = pg_pool.ThreadedConnectionPool(self.pool_min, self.pool_max, **self.db_params)
+                self._pool_slots = threading.BoundedSemaphore(self.pool_max)
+                self._pool_pid = os.getpid()
+                print(f"Connection pool created ({self.pool_min}-{self.pool_max} connections)")
+            return self._pool
+    
+    def reset_after_fork(self) -> None:
+        """
+        Forget the pool inherited from a parent process; call in a forked child.
+        
+        The inherited connections are dropped without closing them, since closing
+        would end the parent's sessions on the server. The child opens its own
+        pool on its next checkout.
+        """
+        self._pool_lock = threading.Lock()
+        self._pool = None
+        self._pool_slots = None
+        self._pool_pid = None
+    
+    def close_pool(self) -> None:
+        """Close every connection held by the pool."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._pool_slots = None
+                self._pool_pid = None
+                print("Connection pool closed.")
+    
+    @staticmethod
+    def _is_healthy(conn) -> bool:
+        """Check that a pooled connection is still usable."""
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    @contextmanager
+    def checkout(self) -> Iterator['DatabaseManager']:
+        """
+        Check out a pooled connection for the duration of a with-block.
+        
+        Yields a DatabaseManager bound to its own connection and cursor, so every
+        helper that takes a db_manager works unchanged and concurrent requests
+        never share a cursor. The connection is health-checked on checkout and
+        rolled back before it is returned to the pool.
+        
+        Usage:
+            with db_manager.checkout() as db:
+                db.cursor.execute(...)
+        """
+        pool = self._get_pool()
+        slots = self._pool_slots
+        # Time spent waiting for a free connection shows up as the 'pool_checkout' query
+        with timed('pool_checkout'):
+            acquired = slots.acquire(timeout=self.checkout_timeout)
+        if not acquired:
+            raise pg_pool.PoolError(f"Timed out after {self.checkout_timeout}s waiting for a database connection")
+        
+        conn = None
+        try:
+            # Replace connections that died while idle (server restart, idle timeout)
+            for _ in range(self.pool_max + 1):
+                conn = pool.getconn()
+                if self._is_healthy(conn):
+                    break
+                pool.putconn(conn, close=True)
+                conn = None
+            if conn is None:
+                raise pg_pool.PoolError("Could not obtain a healthy database connection")
+            
+            lease = DatabaseManager(**self.db_params, bulk_threshold=self.bulk_threshold)
+            lease.conn = conn
+            lease.cursor = conn.cursor()
+            try:
+                yield lease
+            finally:
+                if not lease.cursor.closed:
+                    lease.cursor.close()
+                try:
+                    if not conn.closed:
+                        conn.rollback()
+                except psycopg2.Error:
+                    conn.close()
+        finally:
+            if conn is not None:
+                pool.putconn(conn, close=bool(conn.closed))
+            slots.release()
     
     def commit(self) -> None:
         """Commit the current transaction."""
@@ -46,9 +362,88 @@ class DatabaseManager:
         if self.conn:
             self.conn.rollback()
     
+    # Unit-of-work batching
+    @contextmanager
+    def batch(self, commit_every: Optional[int] = None, flush_every: int = 1000) -> Iterator['DatabaseManager']:
+        """
+        Group single-row inserts into multi-row statements inside a with-block.
+        
+        While the block is active insert_system, insert_portfolio, insert_strategy,
+        insert_order, insert_log, insert_portfolio_snapshot and insert_trade buffer
+        their row instead of executing and committing it. Buffered rows are written
+        with one INSERT per table (in foreign key order) every flush_every rows, and
+        committed once at block exit, so a block that raises is rolled back entirely.
+        
+        Passing commit_every opts in to chunked commits instead: rows are committed
+        once every commit_every rows, and a failure only rolls back the rows since
+        the last commit.
+        
+        Usage:
+            with db_manager.batch():
+                for strategy_id, info in strategies.items():
+                    db_manager.insert_strategy(strategy_id, ...)
+        """
+        if self._batch_rows is not None:
+            # Nested batch: join the enclosing unit of work
+            yield self
+            return
+        
+        self._batch_rows = {}
+        self._batch_size = 0
+        self._batch_uncommitted = 0
+        self._batch_flush_every = flush_every
+        self._batch_commit_every = commit_every
+        try:
+            yield self
+            self._flush_batch()
+            self._commit_batch()
+        except Exception as e:
+            print(f"Error in batched unit of work, rolling back: {e}")
+            self.conn.rollback()
+            raise
+        finally:
+            self._batch_rows = None
+            self._batch_size = 0
+            self._batch_uncommitted = 0
+    
+    def _buffer_row(self, table_name: str, row: Tuple) -> bool:
+        """Buffer a single-row insert if a batch is active; returns False otherwise."""
+        if self._batch_rows is None:
+            return False
+        self._batch_rows.setdefault(table_name, []).append(row)
+        self._batch_size += 1
+        if self._batch_size >= self._batch_flush_every:
+            self._flush_batch()
+        if self._batch_commit_every and self._batch_uncommitted + self._batch_size >= self._batch_commit_every:
+            self._flush_batch()
+            self._commit_batch()
+        return True
+    
+    def _flush_batch(self) -> None:
+        """Write the buffered rows with one multi-row INSERT per table, without committing."""
+        if not self._batch_size:
+            return
+        for table_name, statement in BATCH_STATEMENTS.items():
+            rows = self._batch_rows.pop(table_name, None)
+            if rows:
+                execute_values(self.cursor, statement, rows, page_size=len(rows))
+        self._batch_uncommitted += self._batch_size
+        self._batch_size = 0
+    
+    def _commit_batch(self) -> None:
+        """Commit the rows written by _flush_batch."""
+        if not self._batch_uncommitted:
+            return
+        self.conn.commit()
+        print(f"{self._batch_uncommitted} batched records committed successfully.")
+        self._batch_uncommitted = 0
+    
     # System table functions
     def insert_system(self, portfolio_id: int) -> None:
         """Insert a record into the System table, ignoring duplicates."""
+        if self._buffer_row('System', (portfolio_id,)):
+            return
+        
         try:
             self.cursor.execute(
                 "INSERT INTO System (portfolio_id) VALUES (%s) ON CONFLICT (portfolio_id) DO NOTHING",
@@ -64,6 +459,9 @@ class DatabaseManager:
     # Portfolio table functions
     def insert_portfolio(self, portfolio_id: int, name: str) -> None:
         """Insert a record into the Portfolio table, ignoring duplicates."""
+        if self._buffer_row('Portfolio', (portfolio_id, name)):
+            return
+        
         try:
             self.cursor.execute(
                 "INSERT INTO Portfolio (portfolio_id, name) VALUES (%s, %s) ON CONFLICT (portfolio_id) DO NOTHING",
@@ -93,6 +491,9 @@ class DatabaseManager:
     # Strategy table functions
     def insert_strategy(self, strategy_id: str, direction: str, symbol: str, portfolio_id: int) -> None:
         """Insert a record into the Strategy table, ignoring duplicates."""
+        if self._buffer_row('Strategy', (strategy_id, direction, symbol, portfolio_id)):
+            return
+        
         try:
             self.cursor.execute(
                 "INSERT INTO Strategy (strategy_id, direction, symbol, portfolio_id) VALUES (%s, %s, %s, %s) ON CONFLICT (strategy_id) DO NOTHING",
@@ -123,6 +524,9 @@ class DatabaseManager:
     def insert_order(self, order_id: str, time: datetime, strategy_id: str, 
                     price: float, qty: float, side: str, symbol: str) -> None:
         """Insert a record into the Order table, ignoring duplicates."""
+        if self._buffer_row('Trade_Order', (order_id, time, strategy_id, price, qty, side, symbol)):
+            return
+        
         try:
             self.cursor.execute(
                 """INSERT INTO Trade_Order (order_id, time, strategy_id, price, qty, side, symbol) 
@@ -136,16 +540,26 @@ class DatabaseManager:
             self.conn.rollback()
             raise
     
-    def insert_orders(self, orders: List[Tuple[str, datetime, str, float, float, str, str]]) -> None:
-        """Batch insert multiple records into the Order table, ignoring duplicates."""
+    def insert_orders(self, orders: List[Tuple[str, datetime, str, float, float, str, str]]) -> Tuple[int, int]:
+        """
+        Batch insert multiple records into the Order table, ignoring duplicates.
+        
+        Batches of bulk_threshold rows or more go through the COPY bulk path.
+        Returns a tuple of (inserted, skipped) row counts.
+        """
+        if len(orders) >= self.bulk_threshold:
+            return self.bulk_load('Trade_Order', orders)
+        
         try:
             self.cursor.executemany(
                 """INSERT INTO Trade_Order (order_id, time, strategy_id, price, qty, side, symbol) 
                 VALUES (%s, %s, %s, %s, %s, %s, %s) ON CONFLICT (order_id) DO NOTHING""",
                 orders
             )
+            inserted = self.cursor.rowcount
             self.conn.commit()
-            print(f"{len(orders)} order records processed successfully.")
+            print(f"{len(orders)} order records processed successfully ({inserted} inserted).")
+            return inserted, len(orders) - inserted
         except Exception as e:
             print(f"Error batch inserting Order records: {e}")
             self.conn.rollback()
@@ -154,6 +568,11 @@ class DatabaseManager:
     # Log table functions
     def insert_log(self, log_id: int, time: datetime, message: str, portfolio_id: int) -> None:
         """Insert a record into the Log table, ignoring duplicates."""
+        if self._buffer_row('Log', (log_id, time, message, portfolio_id)):
+            return
+        if self._enqueue_write('Log', (log_id, time, message, portfolio_id)):
+            return
+        
         try:
             self.cursor.execute(
                 "INSERT INTO Log (log_id, time, message, portfolio_id) VALUES (%s, %s, %s, %s) ON CONFLICT (log_id) DO NOTHING",
@@ -166,15 +585,25 @@ class DatabaseManager:
             self.conn.rollback()
             raise
     
-    def insert_logs(self, logs: List[Tuple[int, datetime, str, int]]) -> None:
-        """Batch insert multiple records into the Log table, ignoring duplicates."""
+    def insert_logs(self, logs: List[Tuple[int, datetime, str, int]]) -> Tuple[int, int]:
+        """
+        Batch insert multiple records into the Log table, ignoring duplicates.
+        
+        Batches of bulk_threshold rows or more go through the COPY bulk path.
+        Returns a tuple of (inserted, skipped) row counts.
+        """
+        if len(logs) >= self.bulk_threshold:
+            return self.bulk_load('Log', logs)
+        
         try:
             self.cursor.executemany(
                 "INSERT INTO Log (log_id, time, message, portfolio_id) VALUES (%s, %s, %s, %s) ON CONFLICT (log_id) DO NOTHING",
                 logs
             )
+            inserted = self.cursor.rowcount
             self.conn.commit()
-            print(f"{len(logs)} log records processed successfully.")
+            print(f"{len(logs)} log records processed successfully ({inserted} inserted).")
+            return inserted, len(logs) - inserted
         except Exception as e:
             print(f"Error batch inserting Log records: {e}")
             self.conn.rollback()
@@ -184,6 +613,9 @@ class DatabaseManager:
     def insert_portfolio_snapshot(self, portfolio_id: float, time: datetime, fund: float, 
                                 leverage: float, position: float, order_value: float) -> None:
         """Insert a record into the Portfolio_Snapshot table, ignoring duplicates."""
+        if self._buffer_row('Portfolio_Snapshot', (portfolio_id, time, fund, leverage, position, order_value)):
+            return
+        
         try:
             self.cursor.execute(
                 """INSERT INTO Portfolio_Snapshot 
@@ -198,8 +630,16 @@ class DatabaseManager:
             self.conn.rollback()
             raise
     
-    def insert_portfolio_snapshots(self, snapshots: List[Tuple[float, datetime, float, float, float, float]]) -> None:
-        """Batch insert multiple records into the Portfolio_Snapshot table, ignoring duplicates."""
+    def insert_portfolio_snapshots(self, snapshots: List[Tuple[float, datetime, float, float, float, float]]) -> Tuple[int, int]:
+        """
+        Batch insert multiple records into the Portfolio_Snapshot table, ignoring duplicates.
+        
+        Batches of bulk_threshold rows or more go through the COPY bulk path.
+        Returns a tuple of (inserted, skipped) row counts.
+        """
+        if len(snapshots) >= self.bulk_threshold:
+            return self.bulk_load('Portfolio_Snapshot', snapshots)
+        
         try:
             self.cursor.executemany(
                 """INSERT INTO Portfolio_Snapshot 
@@ -207,8 +647,10 @@ class DatabaseManager:
                 VALUES (%s, %s, %s, %s, %s, %s) ON CONFLICT (portfolio_id, time) DO NOTHING""",
                 snapshots
             )
+            inserted = self.cursor.rowcount
             self.conn.commit()
-            print(f"{len(snapshots)} portfolio snapshot records processed successfully.")
+            print(f"{len(snapshots)} portfolio snapshot records processed successfully ({inserted} inserted).")
+            return inserted, len(snapshots) - inserted
         except Exception as e:
             print(f"Error batch inserting Portfolio_Snapshot records: {e}")
             self.conn.rollback()
@@ -218,6 +660,11 @@ class DatabaseManager:
     def insert_trade(self, trade_id: str, time: datetime, strategy_id: str, 
                     price: float, qty: float, side: str, symbol: str, volume: float) -> None:
         """Insert a record into the Trade table."""
+        if self._buffer_row('Trade', (trade_id, time, strategy_id, price, qty, side, symbol, volume)):
+            return
+        if self._enqueue_write('Trade', (trade_id, time, strategy_id, price, qty, side, symbol, volume)):
+            return
+        
         try:
             self.cursor.execute(
                 """INSERT INTO Trade 
@@ -231,8 +678,16 @@ class DatabaseManager:
             print(f"Error inserting Trade record: {e}")
             raise
     
-    def insert_trades(self, trades: List[Tuple[str, datetime, str, float, float, str, str, float]]) -> None:
-        """Batch insert multiple records into the Trade table, ignoring duplicates."""
+    def insert_trades(self, trades: List[Tuple[str, datetime, str, float, float, str, str, float]]) -> Tuple[int, int]:
+        """
+        Batch insert multiple records into the Trade table, ignoring duplicates.
+        
+        Batches of bulk_threshold rows or more go through the COPY bulk path.
+        Returns a tuple of (inserted, skipped) row counts.
+        """
+        if len(trades) >= self.bulk_threshold:
+            return self.bulk_load('Trade', trades)
+        
         try:
             self.cursor.executemany(
                 """INSERT INTO Trade 
@@ -241,13 +696,65 @@ class DatabaseManager:
                 ON CONFLICT (trade_id) DO NOTHING""",
                 trades
             )
+            inserted = self.cursor.rowcount
             self.conn.commit()
-            print(f"{len(trades)} trade records processed successfully.")
+            print(f"{len(trades)} trade records processed successfully ({inserted} inserted).")
+            return inserted, len(trades) - inserted
         except Exception as e:
             print(f"Error batch inserting Trade records: {e}")
             self.conn.rollback()
             raise
     
+    @timed('bulk_load')
+    def bulk_load(self, table_name: str, rows: List[Tuple]) -> Tuple[int, int]:
+        """
+        Bulk load rows into a table through COPY FROM STDIN, ignoring duplicates.
+        
+        The rows are streamed into a temporary staging table and merged into the
+        target with ON CONFLICT DO NOTHING, all in a single transaction.
+        
+        Args:
+            table_name: One of the tables in BULK_TABLES
+            rows: Tuples in the same column order as the matching insert_* method
+            
+        Returns:
+            A tuple of (inserted, skipped) row counts
+        """
+        columns, conflict_columns = BULK_TABLES[table_name]
+        cols_str = ", ".join(columns)
+        staging_table = f"staging_{table_name.lower()}"
+        
+        try:
+            # The staging table lives for the session and is emptied on every commit
+            self.cursor.execute(
+                f"""CREATE TEMP TABLE IF NOT EXISTS {staging_table} 
+                (LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"""
+            )
+            
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write("\t".join(_copy_value(value) for value in row))
+                buffer.write("\n")
+            buffer.seek(0)
+            self.cursor.copy_expert(f"COPY {staging_table} ({cols_str}) FROM STDIN", buffer)
+            
+            self.cursor.execute(
+                f"""INSERT INTO {table_name} ({cols_str}) 
+                SELECT {cols_str} FROM {staging_table}
+                ON CONFLICT ({", ".join(conflict_columns)}) DO NOTHING"""
+            )
+            inserted = self.cursor.rowcount
+            self.conn.commit()
+            
+            skipped = len(rows) - inserted
+            print(f"{len(rows)} {table_name} records bulk loaded: {inserted} inserted, {skipped} skipped.")
+            return inserted, skipped
+        except Exception as e:
+            print(f"Error bulk loading {table_name} records: {e}")
+            self.conn.rollback()
+            raise
+    
+    @timed('get_table_data')
     def get_table_data(self, table_name: str, columns: List[str] = None, 
                       condition: str = None, params: tuple = None) -> List[Tuple]:
         """
@@ -285,6 +792,63 @@ class DatabaseManager:
             print(f"Error retrieving data from {table_name}: {e}")
             raise
         
+    def iter_table_data(self, table_name: str, columns: List[str] = None, condition: str = None,
+                        params: tuple = None, order_by: str = None, itersize: int = 2000,
+                        batch_size: Optional[int] = None, limit: Optional[int] = None) -> Iterator:
+        """
+        Stream data from a specified table through a named server-side cursor.
+        
+        Unlike get_table_data, rows are fetched from the server itersize at a time,
+        so client memory stays flat regardless of table size. The cursor lives in
+        the current transaction; don't commit on this connection until iteration ends.
+        
+        Args:
+            table_name: Name of the table to query
+            columns: List of column names to retrieve (None for all columns)
+            condition: WHERE clause condition (without the 'WHERE' keyword)
+            params: Parameters for the condition
+            order_by: ORDER BY clause (without the 'ORDER BY' keyword), e.g. "time, trade_id"
+            itersize: Number of rows fetched from the server per round trip
+            batch_size: Yield lists of up to batch_size rows instead of single rows
+            limit: Maximum number of rows to stream (None for no limit)
+            
+        Yields:
+            Tuples containing the query results, or lists of them when batch_size is set
+        """
+        cols_str = "*" if not columns else ", ".join(columns)
+        query = f"SELECT {cols_str} FROM {table_name}"
+        if condition:
+            query += f" WHERE {condition}"
+        if order_by:
+            query += f" ORDER BY {order_by}"
+        if limit is not None:
+            query += " LIMIT %s"
+            params = tuple(params or ()) + (limit,)
+        
+        cursor = self.conn.cursor(name=f"stream_{table_name.lower()}_{uuid.uuid4().hex}")
+        cursor.itersize = itersize
+        count = 0
+        try:
+            cursor.execute(query, params)
+            if batch_size:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    count += len(rows)
+                    yield rows
+            else:
+                for row in cursor:
+                    count += 1
+                    yield row
+            print(f"Streamed {count} records from {table_name}")
+        except Exception as e:
+            print(f"Error streaming data from {table_name}: {e}")
+            raise
+        finally:
+            cursor.close()
+    
+    @timed('get_strategy_volumes')
     def get_strategy_volumes(self, portfolio_id: int) -> List[Tuple]:
         """
         Get the total volume for each strategy in a specific portfolio.
@@ -299,12 +863,12 @@ class DatabaseManager:
             self.cursor.execute("""
                 SELECT 
                     s.strategy_id,
-                    SUM(t.volume) AS total_volume,
-                    COUNT(t.trade_id) AS trade_count
+                    SUM(r.volume) AS total_volume,
+                    SUM(r.trade_count) AS trade_count
                 FROM 
                     Strategy s
                 JOIN 
-                    Trade t ON s.strategy_id = t.strategy_id
+                    Trade_Hourly_Rollup r ON s.strategy_id = r.strategy_id
                 WHERE 
                     s.portfolio_id = %s
                 GROUP BY 
@@ -321,6 +885,7 @@ class DatabaseManager:
             print(f"Error retrieving strategy volumes: {e}")
             raise
 
+    @timed('get_strategy_daily_average_trade_frequency')
     def get_strategy_daily_average_trade_frequency(self, portfolio_id: Optional[int] = None, 
                                                 strategy_id: Optional[str] = None) -> List[Tuple]:
         """
@@ -340,14 +905,14 @@ class DatabaseManager:
                     s.strategy_id,
                     s.symbol,
                     s.direction,
-                    COUNT(t.trade_id) AS total_trades,
-                    COUNT(DISTINCT DATE(t.time)) AS trading_days,
-                    ROUND(COUNT(t.trade_id)::numeric / 
-                        NULLIF(COUNT(DISTINCT DATE(t.time)), 0)::numeric, 2) AS avg_trades_per_day,
-                    MIN(DATE(t.time)) AS first_trading_day,
-                    MAX(DATE(t.time)) AS last_trading_day
+                    SUM(r.trade_count) AS total_trades,
+                    COUNT(DISTINCT DATE(r.hour)) AS trading_days,
+                    ROUND(SUM(r.trade_count)::numeric / 
+                        NULLIF(COUNT(DISTINCT DATE(r.hour)), 0)::numeric, 2) AS avg_trades_per_day,
+                    MIN(DATE(r.hour)) AS first_trading_day,
+                    MAX(DATE(r.hour)) AS last_trading_day
                 FROM Strategy s
-                JOIN Trade t ON s.strategy_id = t.strategy_id
+                JOIN Trade_Hourly_Rollup r ON s.strategy_id = r.strategy_id
                 WHERE 1=1
             """
             
@@ -451,6 +1016,7 @@ class DatabaseManager:
 
 
 
+    @timed('get_portfolio_performance')
     def get_portfolio_performance(self, portfolio_id: int) -> List[Tuple]:
         """
         Get performance metrics for a portfolio based on snapshots.
@@ -653,6 +1219,9 @@ def create_database_schema_from_file(db_manager, schema_file_path):
         db_manager.commit()
         print(f"Database schema created successfully from file: {schema_file_path}")
         
+        # Trades loaded before the rollup triggers existed are not in the rollup yet
+        backfill_trade_hourly_rollup(db_manager)
+        
     except Exception as e:
         print(f"Error creating database schema from file: {e}")
         db_manager.rollback()
@@ -663,75 +1232,138 @@ def create_database_schema_from_file(db_manager, schema_file_path):
         print("The correct order should be: System → Strategy → Portfolio → Order → Log → Portfolio_Snapshot → Trade")
         raise
 
-def parse_trades_log(log_file_path: str) -> List[Tuple[str, datetime, str, float, float, str, str, float]]:
+def _extract_payload(line: str) -> Optional[str]:
     """
-    Parse the Trades.log file and convert it to the format needed for insert_trades.
+    Return the JSON object following 'Received data: ' in a log line, or None.
+    
+    Captures the same text as the greedy 'Received data: ({.*})' regex used previously
+    (first '{' after the marker through the last '}' on the line), but with plain
+    substring searches instead of the regex engine.
+    """
+    start = line.find(RECEIVED_DATA_MARKER)
+    while start != -1:
+        start += len(RECEIVED_DATA_MARKER)
+        if line.startswith('{', start):
+            end = line.rfind('}', start)
+            if end != -1:
+                return line[start:end + 1]
+        start = line.find(RECEIVED_DATA_MARKER, start)
+    return None
+
+def _strategy_id_from_client_order_id(client_order_id: str) -> str:
+    """Extract the strategy part of a clientOrderId (everything before the 11-character suffix)."""
+    return client_order_id[:-11] if len(client_order_id) > 11 else ''
+
+def _record_time(data: Dict[str, Any]) -> datetime:
+    """Convert a record's createAt millisecond timestamp to a datetime."""
+    create_at = data.get('createAt', '')
+    if create_at:
+        # Convert milliseconds timestamp to datetime
+        return datetime.fromtimestamp(int(create_at) / 1000)
+    # Use current time if createAt is not available
+    return datetime.now()
+
+def _scan_trade_lines(lines: Iterable[str], unique_strategy_ids: Dict[str, Dict[str, str]],
+                      stats: Optional[Counter] = None) -> Iterator[Tuple]:
+    """
+    Parse trade records out of Trades.log lines.
+    
+    Strategies are registered in unique_strategy_ids in first-seen order as a side effect.
+    Lines whose payload is not valid JSON are counted in stats['malformed'].
+    
+    Yields:
+        Tuples in the format (trade_id, time, strategy_id, price, qty, side, symbol, volume)
+    """
+    for line in lines:
+        # Extract the JSON part from the log line
+        json_data = _extract_payload(line)
+        if json_data is not None:
+            try:
+                # Parse the JSON data
+                trade_data = _json_loads(json_data)
+                
+                # Extract the data field which contains the trade details
+                data = trade_data.get('data', {})
+                
+                # Extract strategy_id from clientOrderId (removing the last 11 characters)
+                strategy_id = _strategy_id_from_client_order_id(data.get('clientOrderId', ''))
+                if strategy_id not in unique_strategy_ids:
+                    unique_strategy_ids[strategy_id] = {
+                        'direction': "long" if "LONG" in strategy_id else "short",
+                        'symbol': data.get('sym', '')
+                    }
+
+                # Extract other required fields
+                trade_id = data.get('transactionId', '')
+                time = _record_time(data)
+                price = float(data.get('price', 0))
+                qty = float(data.get('quantity', 0))
+                side = data.get('side', '').lower()  # Convert to lowercase to match schema
+                symbol = data.get('sym', '')
+                
+                # Calculate volume as price * qty
+                volume = price * qty
+                
+                # Create tuple in the required format
+                yield (trade_id, time, strategy_id, price, qty, side, symbol, volume)
+                
+            except json.JSONDecodeError as e:
+                if stats is not None:
+                    stats['malformed'] += 1
+                print(f"Error parsing JSON: {e}")
+            except Exception as e:
+                print(f"Error processing trade data: {e}")
+
+def iter_trades_log(log_file_path: str, batch_size: int = 1000) -> Iterator[Tuple[List[Tuple], Dict[str, Dict[str, str]]]]:
+    """
+    Stream the Trades.log file in fixed-size batches in the format needed for insert_trades.
     
     Args:
         log_file_path: Path to the Trades.log file
+        batch_size: Number of trades per yielded batch
         
-    Returns:
-        List of tuples in the format (trade_id, time, strategy_id, price, qty, side, symbol, volume)
+    Yields:
+        Tuples of (batch, unique_strategy_ids) where batch is a list of
+        (trade_id, time, strategy_id, price, qty, side, symbol, volume) tuples and
+        unique_strategy_ids holds every strategy discovered so far
     """
     trades = []
+    unique_strategy_ids = {}
+    stats = Counter()
+    total = 0
     
     try:
         with open(log_file_path, 'r') as file:
-            unique_strategy_ids = {}
-            for line in file:
-                # Extract the JSON part from the log line
-                match = re.search(r'Received data: (\{.*\})', line)
-                if match:
-                    json_data = match.group(1)
-                    try:
-                        # Parse the JSON data
-                        trade_data = json.loads(json_data)
-                        
-                        # Extract the data field which contains the trade details
-                        data = trade_data.get('data', {})
-                        
-                        # Extract strategy_id from clientOrderId (removing the last 11 characters)
-                        client_order_id = data.get('clientOrderId', '')
-                        strategy_id = client_order_id[:-11] if len(client_order_id) > 11 else ''
-                        if strategy_id not in unique_strategy_ids:
-                            unique_strategy_ids[strategy_id] = {
-                                'direction': "long" if "LONG" in strategy_id else "short",
-                                'symbol': data.get('sym', '')
-                            }
-
-                        # Extract other required fields
-                        trade_id = data.get('transactionId', '')
-                        
-                        # Convert timestamp to datetime
-                        create_at = data.get('createAt', '')
-                        if create_at:
-                            # Convert milliseconds timestamp to datetime
-                            time = datetime.fromtimestamp(int(create_at) / 1000)
-                        else:
-                            # Use current time if createAt is not available
-                            time = datetime.now()
-                        
-                        price = float(data.get('price', 0))
-                        qty = float(data.get('quantity', 0))
-                        side = data.get('side', '').lower()  # Convert to lowercase to match schema
-                        symbol = data.get('sym', '')
-                        
-                        # Calculate volume as price * qty
-                        volume = price * qty
-                        
-                        # Create tuple in the required format
-                        trade_tuple = (trade_id, time, strategy_id, price, qty, side, symbol, volume)
-                        trades.append(trade_tuple)
-                        
-                    except json.JSONDecodeError as e:
-                        print(f"Error parsing JSON: {e}")
-                    except Exception as e:
-                        print(f"Error processing trade data: {e}")
+            for trade in _scan_trade_lines(file, unique_strategy_ids, stats):
+                trades.append(trade)
+                if len(trades) >= batch_size:
+                    total += len(trades)
+                    yield trades, unique_strategy_ids
+                    trades = []
     
     except Exception as e:
         print(f"Error reading log file: {e}")
     
-    print(f"Successfully parsed {len(trades)} trades from log file")
+    if trades:
+        total += len(trades)
+        yield trades, unique_strategy_ids
+    
+    print(f"Successfully parsed {total} trades from log file ({stats['malformed']} malformed lines)")
+
+def parse_trades_log(log_file_path: str) -> List[Tuple[str, datetime, str, float, float, str, str, float]]:
+    """
+    Parse the Trades.log file and convert it to the format needed for insert_trades.
+    
+    Args:
+        log_file_path: Path to the Trades.log file
+        
+    Returns:
+        List of tuples in the format (trade_id, time, strategy_id, price, qty, side, symbol, volume)
+    """
+    trades = []
+    unique_strategy_ids = {}
+    for batch, unique_strategy_ids in iter_trades_log(log_file_path):
+        trades.extend(batch)
     return trades, unique_strategy_ids
 
 def drop_all_tables(db_manager):
@@ -750,7 +1382,7 @@ def drop_all_tables(db_manager):
             db_manager.connect()
         
         # Define the tables in reverse order of creation to handle dependencies
-        tables = ["Trade", "Portfolio_Snapshot", "Log", "\"Order\"", "Portfolio", "Strategy", "System"]
+        tables = ["Table_Version", "Trade_Hourly_Rollup", "Strategy_PnL_Replay", "Strategy_PnL_Point", "Strategy_PnL_State", "Trade", "Portfolio_Snapshot", "Log", "\"Order\"", "Portfolio", "Strategy", "System"]
         
         # Drop each table
         for table in tables:
@@ -769,6 +1401,124 @@ def drop_all_tables(db_manager):
         db_manager.rollback()
         raise
 
+def _scan_order_lines(lines: Iterable[str], processed_orders: set,
+                      stats: Optional[Counter] = None) -> Iterator[Tuple[str, Optional[str], str, Optional[Tuple]]]:
+    """
+    Parse NEW/OPEN order records out of Orders.log lines, skipping orders already in processed_orders.
+    
+    Each accepted order_id is added to processed_orders as a side effect, even when the rest
+    of its record fails to parse, so later status updates for it are ignored. Every accepted
+    order_id is yielded, so callers that merge several scans see the same set. Records rejected
+    by the NEW/OPEN pre-check without being decoded are counted in stats['skipped'], and
+    payloads that are not valid JSON in stats['malformed'].
+    
+    Yields:
+        Tuples of (order_id, strategy_id, symbol, order) where order is in the format
+        (order_id, time, strategy_id, price, qty, side, symbol), or None (as is strategy_id)
+        if that part of the record could not be parsed
+    """
+    for line in lines:
+        # Extract the JSON part from the log line
+        json_data = _extract_payload(line)
+        # Cheap pre-check: a record without a NEW/OPEN value anywhere cannot be accepted,
+        # so skip the full JSON decode for status updates like FILLED or CANCELED
+        if json_data is not None and not ('"NEW"' in json_data or '"OPEN"' in json_data):
+            # Possibly malformed as well; it is never decoded, so it can only be counted as skipped
+            if stats is not None:
+                stats['skipped'] += 1
+        elif json_data is not None:
+            accepted = False
+            strategy_id = None
+            try:
+                # Parse the JSON data
+                order_data = _json_loads(json_data)
+                
+                # Extract the data field which contains the order details
+                data = order_data.get('data', {})
+                
+                # Get order_id
+                order_id = data.get('orderId', '')
+                
+                # Skip if we've already processed this order (to avoid duplicates from status updates)
+                # Only process NEW orders to avoid duplicates
+                order_state = data.get('orderState', '')
+                if order_id in processed_orders or order_state not in ['NEW', 'OPEN']:
+                    continue
+                
+                processed_orders.add(order_id)
+                accepted = True
+                
+                # Extract strategy_id from clientOrderId (the strategy part before the timestamp)
+                strategy_id = _strategy_id_from_client_order_id(data.get('clientOrderId', ''))
+                
+                # Extract other required fields
+                time = _record_time(data)
+                price = float(data.get('limitPrice', 0))
+                qty = float(data.get('orderQty', 0))
+                side = data.get('side', '').lower()  # Convert to lowercase to match schema
+                symbol = data.get('sym', '')
+                
+                # Create tuple in the required format
+                yield order_id, strategy_id, symbol, (order_id, time, strategy_id, price, qty, side, symbol)
+                
+            except json.JSONDecodeError as e:
+                if stats is not None:
+                    stats['malformed'] += 1
+                print(f"Error parsing JSON: {e}")
+            except Exception as e:
+                print(f"Error processing order data: {e}")
+                if accepted:
+                    yield order_id, strategy_id, data.get('sym', ''), None
+
+def _register_order_strategy(unique_strategy_ids: Dict[str, Dict[str, str]], strategy_id: Optional[str], symbol: str) -> None:
+    """Record an order's strategy the first time it is seen."""
+    if strategy_id is not None and strategy_id not in unique_strategy_ids:
+        unique_strategy_ids[strategy_id] = {
+            'direction': "long" if "LONG" in strategy_id else "short",
+            'symbol': symbol
+        }
+
+def iter_orders_log(log_file_path: str, batch_size: int = 1000) -> Iterator[Tuple[List[Tuple], Dict[str, Dict[str, str]]]]:
+    """
+    Stream the Orders.log file in fixed-size batches in the format needed for insert_orders.
+    
+    Args:
+        log_file_path: Path to the Orders.log file
+        batch_size: Number of orders per yielded batch
+        
+    Yields:
+        Tuples of (batch, unique_strategy_ids) where batch is a list of
+        (order_id, time, strategy_id, price, qty, side, symbol) tuples and
+        unique_strategy_ids holds every strategy discovered so far
+    """
+    orders = []
+    processed_orders = set()  # To track already processed orders
+    unique_strategy_ids = {}
+    stats = Counter()
+    total = 0
+    
+    try:
+        with open(log_file_path, 'r') as file:
+            for _, strategy_id, symbol, order in _scan_order_lines(file, processed_orders, stats):
+                _register_order_strategy(unique_strategy_ids, strategy_id, symbol)
+                if order is None:
+                    continue
+                orders.append(order)
+                if len(orders) >= batch_size:
+                    total += len(orders)
+                    yield orders, unique_strategy_ids
+                    orders = []
+    
+    except Exception as e:
+        print(f"Error reading log file: {e}")
+    
+    if orders:
+        total += len(orders)
+        yield orders, unique_strategy_ids
+    
+    print(f"Successfully parsed {total} orders from log file "
+          f"({stats['skipped']} non-NEW/OPEN records skipped, {stats['malformed']} malformed lines)")
+
 def parse_orders_log(log_file_path: str) -> List[Tuple[str, datetime, str, float, float, str, str]]:
     """
     Parse the Orders.log file and convert it to the format needed for insert_orders.
@@ -780,96 +1530,499 @@ def parse_orders_log(log_file_path: str) -> List[Tuple[str, datetime, str, float
         List of tuples in the format (order_id, time, strategy_id, price, qty, side, symbol)
     """
     orders = []
-    processed_orders = set()  # To track already processed orders
+    unique_strategy_ids = {}
+    for batch, unique_strategy_ids in iter_orders_log(log_file_path):
+        orders.extend(batch)
+    return orders, unique_strategy_ids
+
+def _line_aligned_ranges(log_file_path: str, num_ranges: int) -> List[Tuple[int, int]]:
+    """Split a file into up to num_ranges byte ranges that each start at the beginning of a line."""
+    size = os.path.getsize(log_file_path)
+    boundaries = [0]
+    with open(log_file_path, 'rb') as file:
+        for i in range(1, num_ranges):
+            file.seek(max(size * i // num_ranges, boundaries[-1]))
+            # Move the boundary forward to the start of the next line
+            file.readline()
+            boundaries.append(min(file.tell(), size))
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+def _iter_range_lines(log_file_path: str, start: int, end: int) -> Iterator[str]:
+    """Yield the decoded lines of a line-aligned byte range of a file."""
+    with open(log_file_path, 'rb') as file:
+        file.seek(start)
+        position = start
+        while position < end:
+            line = file.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line.decode('utf-8', errors='replace')
+
+def _parse_trades_range(task: Tuple[str, int, int]) -> Tuple[List[Tuple], Dict[str, Dict[str, str]], Counter]:
+    """Worker: parse the trades in one byte range of Trades.log."""
+    log_file_path, start, end = task
+    unique_strategy_ids = {}
+    stats = Counter()
+    trades = list(_scan_trade_lines(_iter_range_lines(log_file_path, start, end), unique_strategy_ids, stats))
+    return trades, unique_strategy_ids, stats
+
+def _parse_orders_range(task: Tuple[str, int, int]) -> Tuple[List[Tuple[str, Optional[str], str, Optional[Tuple]]], Counter]:
+    """Worker: parse the first NEW/OPEN record of each order in one byte range of Orders.log."""
+    log_file_path, start, end = task
+    stats = Counter()
+    return list(_scan_order_lines(_iter_range_lines(log_file_path, start, end), set(), stats)), stats
+
+def _map_ranges(worker, log_file_path: str, workers: Optional[int], ranges_per_worker: int) -> List[Any]:
+    """Run worker over line-aligned ranges of a file in a process pool, returning results in file order."""
+    workers = workers or os.cpu_count() or 1
+    tasks = [(log_file_path, start, end)
+             for start, end in _line_aligned_ranges(log_file_path, workers * ranges_per_worker)]
+    if workers == 1 or len(tasks) <= 1:
+        return [worker(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() returns results in submission order, which keeps the merge deterministic
+        return list(executor.map(worker, tasks))
+
+def parse_trades_log_parallel(log_file_path: str, workers: Optional[int] = None,
+                              ranges_per_worker: int = 4) -> List[Tuple[str, datetime, str, float, float, str, str, float]]:
+    """
+    Parse the Trades.log file on multiple cores; the result is identical to parse_trades_log.
+    
+    The file is split into newline-aligned byte ranges that are parsed in a process pool
+    and merged in file order, so trades keep their file order and unique_strategy_ids
+    keeps first-seen order.
+    
+    Args:
+        log_file_path: Path to the Trades.log file
+        workers: Number of worker processes (defaults to the number of CPUs)
+        ranges_per_worker: Byte ranges per worker, for load balancing
+        
+    Returns:
+        Tuple of (trades, unique_strategy_ids) in the same format as parse_trades_log
+    """
+    trades = []
+    unique_strategy_ids = {}
+    stats = Counter()
     
     try:
-        with open(log_file_path, 'r') as file:
-            unique_strategy_ids = {}
-            for line in file:
-                # Extract the JSON part from the log line
-                match = re.search(r'Received data: (\{.*\})', line)
-                if match:
-                    json_data = match.group(1)
-                    try:
-                        # Parse the JSON data
-                        order_data = json.loads(json_data)
-                        
-                        # Extract the data field which contains the order details
-                        data = order_data.get('data', {})
-                        
-                        # Get order_id
-                        order_id = data.get('orderId', '')
-                        
-                        # Skip if we've already processed this order (to avoid duplicates from status updates)
-                        # Only process NEW orders to avoid duplicates
-                        order_state = data.get('orderState', '')
-                        if order_id in processed_orders or order_state not in ['NEW', 'OPEN']:
-                            continue
-                        
-                        processed_orders.add(order_id)
-                        
-                        # Extract strategy_id from clientOrderId
-                        client_order_id = data.get('clientOrderId', '')
-                        # Extract the strategy part (before the timestamp)
-                        strategy_id = client_order_id[:-11] if len(client_order_id) > 11 else ''
-                        if strategy_id not in unique_strategy_ids:
-                            unique_strategy_ids[strategy_id] = {
-                                'direction': "long" if "LONG" in strategy_id else "short",
-                                'symbol': data.get('sym', '')
-                            }
-                        
-                        # Convert timestamp to datetime
-                        create_at = data.get('createAt', '')
-                        if create_at:
-                            # Convert milliseconds timestamp to datetime
-                            time = datetime.fromtimestamp(int(create_at) / 1000)
-                        else:
-                            # Use current time if createAt is not available
-                            time = datetime.now()
-                        
-                        # Extract other required fields
-                        price = float(data.get('limitPrice', 0))
-                        qty = float(data.get('orderQty', 0))
-                        side = data.get('side', '').lower()  # Convert to lowercase to match schema
-                        symbol = data.get('sym', '')
-                        
-                        # Create tuple in the required format
-                        order_tuple = (order_id, time, strategy_id, price, qty, side, symbol)
-                        orders.append(order_tuple)
-                        
-                    except json.JSONDecodeError as e:
-                        print(f"Error parsing JSON: {e}")
-                    except Exception as e:
-                        print(f"Error processing order data: {e}")
+        for range_trades, range_strategy_ids, range_stats in _map_ranges(_parse_trades_range, log_file_path,
+                                                                         workers, ranges_per_worker):
+            trades.extend(range_trades)
+            stats.update(range_stats)
+            for strategy_id, strategy_info in range_strategy_ids.items():
+                unique_strategy_ids.setdefault(strategy_id, strategy_info)
+    except Exception as e:
+        print(f"Error reading log file: {e}")
+    
+    print(f"Successfully parsed {len(trades)} trades from log file ({stats['malformed']} malformed lines)")
+    return trades, unique_strategy_ids
+
+def parse_orders_log_parallel(log_file_path: str, workers: Optional[int] = None,
+                              ranges_per_worker: int = 4) -> List[Tuple[str, datetime, str, float, float, str, str]]:
+    """
+    Parse the Orders.log file on multiple cores; the result is identical to parse_orders_log.
+    
+    Each byte range reports the first NEW/OPEN record of every order it contains. The merge
+    replays those records in file order against a global processed_orders set, so an order
+    is taken from its first NEW/OPEN record in the whole file exactly as in the sequential parser.
+    
+    Args:
+        log_file_path: Path to the Orders.log file
+        workers: Number of worker processes (defaults to the number of CPUs)
+        ranges_per_worker: Byte ranges per worker, for load balancing
+        
+    Returns:
+        Tuple of (orders, unique_strategy_ids) in the same format as parse_orders_log
+    """
+    orders = []
+    processed_orders = set()
+    unique_strategy_ids = {}
+    stats = Counter()
     
+    try:
+        for candidates, range_stats in _map_ranges(_parse_orders_range, log_file_path, workers, ranges_per_worker):
+            stats.update(range_stats)
+            for order_id, strategy_id, symbol, order in candidates:
+                if order_id in processed_orders:
+                    continue
+                processed_orders.add(order_id)
+                _register_order_strategy(unique_strategy_ids, strategy_id, symbol)
+                if order is not None:
+                    orders.append(order)
     except Exception as e:
         print(f"Error reading log file: {e}")
     
-    print(f"Successfully parsed {len(orders)} orders from log file")
+    print(f"Successfully parsed {len(orders)} orders from log file "
+          f"({stats['skipped']} non-NEW/OPEN records skipped, {stats['malformed']} malformed lines)")
     return orders, unique_strategy_ids
 
+def insert_new_strategies(db_manager, unique_strategy_ids: Dict[str, Dict[str, str]],
+                          inserted_strategy_ids: set, portfolio_id: int = DEFAULT_PORTFOLIO_ID) -> None:
+    """
+    Insert the strategies in unique_strategy_ids that are not yet in inserted_strategy_ids.
+    
+    Args:
+        db_manager: An instance of DatabaseManager with an active connection
+        unique_strategy_ids: Strategy metadata as returned by the log parsers
+        inserted_strategy_ids: Strategy IDs already inserted; updated in place
+        portfolio_id: The portfolio the strategies belong to
+    """
+    new_strategy_ids = [strategy_id for strategy_id in unique_strategy_ids if strategy_id not in inserted_strategy_ids]
+    if not new_strategy_ids:
+        return
+    # One multi-row INSERT and commit instead of one per strategy
+    with db_manager.batch():
+        for strategy_id in new_strategy_ids:
+            strategy_info = unique_strategy_ids[strategy_id]
+            db_manager.insert_strategy(strategy_id, strategy_info['direction'], strategy_info['symbol'], portfolio_id)
+    inserted_strategy_ids.update(new_strategy_ids)
+
 # Example usage:
-def process_orders(db_manager):
+def _iter_parsed_batches(parsed: Tuple[List[Tuple], Dict[str, Dict[str, str]]],
+                         batch_size: int) -> Iterator[Tuple[List[Tuple], Dict[str, Dict[str, str]]]]:
+    """Split the (records, unique_strategy_ids) result of a whole-file parser into batches like iter_*_log yields."""
+    records, unique_strategy_ids = parsed
+    for start in range(0, len(records), batch_size):
+        yield records[start:start + batch_size], unique_strategy_ids
+
+def process_orders(db_manager, log_file_path: str = ORDERS_LOG_PATH, batch_size: int = 1000,
+                   limit: Optional[int] = 1000, workers: Optional[int] = 1):
+    """
+    Parse Orders.log and insert it batch by batch, so memory stays bounded by batch_size.
+    
+    Strategies are inserted as they are discovered, before the orders that reference
+    them. At most limit orders are inserted (None for the whole file); the rest of
+    the file is still scanned so every strategy in it is registered.
+    
+    With workers other than 1 (None for every CPU) the file is parsed by
+    parse_orders_log_parallel instead, which holds all of its orders in memory.
+    """
     try:
-        # Parse the orders log file
-        orders, unique_strategy_ids = parse_orders_log("../Maker-Trade-System/build/logs_temp/Orders.log")
-        for strategy_id, strategy_info in unique_strategy_ids.items():
-            db_manager.insert_strategy(strategy_id, strategy_info['direction'], strategy_info['symbol'], 1718693033751000)
-        db_manager.insert_orders(orders[:1000])
+        if workers == 1:
+            batches = iter_orders_log(log_file_path, batch_size)
+        else:
+            batches = _iter_parsed_batches(parse_orders_log_parallel(log_file_path, workers), batch_size)
+        inserted_strategy_ids = set()
+        unique_strategy_ids = {}
+        total = 0
+        for orders, unique_strategy_ids in batches:
+            if limit is not None:
+                orders = orders[:limit - total]
+                if not orders:
+                    continue
+            insert_new_strategies(db_manager, unique_strategy_ids, inserted_strategy_ids)
+            db_manager.insert_orders(orders)
+            total += len(orders)
         
-        print(f"Successfully processed {len(orders)} orders")
+        # Strategies found past the limit
+        insert_new_strategies(db_manager, unique_strategy_ids, inserted_strategy_ids)
+        print(f"Successfully processed {total} orders")
     except Exception as e:
         print(f"Error processing orders: {e}")
         
-def process_trades(db_manager):
+def process_trades(db_manager, log_file_path: str = TRADES_LOG_PATH, batch_size: int = 5000,
+                   workers: Optional[int] = 1):
+    """
+    Parse Trades.log and insert it batch by batch, so memory stays bounded by batch_size.
+    
+    Strategies are inserted as they are discovered, before the trades that reference them.
+    With workers other than 1 (None for every CPU) the file is parsed by
+    parse_trades_log_parallel instead, which holds all of its trades in memory.
+    """
     try:
-        trades, unique_strategy_ids = parse_trades_log("../Maker-Trade-System/build/logs_temp/Trades.log")
-        for strategy_id, strategy_info in unique_strategy_ids.items():
-            db_manager.insert_strategy(strategy_id, strategy_info['direction'], strategy_info['symbol'], 1718693033751000)
-        db_manager.insert_trades(trades)
-        print(f"Successfully processed {len(trades)} trades")
+        # The triggers only add new trades to the rollup; fill it first if it was never built
+        backfill_trade_hourly_rollup(db_manager)
+        if workers == 1:
+            batches = iter_trades_log(log_file_path, batch_size)
+        else:
+            batches = _iter_parsed_batches(parse_trades_log_parallel(log_file_path, workers), batch_size)
+        inserted_strategy_ids = set()
+        total = 0
+        for trades, unique_strategy_ids in batches:
+            insert_new_strategies(db_manager, unique_strategy_ids, inserted_strategy_ids)
+            db_manager.insert_trades(trades)
+            total += len(trades)
+        print(f"Successfully processed {total} trades")
+        update_strategy_pnl_state(db_manager)
     except Exception as e:
         print(f"Error processing trades: {e}")
+
+@timed('update_strategy_pnl_state')
+def update_strategy_pnl_state(db_manager) -> int:
+    """
+    Apply trades newer than each strategy's saved PnL state and save the new state.
+    
+    Each Strategy_PnL_State row holds the position, average entry price and cumulative
+    realized PnL after the strategy's last processed trade, keyed by (time, trade_id).
+    Only trades after that key are replayed, so the cost follows the number of new
+    trades rather than the whole history. Every replayed trade also gets a
+    Strategy_PnL_Point row so PnL curves can be drawn without replaying.
+    
+    A trade inserted, changed or deleted at or before a saved key is caught by the
+    Trade triggers, which flag the strategy in Strategy_PnL_Replay; only flagged
+    strategies are replayed from their first trade. Strategies without a symbol
+    are skipped, as the dashboard cannot mark them.
+    
+    Args:
+        db_manager: An instance of DatabaseManager with an active connection
+        
+    Returns:
+        Number of trades applied
+    """
+    try:
+        # Every strategy gets a state row; locking them serializes concurrent updaters
+        db_manager.cursor.execute("""
+            INSERT INTO Strategy_PnL_State (strategy_id)
+            SELECT strategy_id FROM Strategy
+            WHERE symbol IS NOT NULL AND symbol <> ''
+            ON CONFLICT (strategy_id) DO NOTHING
+        """)
+        db_manager.cursor.execute("""
+            SELECT s.strategy_id, s.position, s.avg_entry_price, s.realized_pnl
+            FROM Strategy_PnL_State s
+            JOIN Strategy st ON st.strategy_id = s.strategy_id
+            WHERE st.symbol IS NOT NULL AND st.symbol <> ''
+            ORDER BY s.strategy_id
+            FOR UPDATE OF s
+        """)
+        states = {row[0]: row[1:] for row in db_manager.cursor.fetchall()}
+        
+        # Strategies flagged by the Trade triggers for a late, changed or deleted trade
+        db_manager.cursor.execute("DELETE FROM Strategy_PnL_Replay RETURNING strategy_id")
+        stale = {row[0] for row in db_manager.cursor.fetchall()} & set(states)
+        if stale:
+            print(f"Replaying PnL state of {len(stale)} strategies with late or deleted trades")
+            db_manager.cursor.execute("""
+                DELETE FROM Strategy_PnL_Point WHERE strategy_id = ANY(%s)
+            """, (sorted(stale),))
+            db_manager.cursor.execute("""
+                UPDATE Strategy_PnL_State
+                SET position = 0, avg_entry_price = 0, realized_pnl = 0,
+                    last_trade_time = NULL, last_trade_id = NULL
+                WHERE strategy_id = ANY(%s)
+            """, (sorted(stale),))
+            for strategy_id in stale:
+                states[strategy_id] = (0.0, 0.0, 0.0)
+        
+        db_manager.cursor.execute("""
+            SELECT t.strategy_id, t.trade_id, t.time, t.side, t.price, t.qty, t.volume
+            FROM Trade t
+            JOIN Strategy_PnL_State s ON s.strategy_id = t.strategy_id
+            WHERE s.last_trade_time IS NULL
+               OR (t.time, t.trade_id) > (s.last_trade_time, s.last_trade_id)
+            ORDER BY t.strategy_id, t.time, t.trade_id
+        """)
+        # State rows left over from a strategy whose symbol was cleared are not advanced
+        trades = [trade for trade in db_manager.cursor.fetchall() if trade[0] in states]
+        
+        if not trades:
+            db_manager.commit()
+            return 0
+        
+        strategy_column, trade_ids, times, sides, prices, qtys, volumes = zip(*trades)
+        is_buy = np.array([side == 'buy' for side in sides])
+        prices = np.array(prices, dtype=float)
+        qtys = np.array(qtys, dtype=float)
+        volumes = np.array(volumes, dtype=float)
+        
+        points = []
+        new_states = []
+        for strategy_id, indices in pnl_engine.partition_by_strategy(strategy_column).items():
+            position, avg_entry_price, realized_pnl = states[strategy_id]
+            positions, avg_entry_prices, realized = pnl_engine.replay_positions(
+                is_buy[indices], prices[indices], qtys[indices], volumes[indices],
+                position=position, avg_entry_price=avg_entry_price)
+            # Seeding the running sum with the saved total keeps it identical to a full replay
+            realized_cumulative = np.cumsum(np.concatenate(([realized_pnl], realized)))[1:]
+            
+            indices = indices.tolist()
+            for i, trade_index in enumerate(indices):
+                points.append((strategy_id, trade_ids[trade_index], times[trade_index],
+                               positions[i].item(), avg_entry_prices[i].item(), realized_cumulative[i].item()))
+            last = indices[-1]
+            new_states.append((positions[-1].item(), avg_entry_prices[-1].item(), realized_cumulative[-1].item(),
+                               times[last], trade_ids[last], strategy_id))
+        
+        execute_values(db_manager.cursor, """
+            INSERT INTO Strategy_PnL_Point (strategy_id, trade_id, time, position, avg_entry_price, realized_pnl)
+            VALUES %s
+            ON CONFLICT (trade_id) DO NOTHING
+        """, points, page_size=5000)
+        db_manager.cursor.executemany("""
+            UPDATE Strategy_PnL_State
+            SET position = %s, avg_entry_price = %s, realized_pnl = %s,
+                last_trade_time = %s, last_trade_id = %s
+            WHERE strategy_id = %s
+        """, new_states)
+        
+        db_manager.commit()
+        print(f"Applied {len(trades)} trades to PnL state of {len(new_states)} strategies")
+        return len(trades)
+        
+    except Exception as e:
+        print(f"Error updating strategy PnL state: {e}")
+        db_manager.rollback()
+        raise
+
+def rebuild_strategy_pnl_state(db_manager) -> int:
+    """
+    Discard the saved PnL state and points and replay every trade from the start.
+    
+    Args:
+        db_manager: An instance of DatabaseManager with an active connection
+        
+    Returns:
+        Number of trades applied
+    """
+    try:
+        db_manager.cursor.execute("TRUNCATE Strategy_PnL_Point, Strategy_PnL_Replay, Strategy_PnL_State")
+        db_manager.commit()
+    except Exception as e:
+        print(f"Error resetting strategy PnL state: {e}")
+        db_manager.rollback()
+        raise
+    return update_strategy_pnl_state(db_manager)
+
+@timed('get_strategy_pnl_series')
+def get_strategy_pnl_series(db_manager, latest_prices: Dict[str, float],
+                            max_points: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Build each strategy's PnL curve from the saved Strategy_PnL_Point rows.
+    
+    Open positions are marked to latest_prices, as pnl_engine.compute_strategy_pnl does,
+    so the result matches a full replay of the trades applied by update_strategy_pnl_state().
+    
+    With max_points, each curve is downsampled in the database: it is cut into
+    max_points // 2 buckets and only the lowest and highest PnL of each bucket (plus
+    the first and last point) are read, so peaks and drawdowns survive while the
+    rows fetched stay bounded however long the history is.
+    
+    Args:
+        db_manager: An instance of DatabaseManager with an active connection
+        latest_prices: Latest traded price per symbol
+        max_points: Approximate number of points to read per strategy; None reads them all
+        
+    Returns:
+        Dict mapping strategy_id to {'times', 'pnls', 'final_pnl'}
+    """
+    if max_points:
+        symbols = list(latest_prices)
+        db_manager.cursor.execute("""
+            WITH prices (symbol, price) AS (
+                SELECT * FROM unnest(%(symbols)s::text[], %(prices)s::double precision[])
+            ),
+            marked AS (
+                SELECT p.strategy_id, s.symbol, p.time, p.position, p.avg_entry_price, p.realized_pnl,
+                       p.realized_pnl + COALESCE((pr.price - p.avg_entry_price) * p.position, 0) AS pnl,
+                       ROW_NUMBER() OVER (PARTITION BY p.strategy_id ORDER BY p.time, p.trade_id) AS rn,
+                       COUNT(*) OVER (PARTITION BY p.strategy_id) AS n
+                FROM Strategy_PnL_Point p
+                JOIN Strategy s ON s.strategy_id = p.strategy_id
+                LEFT JOIN prices pr ON pr.symbol = s.symbol
+                WHERE s.symbol <> ''
+            ),
+            ranked AS (
+                SELECT *,
+                       ROW_NUMBER() OVER (PARTITION BY strategy_id, (rn - 1) * %(buckets)s / n ORDER BY pnl, rn) AS low_rank,
+                       ROW_NUMBER() OVER (PARTITION BY strategy_id, (rn - 1) * %(buckets)s / n ORDER BY pnl DESC, rn) AS high_rank
+                FROM marked
+            )
+            SELECT strategy_id, symbol, time, position, avg_entry_price, realized_pnl
+            FROM ranked
+            WHERE low_rank = 1 OR high_rank = 1 OR rn = 1 OR rn = n
+            ORDER BY strategy_id, rn
+        """, {'symbols': symbols, 'prices': [float(latest_prices[symbol]) for symbol in symbols],
+              'buckets': max(max_points // 2, 1)})
+    else:
+        db_manager.cursor.execute("""
+            SELECT p.strategy_id, s.symbol, p.time, p.position, p.avg_entry_price, p.realized_pnl
+            FROM Strategy_PnL_Point p
+            JOIN Strategy s ON s.strategy_id = p.strategy_id
+            WHERE s.symbol <> ''
+            ORDER BY p.strategy_id, p.time, p.trade_id
+        """)
+    rows = db_manager.cursor.fetchall()
+    
+    if not rows:
+        return {}
+    
+    strategy_column, symbols, times, positions, avg_entry_prices, realized = zip(*rows)
+    positions = np.array(positions, dtype=float)
+    avg_entry_prices = np.array(avg_entry_prices, dtype=float)
+    realized = np.array(realized, dtype=float)
+    
+    strategy_data = {}
+    for strategy_id, indices in pnl_engine.partition_by_strategy(strategy_column).items():
+        pnls = pnl_engine.mark_to_market(positions[indices], avg_entry_prices[indices], realized[indices],
+                                         latest_prices.get(symbols[indices[0]])).tolist()
+        strategy_data[strategy_id] = {
+            'times': [times[i] for i in indices.tolist()],
+            'pnls': pnls,
+            'final_pnl': pnls[-1]
+        }
+    
+    return strategy_data
+
+def rebuild_trade_hourly_rollup(db_manager) -> int:
+    """
+    Recompute Trade_Hourly_Rollup from the whole Trade table.
+    
+    The rollup is kept current by statement triggers on Trade inserts, updates,
+    deletes and truncates; this repairs it, e.g. after the triggers were disabled.
+    
+    Args:
+        db_manager: An instance of DatabaseManager with an active connection
+        
+    Returns:
+        Number of rollup rows written
+    """
+    try:
+        db_manager.cursor.execute("TRUNCATE Trade_Hourly_Rollup")
+        db_manager.cursor.execute("""
+            INSERT INTO Trade_Hourly_Rollup
+                (hour, symbol, strategy_id, trade_count, volume, fee, buy_count, buy_volume, sell_count, sell_volume)
+            SELECT
+                DATE_TRUNC('hour', time), symbol, strategy_id,
+                COUNT(*), SUM(volume), SUM(volume * -0.0005),
+                COUNT(*) FILTER (WHERE side = 'buy'), COALESCE(SUM(volume) FILTER (WHERE side = 'buy'), 0),
+                COUNT(*) FILTER (WHERE side = 'sell'), COALESCE(SUM(volume) FILTER (WHERE side = 'sell'), 0)
+            FROM Trade
+            GROUP BY 1, 2, 3
+        """)
+        rows = db_manager.cursor.rowcount
+        db_manager.commit()
+        print(f"Rebuilt hourly trade rollup: {rows} rows")
+        return rows
+        
+    except Exception as e:
+        print(f"Error rebuilding hourly trade rollup: {e}")
+        db_manager.rollback()
+        raise
+
+def backfill_trade_hourly_rollup(db_manager) -> int:
+    """
+    Fill Trade_Hourly_Rollup from Trade when the rollup is empty but Trade is not.
+    
+    A database that already held trades when the rollup and its triggers were added
+    starts with an empty rollup, and the triggers only fold in later changes. Run on
+    the setup and ingest paths; it costs two index probes once the rollup is filled.
+    
+    Args:
+        db_manager: An instance of DatabaseManager with an active connection
+        
+    Returns:
+        Number of rollup rows written, 0 when nothing needed backfilling
+    """
+    db_manager.cursor.execute("""
+        SELECT EXISTS (SELECT 1 FROM Trade) AND NOT EXISTS (SELECT 1 FROM Trade_Hourly_Rollup)
+    """)
+    if not db_manager.cursor.fetchone()[0]:
+        return 0
+    print("Hourly trade rollup is empty; backfilling it from Trade")
+    return rebuild_trade_hourly_rollup(db_manager)
+
 def insert_dummy_data(db_manager):
     """Insert dummy data for all the advanced PostgreSQL features"""
     try:
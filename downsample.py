@@ -0,0 +1,135 @@
+from typing import Any, List, Sequence, Tuple
+
+def _as_number(value: Any) -> float:
+    """Numeric x coordinate for a datetime or number."""
+    if hasattr(value, 'timestamp'):
+        return value.timestamp()
+    return float(value)
+
+def lttb_indices(xs: Sequence[Any], ys: Sequence[float], threshold: int) -> List[int]:
+    """
+    Pick the indices of the points to keep with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. The points in between are split into
+    threshold - 2 buckets and from each bucket the point forming the largest triangle
+    with the previously kept point and the average of the next bucket is kept, which
+    preserves peaks and drawdowns that plain striding would skip.
+
+    Args:
+        xs: Sorted x values (numbers or datetimes)
+        ys: y values, same length as xs
+        threshold: Target number of points
+
+    Returns:
+        Sorted list of indices into xs/ys; every index when the series is already small enough
+    """
+    length = len(xs)
+    if threshold >= length or threshold < 3:
+        return list(range(length))
+
+    x_values = [_as_number(x) for x in xs]
+    y_values = [float(y) for y in ys]
+
+    bucket_size = (length - 2) / (threshold - 2)
+    indices = [0]
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # Average of the next bucket (the last point for the final bucket)
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, length)
+        if next_start >= next_end:
+            next_start, next_end = length - 1, length
+        count = next_end - next_start
+        average_x = sum(x_values[next_start:next_end]) / count
+        average_y = sum(y_values[next_start:next_end]) / count
+
+        previous_x = x_values[previous]
+        previous_y = y_values[previous]
+        best_area = -1.0
+        best_index = start
+        for index in range(start, end):
+            # Twice the triangle area; the constant factor does not change the winner
+            area = abs((previous_x - average_x) * (y_values[index] - previous_y) -
+                       (previous_x - x_values[index]) * (average_y - previous_y))
+            if area > best_area:
+                best_area = area
+                best_index = index
+
+        indices.append(best_index)
+        previous = best_index
+
+    indices.append(length - 1)
+    return indices
+
+def lttb(xs: Sequence[Any], ys: Sequence[float], threshold: int) -> Tuple[List[Any], List[float]]:
+    """
+    Downsample a series to about threshold points, keeping its visual shape.
+
+    Args:
+        xs: Sorted x values (numbers or datetimes)
+        ys: y values, same length as xs
+        threshold: Target number of points
+
+    Returns:
+        Tuple of (xs, ys) lists for the kept points
+    """
+    indices = lttb_indices(xs, ys, threshold)
+    return [xs[i] for i in indices], [ys[i] for i in indices]
+
+class MinMaxBuckets:
+    """
+    One-pass min/max reduction of a series too long to hold in memory.
+
+    The x range [start, end] is split into a fixed number of buckets and only the
+    lowest and highest point seen in each bucket is kept, so memory is bounded by
+    the bucket count rather than the series length. Points may arrive in any order.
+    The reduced series keeps every peak and drawdown and is small enough to feed
+    into lttb() for the final pass.
+    """
+
+    def __init__(self, start: Any, end: Any, buckets: int):
+        """
+        Initialize the reducer
+
+        Args:
+            start: Smallest x value in the series (number or datetime)
+            end: Largest x value in the series (number or datetime)
+            buckets: Number of buckets; at most twice as many points are kept
+        """
+        self.start = _as_number(start)
+        self.buckets = max(buckets, 1)
+        span = _as_number(end) - self.start
+        self.width = span / self.buckets if span > 0 else 1.0
+        self._low = {}
+        self._high = {}
+
+    def add(self, x: Any, y: float) -> None:
+        """Feed one point into its bucket"""
+        if y is None:
+            return
+        bucket = min(max(int((_as_number(x) - self.start) / self.width), 0), self.buckets - 1)
+        low = self._low.get(bucket)
+        if low is None or y < low[1]:
+            self._low[bucket] = (x, y)
+        high = self._high.get(bucket)
+        if high is None or y > high[1]:
+            self._high[bucket] = (x, y)
+
+    def points(self) -> Tuple[List[Any], List[float]]:
+        """
+        Get the kept points in x order
+
+        Returns:
+            Tuple of (xs, ys) lists
+        """
+        xs, ys = [], []
+        for bucket in sorted(self._low):
+            kept = {self._low[bucket], self._high[bucket]}
+            for x, y in sorted(kept, key=lambda point: _as_number(point[0])):
+                xs.append(x)
+                ys.append(y)
+        return xs, ys
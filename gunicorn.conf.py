@@ -0,0 +1,44 @@
+# Gunicorn settings for the dashboard: gunicorn -c gunicorn.conf.py wsgi:application
+#
+# The app and its heavy imports (matplotlib, numpy) are loaded once in the master
+# and shared copy-on-write by the workers. Worker and thread counts come from the
+# environment:
+#   WEB_BIND          address to listen on (default 0.0.0.0:5000)
+#   WEB_WORKERS       worker processes (default: one per CPU core)
+#   WEB_THREADS       threads per worker (default 8); each open /api/stream holds one,
+#                     up to STREAM_MAX_CLIENTS per worker (default half of WEB_THREADS)
+#   WEB_TIMEOUT       seconds before a silent worker is killed and replaced (default 60)
+#   WEB_MAX_REQUESTS  recycle a worker after this many requests (default 0 = never)
+# Set PROMETHEUS_MULTIPROC_DIR to an empty directory so /metrics merges every worker's samples.
+#
+# Graceful restarts: `kill -HUP <master>` starts fresh workers and lets the old ones
+# finish their requests. Since the app is preloaded, HUP keeps the old code; to deploy
+# new code send USR2 (starts a new master), then WINCH and QUIT to the old master.
+import multiprocessing
+import os
+
+bind = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 8))
+preload_app = True
+
+timeout = int(os.environ.get('WEB_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+def post_fork(server, worker):
+    """Give every worker its own database pool instead of the master's"""
+    import wsgi
+    wsgi.post_fork()
+    server.log.info(f"Worker {worker.pid} ready")
+
+def child_exit(server, worker):
+    """Drop a dead worker's metric samples (with PROMETHEUS_MULTIPROC_DIR set, see metrics.py)"""
+    import metrics
+    metrics.mark_process_dead(worker.pid)
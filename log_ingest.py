@@ -0,0 +1,383 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+from typing import Dict, List, Any, Optional, Iterator, Iterable, Tuple
+
+from db_manager import (DatabaseManager, DEFAULT_PORTFOLIO_ID, ORDERS_LOG_PATH, TRADES_LOG_PATH,
+                        iter_orders_log, iter_trades_log, insert_new_strategies, update_strategy_pnl_state,
+                        backfill_trade_hourly_rollup, _scan_trade_lines, _scan_order_lines, _register_order_strategy)
+
+# Where per-file ingest checkpoints are persisted between runs
+CHECKPOINT_PATH = '.ingest_checkpoints.json'
+
+def load_checkpoints(checkpoint_path: str = CHECKPOINT_PATH) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the per-file ingest checkpoints.
+
+    Returns:
+        A dict mapping absolute log file paths to {'offset', 'inode', 'last_time'}
+    """
+    try:
+        with open(checkpoint_path, 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+def save_checkpoints(checkpoints: Dict[str, Dict[str, Any]], checkpoint_path: str = CHECKPOINT_PATH) -> None:
+    """Persist the ingest checkpoints atomically (write to a temp file, then rename)."""
+    temp_path = f"{checkpoint_path}.tmp"
+    with open(temp_path, 'w') as file:
+        json.dump(checkpoints, file, indent=2)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, checkpoint_path)
+
+def _find_rotated_file(log_file_path: str, inode: int) -> Optional[str]:
+    """Find the file a log was rotated to (e.g. Orders.log.1) by its inode."""
+    directory = os.path.dirname(os.path.abspath(log_file_path))
+    prefix = os.path.basename(log_file_path)
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.startswith(prefix) and os.path.isfile(path) and os.stat(path).st_ino == inode:
+            return path
+    return None
+
+class _LineReader:
+    """
+    Iterate the complete lines of a file from a byte offset.
+
+    A trailing line without a newline is still being written, so it is left for the
+    next pass, unless final is set: a rotated file gets no more writes, so its last
+    line is complete with or without a newline. offset always points just past the
+    last line handed out.
+    """
+    def __init__(self, path: str, offset: int, final: bool = False):
+        self.path = path
+        self.offset = offset
+        self.final = final
+
+    def __iter__(self) -> Iterator[str]:
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            for line in file:
+                if not line.endswith(b'\n') and not self.final:
+                    break
+                self.offset += len(line)
+                yield line.decode('utf-8', errors='replace')
+
+def _scan_records(kind: str, lines: Iterable[str], unique_strategy_ids: Dict[str, Dict[str, str]],
+                  processed_orders: set, stats: Optional[Counter] = None) -> Iterator[Tuple]:
+    """Parse trade or order rows out of log lines, tracking discovered strategies and skipped/malformed lines."""
+    if kind == 'trades':
+        yield from _scan_trade_lines(lines, unique_strategy_ids, stats)
+    else:
+        for _, strategy_id, symbol, order in _scan_order_lines(lines, processed_orders, stats):
+            _register_order_strategy(unique_strategy_ids, strategy_id, symbol)
+            if order is not None:
+                yield order
+
+def ingest_log_incremental(db_manager, log_file_path: str, kind: str,
+                           checkpoint_path: str = CHECKPOINT_PATH, follow: bool = False,
+                           batch_size: int = 5000, flush_interval: float = 5.0,
+                           poll_interval: float = 1.0, portfolio_id: int = DEFAULT_PORTFOLIO_ID) -> int:
+    """
+    Ingest only the part of Orders.log / Trades.log appended since the last run.
+
+    A checkpoint of byte offset, inode and last record time is persisted per file after
+    every committed batch. On the next run parsing resumes at the checkpointed offset.
+    If the file was rotated (its inode changed), the rest of the rotated file, including
+    a last line without a newline, is ingested first when it can still be found next to
+    the log, and the new file is read from the start. A file that shrank below the checkpoint is treated as truncated and re-read.
+
+    Args:
+        db_manager: An instance of DatabaseManager with an active connection
+        log_file_path: Path to the Orders.log or Trades.log file
+        kind: 'orders' or 'trades'
+        checkpoint_path: JSON file holding the checkpoints
+        follow: Keep tailing the file until interrupted
+        batch_size: Flush once this many rows are pending
+        flush_interval: In follow mode, flush pending rows after this many seconds
+        poll_interval: In follow mode, seconds to sleep when no new data is available
+        portfolio_id: The portfolio newly discovered strategies belong to
+
+    Returns:
+        The number of rows handed to the database
+    """
+    if kind not in ('orders', 'trades'):
+        raise ValueError(f"kind must be 'orders' or 'trades', not {kind!r}")
+    if kind == 'trades':
+        # The rollup triggers only see new trades; build it from history first if it is empty
+        backfill_trade_hourly_rollup(db_manager)
+
+    key = os.path.abspath(log_file_path)
+    checkpoints = load_checkpoints(checkpoint_path)
+    checkpoint = checkpoints.get(key, {'offset': 0, 'inode': None, 'last_time': None})
+    # Read position; runs ahead of the persisted checkpoint while rows are pending
+    read_offset = checkpoint['offset']
+    read_inode = checkpoint['inode']
+
+    unique_strategy_ids = {}
+    inserted_strategy_ids = set()
+    # Orders already taken from a NEW/OPEN record, only while they are pending: once
+    # inserted, later records for them (in this or any later run) hit ON CONFLICT DO NOTHING
+    processed_orders = set()
+    stats = Counter()
+    pending = []
+    total = 0
+    last_flush = time.monotonic()
+
+    def flush(offset: int, inode: int) -> None:
+        """Insert the pending rows, then advance the checkpoint to offset."""
+        nonlocal pending, total, last_flush
+        if pending:
+            insert_new_strategies(db_manager, unique_strategy_ids, inserted_strategy_ids, portfolio_id)
+            if kind == 'trades':
+                db_manager.insert_trades(pending)
+                update_strategy_pnl_state(db_manager)
+            else:
+                db_manager.insert_orders(pending)
+                processed_orders.clear()
+            last_time = max(row[1] for row in pending).isoformat()
+            if checkpoint['last_time'] is None or last_time > checkpoint['last_time']:
+                checkpoint['last_time'] = last_time
+            total += len(pending)
+            pending = []
+        checkpoint['offset'] = offset
+        checkpoint['inode'] = inode
+        checkpoints[key] = checkpoint
+        save_checkpoints(checkpoints, checkpoint_path)
+        last_flush = time.monotonic()
+
+    def drain(path: str, offset: int, inode: int, final: bool = False) -> int:
+        """Parse the complete lines after offset (all of them if final), flushing on the size/time threshold."""
+        reader = _LineReader(path, offset, final)
+        for row in _scan_records(kind, reader, unique_strategy_ids, processed_orders, stats):
+            pending.append(row)
+            if len(pending) >= batch_size or (follow and time.monotonic() - last_flush >= flush_interval):
+                flush(reader.offset, inode)
+        return reader.offset
+
+    try:
+        while True:
+            try:
+                stat = os.stat(log_file_path)
+            except FileNotFoundError:
+                if not follow:
+                    print(f"Log file not found: {log_file_path}")
+                    break
+                # Mid-rotation: the new file has not been created yet
+                time.sleep(poll_interval)
+                continue
+
+            if read_inode is not None and read_inode != stat.st_ino:
+                rotated_path = _find_rotated_file(log_file_path, read_inode)
+                if rotated_path:
+                    print(f"{log_file_path} was rotated; finishing {rotated_path} from offset {read_offset}")
+                    # Commit the tail of the old file before the checkpoint moves to the new one
+                    flush(drain(rotated_path, read_offset, read_inode, final=True), read_inode)
+                else:
+                    print(f"{log_file_path} was rotated and the old file is gone; starting the new file")
+                read_offset = 0
+            elif stat.st_size < read_offset:
+                print(f"{log_file_path} was truncated; reading from the start")
+                read_offset = 0
+            read_inode = stat.st_ino
+
+            read_offset = drain(log_file_path, read_offset, read_inode)
+            due = not follow or len(pending) >= batch_size or time.monotonic() - last_flush >= flush_interval
+            moved = (read_offset, read_inode) != (checkpoint['offset'], checkpoint['inode'])
+            if due and (pending or moved):
+                flush(read_offset, read_inode)
+
+            if not follow:
+                break
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        # Pending rows are not committed; they are re-read from the checkpoint next run
+        print("Stopping log tailing")
+
+    print(f"Incrementally ingested {total} {kind} from {log_file_path} "
+          f"({stats['skipped']} records skipped, {stats['malformed']} malformed lines)")
+    return total
+
+# Per-process state of sharded ingest workers, set up by _init_worker
+_worker_db_params = None
+_worker_registered = None
+_worker_lock = None
+_worker_portfolio_id = None
+
+def log_kind(log_file_path: str) -> Optional[str]:
+    """Classify a log file as 'orders' or 'trades' by its name, or None if it is neither."""
+    name = os.path.basename(log_file_path)
+    if name.startswith('Orders'):
+        return 'orders'
+    if name.startswith('Trades'):
+        return 'trades'
+    return None
+
+def resolve_log_files(source: str) -> List[str]:
+    """Expand a directory or glob pattern into the Orders/Trades log files it contains."""
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, '**', '*.log*'), recursive=True)
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(path for path in paths if os.path.isfile(path) and log_kind(path))
+
+def _init_worker(db_params: Dict[str, Any], registered, lock, portfolio_id: int) -> None:
+    """Set up the worker process's shared state; connections are opened per file by _ingest_file."""
+    global _worker_db_params, _worker_registered, _worker_lock, _worker_portfolio_id
+    _worker_db_params = db_params
+    _worker_registered = registered
+    _worker_lock = lock
+    _worker_portfolio_id = portfolio_id
+
+def _register_strategies(db_manager, unique_strategy_ids: Dict[str, Dict[str, str]], seen: set) -> None:
+    """
+    Insert strategies no worker has inserted yet.
+
+    The shared registry is checked and updated under a cross-process lock, and the
+    insert is committed before the lock is released, so each strategy is upserted
+    exactly once and exists before any worker inserts rows that reference it.
+    """
+    new_strategy_ids = [strategy_id for strategy_id in unique_strategy_ids if strategy_id not in seen]
+    if not new_strategy_ids:
+        return
+    with _worker_lock:
+        unregistered = {strategy_id: unique_strategy_ids[strategy_id] for strategy_id in new_strategy_ids
+                        if strategy_id not in _worker_registered}
+        if unregistered:
+            insert_new_strategies(db_manager, unregistered, set(), _worker_portfolio_id)
+            _worker_registered.update(dict.fromkeys(unregistered, True))
+    seen.update(new_strategy_ids)
+
+def _ingest_file(task: Tuple[str, int]) -> Tuple[str, int, int, int]:
+    """
+    Worker: stream one log file into the database with bulk inserts.
+
+    The connection is opened for the file and closed when it is done, so nothing is
+    left open when the pool is terminated.
+    """
+    log_file_path, batch_size = task
+    kind = log_kind(log_file_path)
+    batches = iter_trades_log if kind == 'trades' else iter_orders_log
+
+    db_manager = DatabaseManager(**_worker_db_params)
+    db_manager.connect()
+    try:
+        insert = db_manager.insert_trades if kind == 'trades' else db_manager.insert_orders
+        seen = set()
+        parsed = inserted = skipped = 0
+        for rows, unique_strategy_ids in batches(log_file_path, batch_size):
+            _register_strategies(db_manager, unique_strategy_ids, seen)
+            batch_inserted, batch_skipped = insert(rows)
+            parsed += len(rows)
+            inserted += batch_inserted
+            skipped += batch_skipped
+    finally:
+        db_manager.disconnect()
+    return log_file_path, parsed, inserted, skipped
+
+def ingest_log_files(db_params: Dict[str, Any], source: str, workers: Optional[int] = None,
+                     batch_size: int = 5000, portfolio_id: int = DEFAULT_PORTFOLIO_ID) -> Dict[str, Tuple[int, int, int]]:
+    """
+    Ingest every Orders/Trades log under a directory or glob, one file per worker process.
+
+    Each worker opens a connection per file and bulk-inserts it in batches. Strategy
+    discovery is coordinated through a shared registry so every strategy is inserted once.
+
+    Args:
+        db_params: Connection parameters accepted by DatabaseManager
+        source: Directory (searched recursively for *.log*) or glob pattern, e.g. "logs/*/Trades.log*"
+        workers: Number of worker processes (defaults to the number of CPUs, capped at the file count)
+        batch_size: Rows per bulk insert
+        portfolio_id: The portfolio newly discovered strategies belong to
+
+    Returns:
+        A dict mapping each file to (parsed, inserted, skipped) row counts
+    """
+    log_files = resolve_log_files(source)
+    if not log_files:
+        print(f"No Orders/Trades log files found for {source}")
+        return {}
+    workers = min(workers or os.cpu_count() or 1, len(log_files))
+    print(f"Ingesting {len(log_files)} log files with {workers} workers")
+
+    has_trades = any(log_kind(path) == 'trades' for path in log_files)
+    if has_trades:
+        # The rollup triggers only see new trades; build it from history first if it is empty
+        db_manager = DatabaseManager(**db_params)
+        try:
+            db_manager.connect()
+            backfill_trade_hourly_rollup(db_manager)
+        finally:
+            db_manager.disconnect()
+
+    results = {}
+    with multiprocessing.Manager() as manager:
+        registered = manager.dict()
+        lock = manager.Lock()
+        with multiprocessing.Pool(workers, initializer=_init_worker,
+                                  initargs=(db_params, registered, lock, portfolio_id)) as pool:
+            for log_file_path, parsed, inserted, skipped in pool.imap_unordered(
+                    _ingest_file, [(path, batch_size) for path in log_files]):
+                print(f"{log_file_path}: {parsed} parsed, {inserted} inserted, {skipped} skipped")
+                results[log_file_path] = (parsed, inserted, skipped)
+
+    print(f"Ingested {sum(parsed for parsed, _, _ in results.values())} rows from {len(results)} files")
+
+    # Files finish out of time order, so PnL state is brought up to date once all trades are in
+    if any(log_kind(path) == 'trades' for path in results):
+        db_manager = DatabaseManager(**db_params)
+        try:
+            db_manager.connect()
+            update_strategy_pnl_state(db_manager)
+        finally:
+            db_manager.disconnect()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest Orders.log / Trades.log files")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    tail_parser = subparsers.add_parser('tail', help="Incrementally ingest one log from its checkpoint")
+    tail_parser.add_argument('kind', choices=['orders', 'trades'])
+    tail_parser.add_argument('--path', help="Log file (defaults to the trading system's log for KIND)")
+    tail_parser.add_argument('--follow', action='store_true', help="Keep tailing the file")
+    tail_parser.add_argument('--batch-size', type=int, default=5000)
+    tail_parser.add_argument('--flush-interval', type=float, default=5.0)
+    tail_parser.add_argument('--checkpoint', default=CHECKPOINT_PATH)
+
+    shard_parser = subparsers.add_parser('shard', help="Ingest many rotated logs in parallel")
+    shard_parser.add_argument('source', help="Directory or glob of Orders/Trades log files")
+    shard_parser.add_argument('--workers', type=int, default=None)
+    shard_parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    db_params = {
+        'host': '34.148.223.31',
+        'database': 'proj1part2',
+        'user': 'ch3884',
+        'password': '@Skills39'  # Replace with your actual password
+    }
+
+    if args.command == 'shard':
+        ingest_log_files(db_params, args.source, workers=args.workers, batch_size=args.batch_size)
+    else:
+        db_manager = DatabaseManager(**db_params)
+        try:
+            db_manager.connect()
+            ingest_log_incremental(
+                db_manager,
+                args.path or (ORDERS_LOG_PATH if args.kind == 'orders' else TRADES_LOG_PATH),
+                args.kind,
+                checkpoint_path=args.checkpoint,
+                follow=args.follow,
+                batch_size=args.batch_size,
+                flush_interval=args.flush_interval
+            )
+        finally:
+            db_manager.disconnect()
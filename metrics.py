@@ -0,0 +1,117 @@
+import functools
+import os
+import time
+
+try:
+    from prometheus_client import CollectorRegistry, Histogram, generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+    from prometheus_client import multiprocess
+except ImportError:  # prometheus_client is optional; without it nothing is recorded
+    Histogram = None
+
+# Seconds; from a cached catalog lookup up to a cold full-history chart render
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+if Histogram is not None:
+    REQUEST_LATENCY = Histogram('dashboard_request_seconds', 'Time to build a response, per Flask route',
+                                ['route', 'method', 'status'], buckets=LATENCY_BUCKETS)
+    QUERY_LATENCY = Histogram('dashboard_db_query_seconds', 'Database query latency, per logical query name',
+                              ['query'], buckets=LATENCY_BUCKETS)
+    RENDER_LATENCY = Histogram('dashboard_chart_render_seconds', 'Chart render time (cache misses only), per chart',
+                               ['chart'], buckets=LATENCY_BUCKETS)
+else:
+    REQUEST_LATENCY = QUERY_LATENCY = RENDER_LATENCY = None
+
+def observe(histogram, seconds: float, *labels) -> None:
+    """Record one observation, if metrics are enabled"""
+    if histogram is not None:
+        histogram.labels(*labels).observe(seconds)
+
+class _Timer:
+    """Times a with-block, or every call of a decorated function, into a histogram under one label"""
+
+    def __init__(self, histogram, label: str):
+        self.histogram = histogram
+        self.label = label
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.histogram, time.perf_counter() - self._start, self.label)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # A fresh timer per call, so concurrent calls from other threads don't share a start time
+            with _Timer(self.histogram, self.label):
+                return func(*args, **kwargs)
+        return wrapper
+
+def timed(name: str) -> _Timer:
+    """
+    Time a database query under a logical name, as a decorator or a with-block.
+
+    Usage:
+        @timed('get_orders')
+        def get_orders(db_manager, limit=10): ...
+
+        with timed('row_count'):
+            db.cursor.execute(...)
+
+    Args:
+        name: Query name used as the 'query' label
+    """
+    return _Timer(QUERY_LATENCY, name)
+
+def timed_render(func):
+    """Decorate a chart generator to time its renders; place it below @cached_chart so hits are not counted"""
+    return _Timer(RENDER_LATENCY, func.__name__)(func)
+
+def instrument(app) -> None:
+    """
+    Record the latency of every request to a Flask app, labelled by its route rule.
+
+    Streamed responses are timed until the response is built, not until the
+    stream ends.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_latency(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            # The rule, not the path, keeps the label set bounded (/api/series/portfolio/<int:portfolio_id>)
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            observe(REQUEST_LATENCY, time.perf_counter() - started, route, request.method, str(response.status_code))
+        return response
+
+def render_latest():
+    """
+    Render every metric in the Prometheus text format.
+
+    When PROMETHEUS_MULTIPROC_DIR is set (gunicorn), the samples of all worker
+    processes are merged, so any worker can answer a scrape.
+
+    Returns:
+        Tuple of (body, content_type), or None if prometheus_client is not installed
+    """
+    if Histogram is None:
+        return None
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def mark_process_dead(pid: int) -> None:
+    """Clean up a dead worker's samples in multiprocess mode; call from gunicorn's child_exit hook"""
+    if Histogram is not None and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
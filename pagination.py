@@ -0,0 +1,226 @@
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+class InvalidPageToken(ValueError):
+    """Raised when a page token cannot be decoded."""
+
+def encode_page_token(direction: str, time_value: datetime, row_id: Any = None) -> str:
+    """
+    Encode a keyset position as an opaque, URL-safe page token.
+
+    Without row_id the token is time-only, for rows whose time alone is unique
+    within what is paged (e.g. one portfolio's snapshots).
+
+    Args:
+        direction: 'next' or 'prev', the direction to page in from the boundary row
+        time_value: Time of the boundary row
+        row_id: Primary key of the boundary row, or None for a time-only token
+
+    Returns:
+        The page token
+    """
+    position = [direction, time_value.isoformat()] if row_id is None else [direction, time_value.isoformat(), row_id]
+    payload = json.dumps(position, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_page_token(token: str) -> Tuple[str, datetime, Any]:
+    """
+    Decode a page token made by encode_page_token.
+
+    Returns:
+        Tuple of (direction, time, row_id); row_id is None for a time-only token
+
+    Raises:
+        InvalidPageToken: If the token is malformed
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(position, list) or len(position) not in (2, 3):
+            raise ValueError("expected [direction, time] or [direction, time, id]")
+        direction, time_text, row_id = (position + [None])[:3]
+        if direction not in ('next', 'prev'):
+            raise ValueError(f"unknown direction {direction!r}")
+        return direction, datetime.fromisoformat(time_text), row_id
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise InvalidPageToken(f"Invalid page token: {e}") from e
+
+def encode_stream_token(position: Dict[str, Any]) -> str:
+    """
+    Encode a live-update position (the last key seen per table) as an opaque token.
+
+    Args:
+        position: JSON-serializable mapping of table name to its last key
+
+    Returns:
+        The token, safe to use as an SSE event id or URL parameter
+    """
+    payload = json.dumps(position, separators=(',', ':'), sort_keys=True)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_stream_token(token: str) -> Dict[str, Any]:
+    """
+    Decode a token made by encode_stream_token.
+
+    Raises:
+        InvalidPageToken: If the token is malformed
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(position, dict):
+            raise ValueError("position is not an object")
+        return position
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise InvalidPageToken(f"Invalid stream token: {e}") from e
+
+def fetch_keyset_page(db_manager, table_name: str, columns: List[str], id_column: str,
+                      per_page: int, token: Optional[str] = None, last: bool = False,
+                      time_column: str = 'time') -> Dict[str, Any]:
+    """
+    Fetch one newest-first page of a table by seeking on (time, id).
+
+    Rows are ordered by (time_column, id_column) descending, so with an index on
+    (time_column, id_column) every page costs O(per_page) however deep it is, and
+    rows inserted between requests do not shift the page boundaries.
+
+    Args:
+        db_manager: DatabaseManager with an open cursor
+        table_name: Table to page through
+        columns: Columns to select; must include time_column and id_column
+        id_column: Unique tie-breaker column (the primary key)
+        per_page: Rows per page
+        token: Page token from a previous page (None for the first page)
+        last: Fetch the oldest page instead (token is ignored)
+        time_column: Timestamp column to order by
+
+    Returns:
+        Dict with 'rows' (newest first), 'next_token' (older rows) and
+        'prev_token' (newer rows); a token is None when there is no such page
+
+    Raises:
+        InvalidPageToken: If token is malformed
+    """
+    per_page = max(per_page, 1)
+    key = f"({time_column}, {id_column})"
+    query = f"SELECT {', '.join(columns)} FROM {table_name}"
+    params: List[Any] = []
+
+    if last:
+        direction = 'prev'
+    elif token:
+        direction, boundary_time, boundary_id = decode_page_token(token)
+        if boundary_id is None:
+            raise InvalidPageToken("Invalid page token: expected a (time, id) position")
+        query += f" WHERE {key} {'<' if direction == 'next' else '>'} (%s, %s)"
+        params.extend([boundary_time, boundary_id])
+    else:
+        direction = 'next'
+
+    # Walking towards newer rows reads the index ascending and flips the page afterwards
+    order = 'DESC' if direction == 'next' else 'ASC'
+    query += f" ORDER BY {time_column} {order}, {id_column} {order} LIMIT %s"
+    # One extra row tells whether another page exists beyond this one
+    params.append(per_page + 1)
+
+    db_manager.cursor.execute(query, params)
+    rows = db_manager.cursor.fetchall()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+
+    time_index = columns.index(time_column)
+    id_index = columns.index(id_column)
+
+    def boundary(row_direction: str, row: Tuple) -> str:
+        return encode_page_token(row_direction, row[time_index], row[id_index])
+
+    if not rows:
+        return {'rows': [], 'next_token': None, 'prev_token': None}
+
+    if direction == 'next':
+        # A token means we came from a newer page, so one exists
+        older = has_more
+        newer = token is not None
+    else:
+        older = not last
+        newer = has_more
+
+    return {
+        'rows': rows,
+        'next_token': boundary('next', rows[-1]) if older else None,
+        'prev_token': boundary('prev', rows[0]) if newer else None
+    }
+
+class RowCountCache:
+    """
+    Cheap total row counts for paginated pages.
+
+    Counts come from the planner's estimate (pg_class.reltuples), which costs a
+    catalog lookup instead of a full scan. Small tables, and tables that have not
+    been analyzed yet, are counted exactly since that is cheap or the only option.
+    An exact count can always be requested. Values are cached for ttl seconds.
+    """
+
+    def __init__(self, ttl: float = 30.0, exact_below: int = 10000):
+        """
+        Initialize the count cache
+
+        Args:
+            ttl: Seconds a count is reused before it is looked up again
+            exact_below: Estimates under this many rows are replaced by an exact count
+        """
+        self.ttl = ttl
+        self.exact_below = exact_below
+        self._counts: Dict[str, Tuple[int, bool, float]] = {}
+        self._lock = threading.Lock()
+
+    def count(self, db_manager, table_name: str, exact: bool = False) -> Tuple[int, bool]:
+        """
+        Get the number of rows in a table
+
+        Args:
+            db_manager: DatabaseManager with an open cursor
+            table_name: Table to count
+            exact: Run COUNT(*) instead of using the planner estimate
+
+        Returns:
+            Tuple of (row_count, is_exact)
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counts.get(table_name)
+        if cached is not None:
+            value, is_exact, counted_at = cached
+            if now - counted_at < self.ttl and (is_exact or not exact):
+                return value, is_exact
+
+        value, is_exact = None, False
+        if not exact:
+            db_manager.cursor.execute(
+                "SELECT reltuples::BIGINT FROM pg_class WHERE oid = %s::regclass", (table_name,))
+            row = db_manager.cursor.fetchone()
+            # reltuples is -1 (or 0 before PostgreSQL 14) until the table is first analyzed
+            if row is not None and row[0] >= self.exact_below:
+                value = row[0]
+
+        if value is None:
+            db_manager.cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+            value, is_exact = db_manager.cursor.fetchone()[0], True
+
+        with self._lock:
+            self._counts[table_name] = (value, is_exact, now)
+        return value, is_exact
+
+    def invalidate(self, table_name: Optional[str] = None) -> None:
+        """Forget the cached count for one table, or for all tables"""
+        with self._lock:
+            if table_name is None:
+                self._counts.clear()
+            else:
+                self._counts.pop(table_name, None)
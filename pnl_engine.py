@@ -0,0 +1,144 @@
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+def partition_by_strategy(strategy_ids: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    Group trade row indices by strategy in one pass.
+
+    A stable sort keeps each strategy's trades in their original (time) order.
+
+    Args:
+        strategy_ids: Strategy id of every trade row
+
+    Returns:
+        Dict mapping strategy_id to an array of row indices
+    """
+    if len(strategy_ids) == 0:
+        return {}
+    unique_ids, codes = np.unique(np.asarray(strategy_ids, dtype=object), return_inverse=True)
+    order = np.argsort(codes, kind='stable')
+    boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+    return {strategy_id: indices for strategy_id, indices in zip(unique_ids, np.split(order, boundaries))}
+
+def replay_positions(is_buy: np.ndarray, prices: np.ndarray, qtys: np.ndarray, volumes: np.ndarray,
+                     position: float = 0.0, avg_entry_price: float = 0.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Track position, average entry price and realized PnL through one strategy's trades.
+
+    Buys add to a long or cover a short, sells add to a short or reduce a long. Adding
+    updates the volume-weighted entry price; reducing realizes PnL against it; flipping
+    through flat resets the entry price to the flipping trade's price.
+
+    The state is path dependent, so this is a single loop over plain floats pulled
+    out of the column arrays; everything downstream of it is vectorized.
+
+    Args:
+        is_buy: Boolean array, True for buy trades
+        prices: Trade prices
+        qtys: Trade quantities
+        volumes: Trade volumes (price * qty)
+        position: Position before the first trade, to resume from saved state
+        avg_entry_price: Average entry price before the first trade
+
+    Returns:
+        Tuple of (position, avg_entry_price, realized_pnl) arrays, the state after each
+        trade and the PnL realized by each trade
+    """
+    count = len(prices)
+    positions = np.empty(count)
+    avg_entry_prices = np.empty(count)
+    realized = np.zeros(count)
+
+    rows = zip(is_buy.tolist(), prices.tolist(), qtys.tolist(), volumes.tolist())
+    for i, (buy, price, qty, volume) in enumerate(rows):
+        if buy:
+            if position >= 0:
+                total_cost = position * avg_entry_price + volume
+                position += qty
+                avg_entry_price = total_cost / position if position > 0 else 0.0
+            else:
+                realized[i] = (avg_entry_price - price) * min(abs(position), qty)
+                position += qty
+                if position > 0:
+                    avg_entry_price = price
+                elif position == 0:
+                    avg_entry_price = 0.0
+        else:
+            if position <= 0:
+                total_cost = abs(position) * avg_entry_price + volume
+                position -= qty
+                avg_entry_price = total_cost / abs(position) if position < 0 else 0.0
+            else:
+                realized[i] = (price - avg_entry_price) * min(position, qty)
+                position -= qty
+                if position < 0:
+                    avg_entry_price = price
+                elif position == 0:
+                    avg_entry_price = 0.0
+        positions[i] = position
+        avg_entry_prices[i] = avg_entry_price
+
+    return positions, avg_entry_prices, realized
+
+def mark_to_market(positions: np.ndarray, avg_entry_prices: np.ndarray, realized_cumulative: np.ndarray,
+                   latest_price: Optional[float]) -> np.ndarray:
+    """
+    Total PnL after each trade: realized so far plus the open position marked to latest_price.
+
+    Marking a short is (avg - latest) * |position|, which equals (latest - avg) * position,
+    so one expression covers both sides. Without a latest price only realized PnL counts.
+    """
+    if latest_price is None:
+        return realized_cumulative + 0.0
+    # A NUMERIC price arrives as a Decimal, which does not mix with float arrays
+    unrealized = np.where(positions != 0, (float(latest_price) - avg_entry_prices) * positions, 0.0)
+    return realized_cumulative + unrealized
+
+def compute_strategy_pnl(strategies: Sequence[Tuple], trades: Sequence[Tuple],
+                         latest_prices: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
+    """
+    Compute realized plus unrealized PnL for each strategy after every trade.
+
+    Open positions are marked to the latest traded price of the strategy's symbol.
+
+    Args:
+        strategies: (strategy_id, symbol, ...) rows, in the order to report them
+        trades: (strategy_id, time, side, price, qty, volume) rows ordered by time within each strategy
+        latest_prices: Latest traded price per symbol
+
+    Returns:
+        Dict mapping strategy_id to {'times', 'pnls', 'final_pnl'} for every strategy
+        that has a symbol and at least one trade
+    """
+    if not trades:
+        return {}
+
+    strategy_column, times, sides, prices, qtys, volumes = zip(*trades)
+    is_buy = np.array([side == 'buy' for side in sides])
+    prices = np.array(prices, dtype=float)
+    qtys = np.array(qtys, dtype=float)
+    volumes = np.array(volumes, dtype=float)
+
+    partitions = partition_by_strategy(strategy_column)
+
+    strategy_data = {}
+    for strategy in strategies:
+        strategy_id, symbol = strategy[0], strategy[1]
+        indices = partitions.get(strategy_id)
+        if indices is None or not symbol:
+            continue
+
+        positions, avg_entry_prices, realized = replay_positions(
+            is_buy[indices], prices[indices], qtys[indices], volumes[indices])
+
+        pnls = mark_to_market(positions, avg_entry_prices, np.cumsum(realized),
+                              latest_prices.get(symbol)).tolist()
+
+        strategy_data[strategy_id] = {
+            'times': [times[i] for i in indices.tolist()],
+            'pnls': pnls,
+            'final_pnl': pnls[-1]
+        }
+
+    return strategy_data
@@ -1,16 +1,36 @@
-from flask import Flask, render_template, request, jsonify
-import pandas as pd
+from flask import Flask, render_template, request, jsonify, abort, make_response, stream_template, stream_with_context, g
+from jinja2 import FileSystemBytecodeCache
+import click
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import io
 import base64
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from bisect import bisect_left
 import os
-from db_manager import DatabaseManager
+import time
+import functools
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as PanelTimeout, wait, FIRST_COMPLETED
+from db_manager import DatabaseManager, update_strategy_pnl_state, rebuild_strategy_pnl_state, get_strategy_pnl_series
+from chart_cache import ChartCache, cached_chart
+from downsample import lttb, MinMaxBuckets
+from pagination import (fetch_keyset_page, encode_page_token, decode_page_token, encode_stream_token,
+                        decode_stream_token, InvalidPageToken, RowCountCache)
+from compression import compress_response, buffer_chunks
+import metrics
+from metrics import timed, timed_render
+from stream_feed import StreamFeed
 
 app = Flask(__name__)
 
+# Templates are shipped with the code and compiled once; the bytecode cache lets
+# every worker skip compilation (fill it at deploy time: flask --app server precompile-templates)
+TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR', os.path.join(app.root_path, '.jinja_cache'))
+os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+
 # Configure database connection
 DB_CONFIG = {
     'host': '34.148.223.31',
@@ -19,9 +39,68 @@ DB_CONFIG = {
     'password': '@Skills39'
 }
 
+# Connection pool sizing; each request checks out its own connection.
+# Every worker process has its own pool, so size DB_POOL_MAX x workers to fit max_connections
+POOL_CONFIG = {
+    'pool_min': int(os.environ.get('DB_POOL_MIN', 2)),
+    'pool_max': int(os.environ.get('DB_POOL_MAX', 10)),
+    'checkout_timeout': 30.0
+}
+
 # Create a database manager instance
-db_manager = DatabaseManager(**DB_CONFIG)
+db_manager = DatabaseManager(**DB_CONFIG, **POOL_CONFIG)
+
+# Dashboard panels run concurrently, each on its own pooled connection;
+# a panel that misses its timeout is shown as unavailable and its query is
+# cancelled by statement_timeout. The executor leaves PANEL_RESERVED_CONNECTIONS
+# of the pool to other requests, and one dashboard runs at most
+# PANELS_PER_REQUEST panels at a time so a slow one cannot take every thread
+PANEL_RESERVED_CONNECTIONS = 2
+PANEL_WORKERS = max(POOL_CONFIG['pool_max'] - PANEL_RESERVED_CONNECTIONS, 1)
+PANELS_PER_REQUEST = 4
+PANEL_TIMEOUTS = {
+    'strategies': 5.0,
+    'orders': 5.0,
+    'trades': 5.0,
+    'logs': 5.0,
+    'snapshots': 5.0,
+    'portfolio_plot': 15.0,
+    'trade_volume_plot': 15.0,
+    'trade_fee_plot': 15.0,
+    'strategy_pnl_plot': 20.0
+}
+DEFAULT_PANEL_TIMEOUT = 10.0
+
+panel_executor = ThreadPoolExecutor(max_workers=PANEL_WORKERS, thread_name_prefix='panel')
+
+# Rendered charts are reused until their data watermark moves or the TTL expires
+CHART_CACHE_CONFIG = {
+    'max_entries': 64,
+    'ttl': 300.0
+}
 
+chart_cache = ChartCache(**CHART_CACHE_CONFIG)
+
+# Series are downsampled (LTTB) to about this many points before plotting,
+# roughly one per horizontal pixel; the JSON API takes ?points=N instead
+CHART_POINTS = 1000
+API_DEFAULT_POINTS = 2000
+
+# Paginated pages show planner row estimates, reused for a short while;
+# ?exact_count=1 asks for a real COUNT(*)
+row_counts = RowCountCache(ttl=30.0, exact_below=10000)
+
+# Pages are revalidated on every load (Cache-Control: no-cache) against an ETag
+# built from the watermarks of the tables they read. Append-only tables are marked
+# by their newest (time, id) key, a single seek on the keyset index; every other
+# change bumps the table's Table_Version row (see the triggers in scheme)
+APPEND_TABLE_KEYS = {'Trade_Order': 'order_id', 'Trade': 'trade_id', 'Log': 'log_id'}
+
+# The snapshot table is streamed a page at a time; ?per_page= is capped
+SNAPSHOT_PAGE_SIZE = 1000
+MAX_SNAPSHOT_PAGE_SIZE = 10000
+
+@timed('get_strategies')
 def get_strategies(db_manager, limit=10):
     """Get strategies from database"""
     db_manager.cursor.execute("""
@@ -44,6 +123,7 @@ def get_strategies(db_manager, limit=10):
     
     return strategy_list
 
+@timed('get_orders')
 def get_orders(db_manager, limit=10):
     """Get recent orders from database"""
     db_manager.cursor.execute("""
@@ -69,6 +149,7 @@ def get_orders(db_manager, limit=10):
     
     return order_list
 
+@timed('get_trades')
 def get_trades(db_manager, limit=10):
     """Get recent trades from database"""
     db_manager.cursor.execute("""
@@ -95,6 +176,7 @@ def get_trades(db_manager, limit=10):
     
     return trade_list
 
+@timed('get_logs')
 def get_logs(db_manager, limit=10):
     """Get recent logs from database"""
     db_manager.cursor.execute("""
@@ -117,6 +199,7 @@ def get_logs(db_manager, limit=10):
     
     return log_list
 
+@timed('get_portfolio_snapshots')
 def get_portfolio_snapshots(db_manager, portfolio_id, limit=10):
     """Get recent portfolio snapshots from database"""
     db_manager.cursor.execute("""
@@ -141,73 +224,172 @@ def get_portfolio_snapshots(db_manager, portfolio_id, limit=10):
     
     return snapshot_list
 
-def generate_portfolio_graph(db_manager, portfolio_id):
-    """Generate portfolio performance graph"""
+@timed('portfolio_watermark')
+def portfolio_watermark(db_manager, portfolio_id, *render_args):
+    """Cheap change marker for a portfolio's snapshots: latest time and row count (render_args are ignored)"""
     db_manager.cursor.execute("""
-        SELECT time, fund
+        SELECT MAX(time), COUNT(*)
         FROM Portfolio_Snapshot
         WHERE portfolio_id = %s
-        ORDER BY time
     """, (portfolio_id,))
+    return db_manager.cursor.fetchone()
+
+@timed('trade_watermark')
+def trade_watermark(db_manager, *render_args):
+    """
+    Cheap change marker for the Trade table (render_args are ignored)
     
-    snapshot_data = db_manager.cursor.fetchall()
+    The hourly rollup's latest hour, trade count, volume and fees catch new trades;
+    Trade's Table_Version counter, bumped by every UPDATE, DELETE and TRUNCATE that
+    changed rows, catches edits the rollup totals can miss (a price-only update, or
+    a delete and insert within the same hour).
+    """
+    db_manager.cursor.execute("""
+        SELECT MAX(hour), SUM(trade_count), SUM(volume), SUM(fee),
+               (SELECT version FROM Table_Version WHERE table_name = 'trade')
+        FROM Trade_Hourly_Rollup
+    """)
+    return db_manager.cursor.fetchone()
+
+@timed('strategy_pnl_watermark')
+def strategy_pnl_watermark(db_manager, *render_args):
+    """Change marker for PnL curves: the Trade watermark (latest prices) plus the saved PnL state's version (render_args are ignored)"""
+    db_manager.cursor.execute("SELECT version FROM Table_Version WHERE table_name = 'strategy_pnl_state'")
+    return trade_watermark(db_manager), db_manager.cursor.fetchone()
+
+@timed('get_latest_prices')
+def get_latest_prices(db_manager):
+    """
+    Get the latest traded price of each symbol
     
-    if not snapshot_data:
-        return None
+    Walks idx_trade_symbol_time_id instead of scanning Trade: the recursive part
+    hops from one distinct symbol to the next, and each symbol's price is a single
+    backward index probe.
+    
+    Args:
+        db_manager: DatabaseManager to query with
+        
+    Returns:
+        Dict mapping symbol to its price at the latest (time, trade_id)
+    """
+    db_manager.cursor.execute("""
+        WITH RECURSIVE symbols AS (
+            SELECT MIN(symbol) AS symbol FROM Trade
+            UNION ALL
+            SELECT (SELECT MIN(t.symbol) FROM Trade t WHERE t.symbol > s.symbol)
+            FROM symbols s
+            WHERE s.symbol IS NOT NULL
+        )
+        SELECT s.symbol, latest.price
+        FROM symbols s
+        CROSS JOIN LATERAL (
+            SELECT t.price
+            FROM Trade t
+            WHERE t.symbol = s.symbol
+            ORDER BY t.time DESC, t.trade_id DESC
+            LIMIT 1
+        ) latest
+        WHERE s.symbol IS NOT NULL
+    """)
+    
+    return {row[0]: row[1] for row in db_manager.cursor.fetchall()}
+
+@timed('get_portfolio_series')
+def get_portfolio_series(db_manager, portfolio_id, since_ms=None):
+    """
+    Get a portfolio's fund value over time as (times, funds) lists
+    
+    Args:
+        db_manager: DatabaseManager to query with
+        portfolio_id: Portfolio to read
+        since_ms: Only read snapshots after this epoch-ms time (wall time read as UTC,
+            as to_epoch_ms writes it); the primary key seeks straight to it
+    """
+    if since_ms is None:
+        db_manager.cursor.execute("""
+            SELECT time, fund
+            FROM Portfolio_Snapshot
+            WHERE portfolio_id = %s
+            ORDER BY time
+        """, (portfolio_id,))
+    else:
+        db_manager.cursor.execute("""
+            SELECT time, fund
+            FROM Portfolio_Snapshot
+            WHERE portfolio_id = %s AND time > to_timestamp(%s / 1000.0) AT TIME ZONE 'UTC'
+            ORDER BY time
+        """, (portfolio_id, since_ms))
+    
+    snapshot_data = db_manager.cursor.fetchall()
     
     times = [row[0] for row in snapshot_data]
     funds = [row[1] for row in snapshot_data]
     
-    plt.figure(figsize=(10, 6))
-    plt.plot(times, funds)
-    plt.title('Portfolio Fund Over Time')
-    plt.xlabel('Time')
-    plt.ylabel('Fund Value')
-    plt.grid(True)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
+    return times, funds
+
+@timed('get_hourly_trade_series')
+def get_hourly_trade_series(db_manager):
+    """Get hourly trade volume and fees from the hourly rollup as (hours, volumes, fees) lists"""
+    # The rollup is kept per symbol and strategy; the charts show all of them together
+    db_manager.cursor.execute("""
+        SELECT 
+            hour, 
+            SUM(volume) as total_volume,
+            SUM(fee) as hourly_fee
+        FROM Trade_Hourly_Rollup
+        GROUP BY hour
+        ORDER BY hour
+    """)
+    
+    trade_data = db_manager.cursor.fetchall()
+    
+    hours = [row[0] for row in trade_data]
+    volumes = [float(row[1]) for row in trade_data]
+    fees = [float(row[2]) for row in trade_data]
+    
+    return hours, volumes, fees
+
+@cached_chart(chart_cache, portfolio_watermark)
+@timed_render
+def generate_portfolio_graph(db_manager, portfolio_id):
+    """Generate portfolio performance graph"""
+    times, funds = get_portfolio_series(db_manager, portfolio_id)
+    
+    if not times:
+        return None
+    
+    times, funds = lttb(times, funds, CHART_POINTS)
+    
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.plot(times, funds)
+    ax.set_title('Portfolio Fund Over Time')
+    ax.set_xlabel('Time')
+    ax.set_ylabel('Fund Value')
+    ax.grid(True)
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
     
     # Convert plot to base64 string
     buf = io.BytesIO()
-    plt.savefig(buf, format='png')
+    fig.savefig(buf, format='png')
     buf.seek(0)
     plot_data = base64.b64encode(buf.read()).decode('utf-8')
-    plt.close()
     
     return plot_data
 
+@cached_chart(chart_cache, trade_watermark)
+@timed_render
 def generate_trade_volume_fee_graph(db_manager):
     """Generate graph showing both hourly and accumulated trade volume on the same plot"""
     try:
-        # First check if we have any trade data
-        db_manager.cursor.execute("SELECT COUNT(*) FROM Trade")
-        count = db_manager.cursor.fetchone()[0]
+        hours, volumes, _ = get_hourly_trade_series(db_manager)
         
-        if count == 0:
+        if not hours:
             print("No trade data found in database")
             return None
-            
-        # Query to get hourly trade volumes
-        db_manager.cursor.execute("""
-            SELECT 
-                DATE_TRUNC('hour', time) as hour, 
-                SUM(volume) as total_volume
-            FROM Trade
-            GROUP BY hour
-            ORDER BY hour
-        """)
-        
-        trade_data = db_manager.cursor.fetchall()
-        
-        if not trade_data:
-            print("Query returned no data")
-            return None
-        
-        print(f"Found {len(trade_data)} hours of trade data")
         
-        # Extract data from query results
-        hours = [row[0] for row in trade_data]
-        volumes = [float(row[1]) for row in trade_data]
+        print(f"Found {len(hours)} hours of trade data")
         
         # Calculate accumulated volume
         accumulated_volumes = []
@@ -217,7 +399,8 @@ def generate_trade_volume_fee_graph(db_manager):
             accumulated_volumes.append(total)
         
         # Create the plot with two y-axes
-        fig, ax1 = plt.subplots(figsize=(14, 8))
+        fig = Figure(figsize=(14, 8))
+        ax1 = fig.subplots()
         
         # Plot hourly volume as bars on the primary y-axis
         color = 'tab:blue'
@@ -244,7 +427,7 @@ def generate_trade_volume_fee_graph(db_manager):
         ax1.grid(True, alpha=0.3)
         
         # Add title
-        plt.title('Trading Volume Over Time (Hourly)', fontsize=14)
+        ax1.set_title('Trading Volume Over Time (Hourly)', fontsize=14)
         
         # Create a combined legend
         lines1, labels1 = ax1.get_legend_handles_labels()
@@ -254,14 +437,13 @@ def generate_trade_volume_fee_graph(db_manager):
         # Format x-axis to show dates more clearly
         fig.autofmt_xdate()
         
-        plt.tight_layout()
+        fig.tight_layout()
         
         # Convert plot to base64 string
         buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100)
+        fig.savefig(buf, format='png', dpi=100)
         buf.seek(0)
         plot_data = base64.b64encode(buf.read()).decode('utf-8')
-        plt.close()
         
         return plot_data
         
@@ -271,195 +453,64 @@ def generate_trade_volume_fee_graph(db_manager):
         traceback.print_exc()
         return None
 
+@timed('compute_strategy_pnl')
+def compute_strategy_pnl(db_manager, points=None):
+    """
+    Compute realized plus unrealized PnL for each strategy after every trade
+    
+    Read-only: curves come from the persisted PnL state, which the ingest path
+    (or `flask --app server update-pnl-state`) keeps up to date.
+    
+    Args:
+        db_manager: DatabaseManager to query with
+        points: Approximate number of points to read per strategy; None reads them all
+        
+    Returns:
+        Dict mapping strategy_id to {'times', 'pnls', 'final_pnl'}; empty when
+        there are no strategies or trades
+    """
+    # Latest price for each symbol, to calculate unrealized PnL
+    latest_prices = get_latest_prices(db_manager)
+    
+    # Curves come from the saved per-trade state, marked to the latest prices
+    return get_strategy_pnl_series(db_manager, latest_prices, points)
+
+@cached_chart(chart_cache, strategy_pnl_watermark)
+@timed_render
 def generate_strategy_pnl_graph(db_manager):
     """Generate graph showing PnL for each strategy over time"""
     try:
-        # First check if we have any strategies
-        db_manager.cursor.execute("SELECT COUNT(*) FROM Strategy")
-        count = db_manager.cursor.fetchone()[0]
-        
-        if count == 0:
-            print("No strategies found in database")
-            return None
-        
-        # Get all strategies
-        db_manager.cursor.execute("""
-            SELECT strategy_id, symbol, direction
-            FROM Strategy
-            ORDER BY strategy_id
-        """)
-        
-        strategies = db_manager.cursor.fetchall()
-        strategy_ids = [s[0] for s in strategies]
-        
-        print(f"Found {len(strategies)} strategies")
-        
-        # Get all trades grouped by strategy and ordered by time
-        db_manager.cursor.execute("""
-            SELECT 
-                strategy_id,
-                time,
-                side,
-                price,
-                qty,
-                volume
-            FROM Trade
-            ORDER BY strategy_id, time
-        """)
-        
-        trades = db_manager.cursor.fetchall()
-        
-        if not trades:
-            print("No trades found")
-            return None
-        
-        print(f"Found {len(trades)} trades")
-        
-        # Get the latest price for each symbol to calculate unrealized PnL
-        db_manager.cursor.execute("""
-            SELECT 
-                symbol,
-                MAX(time) as latest_time
-            FROM Trade
-            GROUP BY symbol
-        """)
-        
-        latest_times = {row[0]: row[1] for row in db_manager.cursor.fetchall()}
-        
-        latest_prices = {}
-        for symbol, latest_time in latest_times.items():
-            db_manager.cursor.execute("""
-                SELECT price
-                FROM Trade
-                WHERE symbol = %s AND time = %s
-                LIMIT 1
-            """, (symbol, latest_time))
-            
-            result = db_manager.cursor.fetchone()
-            if result:
-                latest_prices[symbol] = result[0]
-        
-        # Calculate PnL for each strategy over time
-        strategy_data = {}
-        
-        for strategy_id in strategy_ids:
-            strategy_trades = [t for t in trades if t[0] == strategy_id]
-            
-            if not strategy_trades:
-                continue
-                
-            # Get the symbol for this strategy
-            symbol = next((s[1] for s in strategies if s[0] == strategy_id), None)
-            if not symbol:
-                continue
-                
-            # Initialize PnL tracking
-            times = []
-            pnls = []
-            cumulative_pnl = 0
-            position = 0
-            avg_entry_price = 0
-            
-            for trade in strategy_trades:
-                _, time, side, price, qty, volume = trade
-                
-                # Update position and calculate realized PnL
-                if side == 'buy':
-                    # If we're adding to position
-                    if position >= 0:
-                        # Update average entry price
-                        total_cost = position * avg_entry_price + volume
-                        position += qty
-                        avg_entry_price = total_cost / position if position > 0 else 0
-                    else:
-                        # We're covering a short position
-                        realized_pnl = (avg_entry_price - price) * min(abs(position), qty)
-                        cumulative_pnl += realized_pnl
-                        
-                        # Update position
-                        position += qty
-                        if position > 0:
-                            # We've flipped to long, reset avg price for remaining qty
-                            avg_entry_price = price
-                        elif position < 0:
-                            # Still short, avg price stays the same
-                            pass
-                        else:
-                            # Flat position
-                            avg_entry_price = 0
-                else:  # side == 'sell'
-                    # If we're adding to short position
-                    if position <= 0:
-                        # Update average entry price for short
-                        total_cost = abs(position) * avg_entry_price + volume
-                        position -= qty
-                        avg_entry_price = total_cost / abs(position) if position < 0 else 0
-                    else:
-                        # We're selling a long position
-                        realized_pnl = (price - avg_entry_price) * min(position, qty)
-                        cumulative_pnl += realized_pnl
-                        
-                        # Update position
-                        position -= qty
-                        if position < 0:
-                            # We've flipped to short, reset avg price for remaining qty
-                            avg_entry_price = price
-                        elif position > 0:
-                            # Still long, avg price stays the same
-                            pass
-                        else:
-                            # Flat position
-                            avg_entry_price = 0
-                
-                # Calculate unrealized PnL for current position
-                unrealized_pnl = 0
-                if position != 0 and symbol in latest_prices:
-                    latest_price = latest_prices[symbol]
-                    if position > 0:
-                        unrealized_pnl = (latest_price - avg_entry_price) * position
-                    else:
-                        unrealized_pnl = (avg_entry_price - latest_price) * abs(position)
-                
-                # Total PnL = realized + unrealized
-                total_pnl = cumulative_pnl + unrealized_pnl
-                
-                times.append(time)
-                pnls.append(total_pnl)
-            
-            strategy_data[strategy_id] = {
-                'times': times,
-                'pnls': pnls,
-                'final_pnl': pnls[-1] if pnls else 0
-            }
+        strategy_data = compute_strategy_pnl(db_manager, CHART_POINTS)
         
         if not strategy_data:
             print("No PnL data calculated")
             return None
         
         # Create the plot
-        plt.figure(figsize=(14, 8))
+        fig = Figure(figsize=(14, 8))
+        ax = fig.subplots()
         
         # Plot PnL for each strategy
         for strategy_id, data in strategy_data.items():
-            plt.plot(data['times'], data['pnls'], linewidth=2, marker='.', markersize=3, label=f"{strategy_id} (PnL: {data['final_pnl']:.2f})")
+            times, pnls = lttb(data['times'], data['pnls'], CHART_POINTS)
+            ax.plot(times, pnls, linewidth=2, marker='.', markersize=3, label=f"{strategy_id} (PnL: {data['final_pnl']:.2f})")
         
-        plt.title('Strategy PnL Over Time', fontsize=14)
-        plt.xlabel('Time')
-        plt.ylabel('PnL (USDT)')
-        plt.grid(True, alpha=0.3)
-        plt.legend(loc='best')
+        ax.set_title('Strategy PnL Over Time', fontsize=14)
+        ax.set_xlabel('Time')
+        ax.set_ylabel('PnL (USDT)')
+        ax.grid(True, alpha=0.3)
+        ax.legend(loc='best')
         
         # Format x-axis to show dates more clearly
-        plt.gcf().autofmt_xdate()
+        fig.autofmt_xdate()
         
-        plt.tight_layout()
+        fig.tight_layout()
         
         # Convert plot to base64 string
         buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100)
+        fig.savefig(buf, format='png', dpi=100)
         buf.seek(0)
         plot_data = base64.b64encode(buf.read()).decode('utf-8')
-        plt.close()
         
         return plot_data
         
@@ -469,39 +520,18 @@ def generate_strategy_pnl_graph(db_manager):
         traceback.print_exc()
         return None
 
+@cached_chart(chart_cache, trade_watermark)
+@timed_render
 def generate_trade_fee_graph(db_manager):
     """Generate graph showing both hourly and accumulated trading fees"""
     try:
-        # First check if we have any trade data
-        db_manager.cursor.execute("SELECT COUNT(*) FROM Trade")
-        count = db_manager.cursor.fetchone()[0]
+        hours, _, fees = get_hourly_trade_series(db_manager)
         
-        if count == 0:
+        if not hours:
             print("No trade data found in database")
             return None
-            
-        # Query to get hourly trade volumes and calculate fees
-        # Assuming a 0.1% fee on each trade
-        db_manager.cursor.execute("""
-            SELECT 
-                DATE_TRUNC('hour', time) as hour, 
-                SUM(volume * -0.0005) as hourly_fee  -- 0.1% fee
-            FROM Trade
-            GROUP BY hour
-            ORDER BY hour
-        """)
-        
-        fee_data = db_manager.cursor.fetchall()
-        
-        if not fee_data:
-            print("Query returned no fee data")
-            return None
         
-        print(f"Found {len(fee_data)} hours of fee data")
-        
-        # Extract data from query results
-        hours = [row[0] for row in fee_data]
-        fees = [float(row[1]) for row in fee_data]
+        print(f"Found {len(hours)} hours of fee data")
         
         # Calculate accumulated fees
         accumulated_fees = []
@@ -511,7 +541,8 @@ def generate_trade_fee_graph(db_manager):
             accumulated_fees.append(total)
         
         # Create the plot with two y-axes
-        fig, ax1 = plt.subplots(figsize=(14, 8))
+        fig = Figure(figsize=(14, 8))
+        ax1 = fig.subplots()
         
         # Plot hourly fees as bars on the primary y-axis
         color = 'tab:purple'
@@ -538,7 +569,7 @@ def generate_trade_fee_graph(db_manager):
         ax1.grid(True, alpha=0.3)
         
         # Add title
-        plt.title('Trading Fees Over Time (Hourly)', fontsize=14)
+        ax1.set_title('Trading Fees Over Time (Hourly)', fontsize=14)
         
         # Create a combined legend
         lines1, labels1 = ax1.get_legend_handles_labels()
@@ -548,14 +579,13 @@ def generate_trade_fee_graph(db_manager):
         # Format x-axis to show dates more clearly
         fig.autofmt_xdate()
         
-        plt.tight_layout()
+        fig.tight_layout()
         
         # Convert plot to base64 string
         buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100)
+        fig.savefig(buf, format='png', dpi=100)
         buf.seek(0)
         plot_data = base64.b64encode(buf.read()).decode('utf-8')
-        plt.close()
         
         return plot_data
         
@@ -565,59 +595,255 @@ def generate_trade_fee_graph(db_manager):
         traceback.print_exc()
         return None
 
+@timed('table_watermark')
+def table_watermark(db_manager, tables):
+    """
+    Cheap, transactional change marker for a set of tables.
+    
+    Combines the tables' Table_Version rows, which statement triggers bump on every
+    committed write (inserts excepted for append-only tables), with the newest
+    (time, id) key of the append-only tables. Both are read in one statement, so the
+    marker reflects a single snapshot of committed data.
+    
+    Args:
+        db_manager: DatabaseManager to query with
+        tables: Table names
+        
+    Returns:
+        A hashable watermark that changes whenever the tables' contents do
+    """
+    newest_keys = [f"(SELECT ROW(time, {APPEND_TABLE_KEYS[table]})::text FROM {table} "
+                   f"ORDER BY time DESC, {APPEND_TABLE_KEYS[table]} DESC LIMIT 1)"
+                   for table in tables if table in APPEND_TABLE_KEYS]
+    db_manager.cursor.execute(
+        "SELECT ARRAY(SELECT ROW(table_name, version)::text FROM Table_Version "
+        "WHERE table_name = ANY(%s) ORDER BY table_name)" + "".join(", " + key for key in newest_keys),
+        ([table.lower() for table in tables],))
+    return tuple(db_manager.cursor.fetchone())
+
+@functools.lru_cache(maxsize=1)
+def template_version():
+    """Hash of the template files, so a template change also changes every ETag"""
+    template_dir = os.path.join(app.root_path, app.template_folder)
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(template_dir)):
+        with open(os.path.join(template_dir, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def conditional_page(*tables):
+    """
+    Serve a route with an ETag validator derived from the tables it reads.
+    
+    The validator is computed before the view runs; a request whose If-None-Match
+    still matches gets a 304 and the view's queries and chart renders are skipped
+    entirely. No Last-Modified is sent: the watermark carries no modification time
+    that every worker process would agree on, and clients revalidate with the ETag.
+    
+    A view that could only build part of the page sets g.degraded; that response
+    gets no ETag and Cache-Control: no-store, so the next load rebuilds it instead
+    of revalidating the partial page until the tables change.
+    
+    Args:
+        tables: Names of the tables the page's content depends on
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with db_manager.checkout() as db:
+                watermark = table_watermark(db, tables)
+            
+            etag = hashlib.sha1(repr((template_version(), request.full_path, watermark)).encode('utf-8')).hexdigest()
+            not_modified = request.if_none_match.contains_weak(etag)
+            
+            response = app.response_class(status=304) if not_modified else make_response(view(*args, **kwargs))
+            
+            if g.get('degraded'):
+                response.cache_control.no_store = True
+                return response
+            
+            # Weak, since the same content may be sent with different encodings
+            response.set_etag(etag, weak=True)
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+@app.after_request
+def compress(response):
+    """Compress text responses (streamed ones incrementally) with brotli or gzip"""
+    return compress_response(response, request.accept_encodings)
+
+# Latency histograms per route, per query (@timed) and per chart render (@timed_render)
+metrics.instrument(app)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Latency histograms in the Prometheus text format"""
+    latest = metrics.render_latest()
+    if latest is None:
+        abort(501, description="Metrics are disabled; install prometheus_client")
+    body, content_type = latest
+    return app.response_class(body, content_type=content_type)
+
+def run_panel(deadline, func, *args):
+    """
+    Run one dashboard panel on its own pooled connection.
+    
+    The panel's queries get a statement_timeout of the time left until deadline,
+    so a panel the page has given up on stops using its connection.
+    """
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        # Waited in the queue past its deadline; don't start work nobody will use
+        raise PanelTimeout()
+    with db_manager.checkout() as db:
+        # SET LOCAL ends with the transaction, which checkout rolls back on return
+        db.cursor.execute("SET LOCAL statement_timeout = %s", (max(int(remaining * 1000), 1),))
+        return func(db, *args)
+
+def assemble_panels(panels):
+    """
+    Run dashboard panels concurrently and wait for each within its own timeout.
+    
+    Args:
+        panels: Dict mapping panel name to a (function, args) tuple
+        
+    Returns:
+        Tuple of (results, unavailable) where results maps panel name to its
+        value (None when unavailable) and unavailable is the set of panel
+        names that timed out or failed; when any did, g.degraded is set
+    """
+    start = time.monotonic()
+    deadlines = {name: start + PANEL_TIMEOUTS.get(name, DEFAULT_PANEL_TIMEOUT) for name in panels}
+    queued = list(panels.items())
+    running = {}
+    
+    results = {}
+    unavailable = set()
+    
+    def give_up(name, reason):
+        print(reason)
+        results[name] = None
+        unavailable.add(name)
+    
+    while queued or running:
+        # Timeouts are measured from the request start, so panels wait in parallel
+        while queued and len(running) < PANELS_PER_REQUEST:
+            name, (func, args) = queued.pop(0)
+            running[panel_executor.submit(run_panel, deadlines[name], func, *args)] = name
+        
+        next_deadline = min(deadlines[name] for name in running.values())
+        done, _ = wait(running, timeout=max(next_deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+        
+        for future in done:
+            name = running.pop(future)
+            try:
+                results[name] = future.result()
+            except PanelTimeout:
+                give_up(name, f"Panel {name} timed out")
+            except Exception as e:
+                give_up(name, f"Error building panel {name}: {e}")
+        
+        now = time.monotonic()
+        for future, name in list(running.items()):
+            if deadlines[name] <= now:
+                # A running panel's query is cancelled by its statement_timeout
+                future.cancel()
+                del running[future]
+                give_up(name, f"Panel {name} timed out")
+    
+    if unavailable:
+        # A partial page must not be revalidated as if it were complete (see conditional_page)
+        g.degraded = True
+    return results, unavailable
+
 @app.route('/')
+@conditional_page('Strategy', 'Trade_Order', 'Trade', 'Log', 'Portfolio_Snapshot', 'Strategy_PnL_State')
 def index():
     """Main dashboard page showing all data together"""
-    db_manager.connect()
+    # Default portfolio ID
+    portfolio_id = 1718693033751000
+    
+    # ?charts=client draws the charts in the browser from /api/series/... instead
+    client_charts = request.args.get('charts') == 'client'
+    
+    panel_specs = {
+        'strategies': (get_strategies, ()),
+        'orders': (get_orders, ()),
+        'trades': (get_trades, ()),
+        'logs': (get_logs, ()),
+        'snapshots': (get_portfolio_snapshots, (portfolio_id,))
+    }
+    if not client_charts:
+        panel_specs.update({
+            'portfolio_plot': (generate_portfolio_graph, (portfolio_id,)),
+            'trade_volume_plot': (generate_trade_volume_fee_graph, ()),
+            'trade_fee_plot': (generate_trade_fee_graph, ()),
+            'strategy_pnl_plot': (generate_strategy_pnl_graph, ())
+        })
+    
+    # Queries and chart renders run side by side on separate connections
+    panels, unavailable = assemble_panels(panel_specs)
+    
+    # Debug print
+    if not client_charts:
+        print(f"Portfolio plot generated: {'Yes' if panels['portfolio_plot'] else 'No'}")
+        print(f"Trade volume plot generated: {'Yes' if panels['trade_volume_plot'] else 'No'}")
+        print(f"Trade fee plot generated: {'Yes' if panels['trade_fee_plot'] else 'No'}")
+        print(f"Strategy PnL plot generated: {'Yes' if panels['strategy_pnl_plot'] else 'No'}")
+    if unavailable:
+        print(f"Unavailable panels: {', '.join(sorted(unavailable))}")
+    
+    return render_template('dashboard.html', 
+                          strategies=panels['strategies'] or [],
+                          orders=panels['orders'] or [],
+                          trades=panels['trades'] or [],
+                          logs=panels['logs'] or [],
+                          snapshots=panels['snapshots'] or [],
+                          portfolio_plot=panels.get('portfolio_plot'),
+                          trade_volume_plot=panels.get('trade_volume_plot'),
+                          trade_fee_plot=panels.get('trade_fee_plot'),
+                          strategy_pnl_plot=panels.get('strategy_pnl_plot'),
+                          client_charts=client_charts,
+                          unavailable=unavailable,
+                          portfolio_id=portfolio_id)
+
+@timed('keyset_page')
+def keyset_page(db, table_name, columns, id_column, per_page):
+    """
+    Fetch the page of a table selected by the request's ?cursor= or ?last=1 arguments.
+    
+    Args:
+        db: DatabaseManager to query with
+        table_name: Table to page through, newest rows first
+        columns: Columns to select
+        id_column: Primary key used to break ties on time
+        per_page: Rows per page
+        
+    Returns:
+        Page dict from fetch_keyset_page; aborts with 400 on a malformed cursor
+    """
     try:
-        # Default portfolio ID
-        portfolio_id = 1718693033751000
-        
-        # Get data using helper functions
-        strategies = get_strategies(db_manager)
-        orders = get_orders(db_manager)
-        trades = get_trades(db_manager)
-        logs = get_logs(db_manager)
-        snapshots = get_portfolio_snapshots(db_manager, portfolio_id)
-        
-        # Generate plots
-        portfolio_plot = generate_portfolio_graph(db_manager, portfolio_id)
-        trade_volume_plot = generate_trade_volume_fee_graph(db_manager)
-        trade_fee_plot = generate_trade_fee_graph(db_manager)
-        strategy_pnl_plot = generate_strategy_pnl_graph(db_manager)
-        
-        # Debug print
-        print(f"Portfolio plot generated: {'Yes' if portfolio_plot else 'No'}")
-        print(f"Trade volume plot generated: {'Yes' if trade_volume_plot else 'No'}")
-        print(f"Trade fee plot generated: {'Yes' if trade_fee_plot else 'No'}")
-        print(f"Strategy PnL plot generated: {'Yes' if strategy_pnl_plot else 'No'}")
-        
-        return render_template('dashboard.html', 
-                              strategies=strategies,
-                              orders=orders,
-                              trades=trades,
-                              logs=logs,
-                              snapshots=snapshots,
-                              portfolio_plot=portfolio_plot,
-                              trade_volume_plot=trade_volume_plot,
-                              trade_fee_plot=trade_fee_plot,
-                              strategy_pnl_plot=strategy_pnl_plot,
-                              portfolio_id=portfolio_id)
-    finally:
-        db_manager.disconnect()
+        return fetch_keyset_page(db, table_name, columns, id_column, per_page,
+                                 token=request.args.get('cursor'),
+                                 last=request.args.get('last', 0, type=int) == 1)
+    except InvalidPageToken as e:
+        abort(400, description=str(e))
 
 @app.route('/strategies')
+@conditional_page('Strategy')
 def strategies():
     """Get all strategies"""
-    db_manager.connect()
-    try:
+    with db_manager.checkout() as db:
         # Execute query to get all strategies
-        db_manager.cursor.execute("""
-            SELECT strategy_id, direction, symbol, portfolio_id 
-            FROM Strategy
-            ORDER BY strategy_id
-        """)
-        strategies = db_manager.cursor.fetchall()
+        with timed('all_strategies'):
+            db.cursor.execute("""
+                SELECT strategy_id, direction, symbol, portfolio_id 
+                FROM Strategy
+                ORDER BY strategy_id
+            """)
+            strategies = db.cursor.fetchall()
         
         # Convert to list of dictionaries for easier template rendering
         strategy_list = []
@@ -630,31 +856,23 @@ def strategies():
             })
         
         return render_template('strategies.html', strategies=strategy_list)
-    finally:
-        db_manager.disconnect()
 
 @app.route('/orders')
+@conditional_page('Trade_Order')
 def orders():
     """Get all orders with pagination"""
-    page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
-    offset = (page - 1) * per_page
+    exact_count = request.args.get('exact_count', 0, type=int) == 1
     
-    db_manager.connect()
-    try:
-        # Get total count
-        db_manager.cursor.execute("SELECT COUNT(*) FROM Trade_Order")
-        total_count = db_manager.cursor.fetchone()[0]
+    with db_manager.checkout() as db:
+        # Get total count (an estimate on large tables unless exact_count=1)
+        with timed('row_count'):
+            total_count, count_exact = row_counts.count(db, 'Trade_Order', exact=exact_count)
         
-        # Get paginated orders
-        db_manager.cursor.execute("""
-            SELECT order_id, time, strategy_id, price, qty, side, symbol
-            FROM Trade_Order
-            ORDER BY time DESC
-            LIMIT %s OFFSET %s
-        """, (per_page, offset))
-        
-        orders = db_manager.cursor.fetchall()
+        # Get one page by seeking on (time, order_id) instead of OFFSET
+        page = keyset_page(db, 'Trade_Order', ['order_id', 'time', 'strategy_id', 'price', 'qty', 'side', 'symbol'],
+                           'order_id', per_page)
+        orders = page['rows']
         
         # Convert to list of dictionaries
         order_list = []
@@ -669,38 +887,30 @@ def orders():
                 'symbol': o[6]
             })
         
-        total_pages = (total_count + per_page - 1) // per_page
-        
         return render_template('orders.html', 
                               orders=order_list, 
-                              page=page, 
-                              total_pages=total_pages,
-                              total_count=total_count)
-    finally:
-        db_manager.disconnect()
+                              per_page=per_page,
+                              next_cursor=page['next_token'],
+                              prev_cursor=page['prev_token'],
+                              total_count=total_count,
+                              count_exact=count_exact)
 
 @app.route('/trades')
+@conditional_page('Trade')
 def trades():
     """Get all trades with pagination"""
-    page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
-    offset = (page - 1) * per_page
+    exact_count = request.args.get('exact_count', 0, type=int) == 1
     
-    db_manager.connect()
-    try:
-        # Get total count
-        db_manager.cursor.execute("SELECT COUNT(*) FROM Trade")
-        total_count = db_manager.cursor.fetchone()[0]
+    with db_manager.checkout() as db:
+        # Get total count (an estimate on large tables unless exact_count=1)
+        with timed('row_count'):
+            total_count, count_exact = row_counts.count(db, 'Trade', exact=exact_count)
         
-        # Get paginated trades
-        db_manager.cursor.execute("""
-            SELECT trade_id, time, strategy_id, price, qty, side, symbol, volume
-            FROM Trade
-            ORDER BY time DESC
-            LIMIT %s OFFSET %s
-        """, (per_page, offset))
-        
-        trades = db_manager.cursor.fetchall()
+        # Get one page by seeking on (time, trade_id) instead of OFFSET
+        page = keyset_page(db, 'Trade', ['trade_id', 'time', 'strategy_id', 'price', 'qty', 'side', 'symbol', 'volume'],
+                           'trade_id', per_page)
+        trades = page['rows']
         
         # Convert to list of dictionaries
         trade_list = []
@@ -716,38 +926,30 @@ def trades():
                 'volume': t[7]
             })
         
-        total_pages = (total_count + per_page - 1) // per_page
-        
         return render_template('trades.html', 
                               trades=trade_list, 
-                              page=page, 
-                              total_pages=total_pages,
-                              total_count=total_count)
-    finally:
-        db_manager.disconnect()
+                              per_page=per_page,
+                              next_cursor=page['next_token'],
+                              prev_cursor=page['prev_token'],
+                              total_count=total_count,
+                              count_exact=count_exact)
 
 @app.route('/logs')
+@conditional_page('Log')
 def logs():
     """Get all logs with pagination"""
-    page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
-    offset = (page - 1) * per_page
+    exact_count = request.args.get('exact_count', 0, type=int) == 1
     
-    db_manager.connect()
-    try:
-        # Get total count
-        db_manager.cursor.execute("SELECT COUNT(*) FROM Log")
-        total_count = db_manager.cursor.fetchone()[0]
+    with db_manager.checkout() as db:
+        # Get total count (an estimate on large tables unless exact_count=1)
+        with timed('row_count'):
+            total_count, count_exact = row_counts.count(db, 'Log', exact=exact_count)
         
-        # Get paginated logs
-        db_manager.cursor.execute("""
-            SELECT log_id, time, message, portfolio_id
-            FROM Log
-            ORDER BY time DESC
-            LIMIT %s OFFSET %s
-        """, (per_page, offset))
-        
-        logs = db_manager.cursor.fetchall()
+        # Get one page by seeking on (time, log_id) instead of OFFSET
+        page = keyset_page(db, 'Log', ['log_id', 'time', 'message', 'portfolio_id'],
+                           'log_id', per_page)
+        logs = page['rows']
         
         # Convert to list of dictionaries
         log_list = []
@@ -759,749 +961,654 @@ def logs():
                 'portfolio_id': l[3]
             })
         
-        total_pages = (total_count + per_page - 1) // per_page
-        
         return render_template('logs.html', 
                               logs=log_list, 
-                              page=page, 
-                              total_pages=total_pages,
-                              total_count=total_count)
-    finally:
-        db_manager.disconnect()
+                              per_page=per_page,
+                              next_cursor=page['next_token'],
+                              prev_cursor=page['prev_token'],
+                              total_count=total_count,
+                              count_exact=count_exact)
+
+@cached_chart(chart_cache, portfolio_watermark)
+@timed_render
+def generate_portfolio_metrics_plot(db_manager, portfolio_id):
+    """
+    Render a portfolio's fund, leverage, position and order value as a PNG.
+    
+    Snapshots are streamed from a server-side cursor through a min/max-per-bucket
+    reduction and then downsampled with LTTB, so memory stays flat however long
+    the portfolio has been running.
+    
+    Args:
+        db_manager: DatabaseManager to query with
+        portfolio_id: Portfolio to plot
+        
+    Returns:
+        PNG bytes, or None if the portfolio has no snapshots
+    """
+    db_manager.cursor.execute("""
+        SELECT MIN(time), MAX(time)
+        FROM Portfolio_Snapshot
+        WHERE portfolio_id = %s
+    """, (portfolio_id,))
+    start, end = db_manager.cursor.fetchone()
+    
+    if start is None:
+        return None
+    
+    metric_columns = ['fund', 'leverage', 'position', 'order_value']
+    reducers = {metric: MinMaxBuckets(start, end, CHART_POINTS) for metric in metric_columns}
+    for batch in db_manager.iter_table_data('Portfolio_Snapshot', ['time'] + metric_columns,
+                                            'portfolio_id = %s', (portfolio_id,), batch_size=5000):
+        for row in batch:
+            for index, metric in enumerate(metric_columns, 1):
+                reducers[metric].add(row[0], row[index])
+    
+    # Downsample each metric on its own so every series keeps its peaks
+    series = {metric: lttb(*reducers[metric].points(), CHART_POINTS) for metric in metric_columns}
+    
+    fig = Figure(figsize=(12, 10))
+    ax1, ax2 = fig.subplots(2, 1, sharex=True)
+    
+    # Plot fund over time
+    ax1.plot(*series['fund'], 'b-', label='Fund')
+    ax1.set_title('Portfolio Fund Over Time')
+    ax1.set_ylabel('Fund Value (USD)')
+    ax1.grid(True)
+    ax1.legend()
+    
+    # Plot leverage and position over time
+    ax2.plot(*series['leverage'], 'r-', label='Leverage')
+    ax2.plot(*series['position'], 'g-', label='Position')
+    ax2.plot(*series['order_value'], 'y-', label='Order Value')
+    ax2.set_title('Portfolio Metrics Over Time')
+    ax2.set_xlabel('Time')
+    ax2.set_ylabel('Value')
+    ax2.grid(True)
+    ax2.legend()
+    
+    # Format the plot
+    fig.tight_layout()
+    
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+@timed('snapshot_page_start')
+def snapshot_page_start(db_manager, portfolio_id, per_page, before=None):
+    """
+    Find the first snapshot of the page that ends just before `before` (or at the newest snapshot)
+    
+    Pages are streamed oldest first, so a page walked to backwards is located by
+    seeking per_page rows back on the (portfolio_id, time) key, then streamed forwards.
+    
+    Returns:
+        Tuple of (start_time, has_earlier); start_time is None when fewer than
+        per_page snapshots precede `before`, i.e. the page starts at the first one
+    """
+    condition = "portfolio_id = %s"
+    params = [portfolio_id]
+    if before is not None:
+        condition += " AND time < %s"
+        params.append(before)
+    db_manager.cursor.execute(f"""
+        SELECT time
+        FROM Portfolio_Snapshot
+        WHERE {condition}
+        ORDER BY time DESC
+        LIMIT 2 OFFSET %s
+    """, params + [per_page - 1])
+    rows = db_manager.cursor.fetchall()
+    if not rows:
+        return None, False
+    return rows[0][0], len(rows) > 1
 
 @app.route('/portfolio_snapshots')
+@conditional_page('Portfolio_Snapshot')
 def portfolio_snapshots():
-    """Get portfolio snapshots and generate graph"""
+    """
+    Stream one page of a portfolio's snapshots, oldest first.
+    
+    Rows are read from a server-side cursor and rendered into the table as they
+    arrive, so the first bytes go out before the page is complete and memory does
+    not grow with the page. Pages seek on time (?cursor=, or ?last=1 for the newest
+    page) instead of using OFFSET; time is unique within a portfolio, so the page
+    tokens are time-only. The graph is served separately by portfolio_snapshots_plot.
+    """
     portfolio_id = request.args.get('portfolio_id', 1718693033751000, type=int)
+    per_page = min(max(request.args.get('per_page', SNAPSHOT_PAGE_SIZE, type=int), 1), MAX_SNAPSHOT_PAGE_SIZE)
+    cursor = request.args.get('cursor')
+    last = request.args.get('last', 0, type=int) == 1
     
-    db_manager.connect()
-    try:
-        # Get portfolio snapshots
-        db_manager.cursor.execute("""
-            SELECT time, fund, leverage, position, order_value
-            FROM Portfolio_Snapshot
-            WHERE portfolio_id = %s
-            ORDER BY time
-        """, (portfolio_id,))
-        
-        snapshots = db_manager.cursor.fetchall()
-        
-        # Convert to DataFrame for easier plotting
-        df = pd.DataFrame(snapshots, columns=['time', 'fund', 'leverage', 'position', 'order_value'])
-        
-        # Generate plots
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10), sharex=True)
-        
-        # Plot fund over time
-        ax1.plot(df['time'], df['fund'], 'b-', label='Fund')
-        ax1.set_title('Portfolio Fund Over Time')
-        ax1.set_ylabel('Fund Value (USD)')
-        ax1.grid(True)
-        ax1.legend()
-        
-        # Plot leverage and position over time
-        ax2.plot(df['time'], df['leverage'], 'r-', label='Leverage')
-        ax2.plot(df['time'], df['position'], 'g-', label='Position')
-        ax2.plot(df['time'], df['order_value'], 'y-', label='Order Value')
-        ax2.set_title('Portfolio Metrics Over Time')
-        ax2.set_xlabel('Time')
-        ax2.set_ylabel('Value')
-        ax2.grid(True)
-        ax2.legend()
-        
-        # Format the plot
-        plt.tight_layout()
-        
-        # Save plot to a buffer
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png')
-        buf.seek(0)
-        
-        # Convert plot to base64 string for embedding in HTML
-        plot_data = base64.b64encode(buf.getvalue()).decode('utf-8')
-        plt.close(fig)
-        
-        # Convert to list of dictionaries for table display
-        snapshot_list = []
-        for s in snapshots:
-            snapshot_list.append({
-                'time': s[0],
-                'fund': s[1],
-                'leverage': s[2],
-                'position': s[3],
-                'order_value': s[4]
-            })
-        
-        return render_template('portfolio_snapshots.html', 
-                              snapshots=snapshot_list, 
-                              plot_data=plot_data,
-                              portfolio_id=portfolio_id)
-    finally:
-        db_manager.disconnect()
-
-# Create templates directory if it doesn't exist
-os.makedirs('templates', exist_ok=True)
-
-# Create HTML templates
-with open('templates/index.html', 'w') as f:
-    f.write('''
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Trading Database Dashboard</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
-    <style>
-        body { padding: 20px; }
-        .card { margin-bottom: 20px; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1 class="mb-4">Trading Database Dashboard</h1>
-        
-        <div class="row">
-            <div class="col-md-6">
-                <div class="card">
-                    <div class="card-header">
-                        <h5>Navigation</h5>
-                    </div>
-                    <div class="card-body">
-                        <ul class="list-group">
-                            <li class="list-group-item"><a href="/strategies">View Strategies</a></li>
-                            <li class="list-group-item"><a href="/orders">View Orders</a></li>
-                            <li class="list-group-item"><a href="/trades">View Trades</a></li>
-                            <li class="list-group-item"><a href="/logs">View Logs</a></li>
-                            <li class="list-group-item"><a href="/portfolio_snapshots">View Portfolio Snapshots</a></li>
-                        </ul>
-                    </div>
-                </div>
-            </div>
+    direction, boundary = 'next', None
+    if cursor and not last:
+        try:
+            direction, boundary, row_id = decode_page_token(cursor)
+        except InvalidPageToken as e:
+            abort(400, description=str(e))
+        if row_id is not None:
+            abort(400, description="Invalid page token: snapshot pages are keyed on time alone")
+    
+    # Filled in while the table streams; the template reads it after the loop
+    page = {'next_cursor': None, 'prev_cursor': None}
+    
+    def snapshot_rows():
+        with db_manager.checkout() as db:
+            condition = "portfolio_id = %s"
+            params = (portfolio_id,)
+            has_earlier = direction == 'next' and boundary is not None
+            if direction == 'prev' or last:
+                start, has_earlier = snapshot_page_start(db, portfolio_id, per_page, before=boundary)
+                if start is not None:
+                    condition += " AND time >= %s"
+                    params += (start,)
+                if boundary is not None:
+                    condition += " AND time < %s"
+                    params += (boundary,)
+            elif boundary is not None:
+                condition += " AND time > %s"
+                params += (boundary,)
             
-            <div class="col-md-6">
-                <div class="card">
-                    <div class="card-header">
-                        <h5>Database Overview</h5>
-                    </div>
-                    <div class="card-body">
-                        <p>This dashboard provides visualization of trading data stored in the database.</p>
-                        <p>Use the navigation links to explore different aspects of the data.</p>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </div>
-    
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/js/bootstrap.bundle.min.js"></script>
-</body>
-</html>
-    ''')
-
-with open('templates/strategies.html', 'w') as f:
-    f.write('''
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Strategies</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
-    <style>
-        body { padding: 20px; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1 class="mb-4">Strategies</h1>
-        <a href="/" class="btn btn-primary mb-3">Back to Dashboard</a>
-        
-        <div class="card">
-            <div class="card-header">
-                <h5>Strategy List</h5>
-            </div>
-            <div class="card-body">
-                <table class="table table-striped">
-                    <thead>
-                        <tr>
-                            <th>Strategy ID</th>
-                            <th>Direction</th>
-                            <th>Symbol</th>
-                            <th>Portfolio ID</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        {% for strategy in strategies %}
-                        <tr>
-                            <td>{{ strategy.strategy_id }}</td>
-                            <td>{{ strategy.direction }}</td>
-                            <td>{{ strategy.symbol }}</td>
-                            <td>{{ strategy.portfolio_id }}</td>
-                        </tr>
-                        {% endfor %}
-                    </tbody>
-                </table>
-            </div>
-        </div>
-    </div>
-    
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/js/bootstrap.bundle.min.js"></script>
-</body>
-</html>
-    ''')
-
-with open('templates/orders.html', 'w') as f:
-    f.write('''
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Orders</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
-    <style>
-        body { padding: 20px; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1 class="mb-4">Orders</h1>
-        <a href="/" class="btn btn-primary mb-3">Back to Dashboard</a>
-        
-        <div class="card">
-            <div class="card-header">
-                <h5>Order List ({{ total_count }} total orders)</h5>
-            </div>
-            <div class="card-body">
-                <table class="table table-striped">
-                    <thead>
-                        <tr>
-                            <th>Order ID</th>
-                            <th>Time</th>
-                            <th>Strategy ID</th>
-                            <th>Price</th>
-                            <th>Quantity</th>
-                            <th>Side</th>
-                            <th>Symbol</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        {% for order in orders %}
-                        <tr>
-                            <td>{{ order.order_id }}</td>
-                            <td>{{ order.time }}</td>
-                            <td>{{ order.strategy_id }}</td>
-                            <td>{{ order.price }}</td>
-                            <td>{{ order.qty }}</td>
-                            <td>{{ order.side }}</td>
-                            <td>{{ order.symbol }}</td>
-                        </tr>
-                        {% endfor %}
-                    </tbody>
-                </table>
-                
-                <!-- Pagination -->
-                <nav>
-                    <ul class="pagination">
-                        {% if page > 1 %}
-                        <li class="page-item">
-                            <a class="page-link" href="{{ url_for('orders', page=page-1) }}">Previous</a>
-                        </li>
-                        {% endif %}
-                        
-                        {% for i in range(page-2, page+3) if i > 0 and i <= total_pages %}
-                        <li class="page-item {% if i == page %}active{% endif %}">
-                            <a class="page-link" href="{{ url_for('orders', page=i) }}">{{ i }}</a>
-                        </li>
-                        {% endfor %}
-                        
-                        {% if page < total_pages %}
-                        <li class="page-item">
-                            <a class="page-link" href="{{ url_for('orders', page=page+1) }}">Next</a>
-                        </li>
-                        {% endif %}
-                    </ul>
-                </nav>
-            </div>
-        </div>
-    </div>
-    
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/js/bootstrap.bundle.min.js"></script>
-</body>
-</html>
-    ''')
-
-with open('templates/trades.html', 'w') as f:
-    f.write('''
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Trades</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
-    <style>
-        body { padding: 20px; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1 class="mb-4">Trades</h1>
-        <a href="/" class="btn btn-primary mb-3">Back to Dashboard</a>
-        
-        <div class="card">
-            <div class="card-header">
-                <h5>Trade List ({{ total_count }} total trades)</h5>
-            </div>
-            <div class="card-body">
-                <table class="table table-striped">
-                    <thead>
-                        <tr>
-                            <th>Trade ID</th>
-                            <th>Time</th>
-                            <th>Strategy ID</th>
-                            <th>Price</th>
-                            <th>Quantity</th>
-                            <th>Side</th>
-                            <th>Symbol</th>
-                            <th>Volume</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        {% for trade in trades %}
-                        <tr>
-                            <td>{{ trade.trade_id }}</td>
-                            <td>{{ trade.time }}</td>
-                            <td>{{ trade.strategy_id }}</td>
-                            <td>{{ trade.price }}</td>
-                            <td>{{ trade.qty }}</td>
-                            <td>{{ trade.side }}</td>
-                            <td>{{ trade.symbol }}</td>
-                            <td>{{ trade.volume }}</td>
-                        </tr>
-                        {% endfor %}
-                    </tbody>
-                </table>
-                
-                <!-- Pagination -->
-                <nav>
-                    <ul class="pagination">
-                        {% if page > 1 %}
-                        <li class="page-item">
-                            <a class="page-link" href="{{ url_for('trades', page=page-1) }}">Previous</a>
-                        </li>
-                        {% endif %}
-                        
-                        {% for i in range(page-2, page+3) if i > 0 and i <= total_pages %}
-                        <li class="page-item {% if i == page %}active{% endif %}">
-                            <a class="page-link" href="{{ url_for('trades', page=i) }}">{{ i }}</a>
-                        </li>
-                        {% endfor %}
-                        
-                        {% if page < total_pages %}
-                        <li class="page-item">
-                            <a class="page-link" href="{{ url_for('trades', page=page+1) }}">Next</a>
-                        </li>
-                        {% endif %}
-                    </ul>
-                </nav>
-            </div>
-        </div>
-    </div>
-    
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/js/bootstrap.bundle.min.js"></script>
-</body>
-</html>
-    ''')
-
-with open('templates/logs.html', 'w') as f:
-    f.write('''
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Logs</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
-    <style>
-        body { padding: 20px; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1 class="mb-4">Logs</h1>
-        <a href="/" class="btn btn-primary mb-3">Back to Dashboard</a>
-        
-        <div class="card">
-            <div class="card-header">
-                <h5>Log List ({{ total_count }} total logs)</h5>
-            </div>
-            <div class="card-body">
-                <table class="table table-striped">
-                    <thead>
-                        <tr>
-                            <th>Log ID</th>
-                            <th>Time</th>
-                            <th>Message</th>
-                            <th>Portfolio ID</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        {% for log in logs %}
-                        <tr>
-                            <td>{{ log.log_id }}</td>
-                            <td>{{ log.time }}</td>
-                            <td>{{ log.message }}</td>
-                            <td>{{ log.portfolio_id }}</td>
-                        </tr>
-                        {% endfor %}
-                    </tbody>
-                </table>
-                
-                <!-- Pagination -->
-                <nav>
-                    <ul class="pagination">
-                        {% if page > 1 %}
-                        <li class="page-item">
-                            <a class="page-link" href="{{ url_for('logs', page=page-1) }}">Previous</a>
-                        </li>
-                        {% endif %}
-                        
-                        {% for i in range(page-2, page+3) if i > 0 and i <= total_pages %}
-                        <li class="page-item {% if i == page %}active{% endif %}">
-                            <a class="page-link" href="{{ url_for('logs', page=i) }}">{{ i }}</a>
-                        </li>
-                        {% endfor %}
-                        
-                        {% if page < total_pages %}
-                        <li class="page-item">
-                            <a class="page-link" href="{{ url_for('logs', page=page+1) }}">Next</a>
-                        </li>
-                        {% endif %}
-                    </ul>
-                </nav>
-            </div>
-        </div>
-    </div>
-    
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/js/bootstrap.bundle.min.js"></script>
-</body>
-</html>
-    ''')
-
-with open('templates/portfolio_snapshots.html', 'w') as f:
-    f.write('''
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Portfolio Snapshots</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
-    <style>
-        body { padding: 20px; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1 class="mb-4">Portfolio Snapshots</h1>
-        <a href="/" class="btn btn-primary mb-3">Back to Dashboard</a>
-        
-        <div class="card mb-4">
-            <div class="card-header">
-                <h5>Portfolio Performance Graph (Portfolio ID: {{ portfolio_id }})</h5>
-            </div>
-            <div class="card-body">
-                <img src="data:image/png;base64,{{ plot_data }}" class="img-fluid" alt="Portfolio Performance Graph">
-            </div>
-        </div>
-        
-        <div class="card">
-            <div class="card-header">
-                <h5>Portfolio Snapshot Data</h5>
-            </div>
-            <div class="card-body">
-                <div class="table-responsive" style="max-height: 500px; overflow-y: auto;">
-                    <table class="table table-striped">
-                        <thead>
-                            <tr>
-                                <th>Time</th>
-                                <th>Fund</th>
-                                <th>Leverage</th>
-                                <th>Position</th>
-                                <th>Order Value</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                            {% for snapshot in snapshots %}
-                            <tr>
-                                <td>{{ snapshot.time }}</td>
-                                <td>{{ snapshot.fund }}</td>
-                                <td>{{ snapshot.leverage }}</td>
-                                <td>{{ snapshot.position }}</td>
-                                <td>{{ snapshot.order_value }}</td>
-                            </tr>
-                            {% endfor %}
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-        </div>
-    </div>
-    
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/js/bootstrap.bundle.min.js"></script>
-</body>
-</html>
-    ''')
-
-# Create the dashboard.html template
-with open('templates/dashboard.html', 'w') as f:
-    f.write('''
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Trading System Dashboard</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
-    <style>
-        body { padding: 20px; }
-        .section-card { margin-bottom: 30px; }
-    </style>
-</head>
-<body>
-    <div class="container-fluid">
-        <h1 class="mb-4 text-center">Trading System Dashboard</h1>
-        
-        <div class="row">
-            <div class="col-md-6">
-                <!-- Portfolio Performance Graph -->
-                <div class="card section-card">
-                    <div class="card-header">
-                        <h5>Portfolio Performance (ID: {{ portfolio_id }})</h5>
-                    </div>
-                    <div class="card-body">
-                        {% if portfolio_plot %}
-                        <img src="data:image/png;base64,{{ portfolio_plot }}" class="img-fluid" alt="Portfolio Performance Graph">
-                        {% else %}
-                        <p class="text-center">No portfolio data available</p>
-                        {% endif %}
-                    </div>
-                    <div class="card-footer">
-                        <a href="{{ url_for('portfolio_snapshots') }}" class="btn btn-primary btn-sm">View All Snapshots</a>
-                    </div>
-                </div>
-                
-                <!-- Strategy PnL Graph -->
-                <div class="card section-card">
-                    <div class="card-header">
-                        <h5>Strategy PnL Over Time</h5>
-                    </div>
-                    <div class="card-body">
-                        {% if strategy_pnl_plot %}
-                        <img src="data:image/png;base64,{{ strategy_pnl_plot }}" class="img-fluid" alt="Strategy PnL Graph">
-                        {% else %}
-                        <p class="text-center">No strategy PnL data available</p>
-                        {% endif %}
-                    </div>
-                </div>
-                
-                <!-- Trade Volume Graph -->
-                <div class="card section-card">
-                    <div class="card-header">
-                        <h5>Trading Volume Over Time</h5>
-                    </div>
-                    <div class="card-body">
-                        {% if trade_volume_plot %}
-                        <img src="data:image/png;base64,{{ trade_volume_plot }}" class="img-fluid" alt="Trade Volume Graph">
-                        {% else %}
-                        <p class="text-center">No trade volume data available</p>
-                        {% endif %}
-                    </div>
-                </div>
-                
-                <!-- Trade Fee Graph -->
-                <div class="card section-card">
-                    <div class="card-header">
-                        <h5>Trading Fees Over Time</h5>
-                    </div>
-                    <div class="card-body">
-                        {% if trade_fee_plot %}
-                        <img src="data:image/png;base64,{{ trade_fee_plot }}" class="img-fluid" alt="Trade Fee Graph">
-                        {% else %}
-                        <p class="text-center">No trade fee data available</p>
-                        {% endif %}
-                    </div>
-                </div>
-                
-                <!-- Strategies Section -->
-                <div class="card section-card">
-                    <div class="card-header">
-                        <h5>Strategies</h5>
-                    </div>
-                    <div class="card-body">
-                        <table class="table table-striped table-sm">
-                            <thead>
-                                <tr>
-                                    <th>Strategy ID</th>
-                                    <th>Direction</th>
-                                    <th>Symbol</th>
-                                    <th>Portfolio ID</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                {% for strategy in strategies %}
-                                <tr>
-                                    <td>{{ strategy.strategy_id }}</td>
-                                    <td>{{ strategy.direction }}</td>
-                                    <td>{{ strategy.symbol }}</td>
-                                    <td>{{ strategy.portfolio_id }}</td>
-                                </tr>
-                                {% endfor %}
-                            </tbody>
-                        </table>
-                    </div>
-                    <div class="card-footer">
-                        <a href="{{ url_for('strategies') }}" class="btn btn-primary btn-sm">View All Strategies</a>
-                    </div>
-                </div>
-                
-                <!-- Portfolio Snapshots Section -->
-                <div class="card section-card">
-                    <div class="card-header">
-                        <h5>Recent Portfolio Snapshots</h5>
-                    </div>
-                    <div class="card-body">
-                        <table class="table table-striped table-sm">
-                            <thead>
-                                <tr>
-                                    <th>Time</th>
-                                    <th>Fund</th>
-                                    <th>Leverage</th>
-                                    <th>Position</th>
-                                    <th>Order Value</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                {% for snapshot in snapshots %}
-                                <tr>
-                                    <td>{{ snapshot.time }}</td>
-                                    <td>{{ snapshot.fund }}</td>
-                                    <td>{{ snapshot.leverage }}</td>
-                                    <td>{{ snapshot.position }}</td>
-                                    <td>{{ snapshot.order_value }}</td>
-                                </tr>
-                                {% endfor %}
-                            </tbody>
-                        </table>
-                    </div>
-                </div>
-            </div>
+            # One extra row tells whether a later page exists
+            rows = db.iter_table_data('Portfolio_Snapshot', ['time', 'fund', 'leverage', 'position', 'order_value'],
+                                      condition, params, order_by='time', itersize=500, limit=per_page + 1)
+            try:
+                first_time = last_time = None
+                has_later = direction == 'prev' and boundary is not None
+                for count, s in enumerate(rows):
+                    if count == per_page:
+                        has_later = True
+                        break
+                    if first_time is None:
+                        first_time = s[0]
+                    last_time = s[0]
+                    yield {
+                        'time': s[0],
+                        'fund': s[1],
+                        'leverage': s[2],
+                        'position': s[3],
+                        'order_value': s[4]
+                    }
+                if last_time is not None:
+                    if has_later:
+                        page['next_cursor'] = encode_page_token('next', last_time)
+                    if has_earlier:
+                        page['prev_cursor'] = encode_page_token('prev', first_time)
+            finally:
+                # Close the named cursor before the connection goes back to the pool
+                rows.close()
+    
+    body = stream_template('portfolio_snapshots.html',
+                           snapshots=snapshot_rows(),
+                           page=page,
+                           per_page=per_page,
+                           portfolio_id=portfolio_id)
+    return app.response_class(buffer_chunks(body), mimetype='text/html')
+
+@app.route('/portfolio_snapshots/plot.png')
+@conditional_page('Portfolio_Snapshot')
+def portfolio_snapshots_plot():
+    """Serve the portfolio snapshot graph as a PNG"""
+    portfolio_id = request.args.get('portfolio_id', 1718693033751000, type=int)
+    
+    with db_manager.checkout() as db:
+        png = generate_portfolio_metrics_plot(db, portfolio_id)
+    
+    if png is None:
+        abort(404, description=f"No snapshots for portfolio {portfolio_id}")
+    return app.response_class(png, mimetype='image/png')
+
+def to_epoch_ms(value):
+    """Convert a TIMESTAMP column value to epoch milliseconds (wall time read as UTC)"""
+    return int(value.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+def slice_columns(payload, start):
+    """Drop the first start entries of every column (list value) in a columnar payload"""
+    return {name: values[start:] if isinstance(values, list) else values
+            for name, values in payload.items()}
+
+def portfolio_series_columns(db_manager, portfolio_id, points=None, since_ms=None):
+    """Columnar fund series for a portfolio after since_ms (all of it when None), LTTB-downsampled to points when given"""
+    times, funds = get_portfolio_series(db_manager, portfolio_id, since_ms)
+    if points:
+        times, funds = lttb(times, funds, points)
+    return {
+        'portfolio_id': portfolio_id,
+        'time': [to_epoch_ms(t) for t in times],
+        'fund': funds
+    }
+
+@cached_chart(chart_cache, portfolio_watermark)
+def portfolio_series_payload(db_manager, portfolio_id, points=None):
+    """The full columnar fund series of a portfolio; only this variant is cached, as ?since= values rarely repeat"""
+    return portfolio_series_columns(db_manager, portfolio_id, points)
+
+@cached_chart(chart_cache, trade_watermark)
+def hourly_trade_series_payload(db_manager):
+    """Columnar hourly volume and fee series"""
+    hours, volumes, fees = get_hourly_trade_series(db_manager)
+    return {
+        'hour': [to_epoch_ms(h) for h in hours],
+        'volume': volumes,
+        'fee': fees
+    }
+
+@cached_chart(chart_cache, strategy_pnl_watermark)
+def strategy_pnl_series_payload(db_manager, points=None):
+    """Columnar PnL series for each strategy, each LTTB-downsampled to points when given"""
+    strategy_data = compute_strategy_pnl(db_manager, points)
+    strategies = {}
+    for strategy_id, data in strategy_data.items():
+        times, pnls = data['times'], data['pnls']
+        if points:
+            times, pnls = lttb(times, pnls, points)
+        strategies[strategy_id] = {
+            'time': [to_epoch_ms(t) for t in times],
+            'pnl': pnls
+        }
+    return {'strategies': strategies}
+
+@app.route('/api/series/portfolio/<int:portfolio_id>')
+@conditional_page('Portfolio_Snapshot')
+def api_portfolio_series(portfolio_id):
+    """
+    Portfolio fund over time as columnar JSON: {"time": [...], "fund": [...]}.
+    Times are epoch milliseconds; pass ?since=<ms> to get only newer points.
+    The series is LTTB-downsampled to ?points=N (0 for every row).
+    """
+    since = request.args.get('since', type=int)
+    points = request.args.get('points', API_DEFAULT_POINTS, type=int)
+    
+    with db_manager.checkout() as db:
+        if since is None:
+            payload = portfolio_series_payload(db, portfolio_id, points)
+        else:
+            # Incremental fetches read only the newer rows and are not cached
+            payload = portfolio_series_columns(db, portfolio_id, points, since)
+    
+    return jsonify(payload)
+
+@app.route('/api/series/trades/hourly')
+@conditional_page('Trade')
+def api_hourly_trade_series():
+    """
+    Hourly trade volume and fees as columnar JSON: {"hour": [...], "volume": [...], "fee": [...]}.
+    With ?since=<ms> the hour containing since is re-sent, as it may still be filling up.
+    """
+    since = request.args.get('since', type=int)
+    
+    with db_manager.checkout() as db:
+        payload = hourly_trade_series_payload(db)
+    
+    if since is not None:
+        hour_start = since - since % 3600000
+        payload = slice_columns(payload, bisect_left(payload['hour'], hour_start))
+    
+    return jsonify(payload)
+
+@app.route('/api/series/strategy_pnl')
+@conditional_page('Trade', 'Strategy_PnL_State')
+def api_strategy_pnl_series():
+    """
+    Per-strategy PnL as columnar JSON: {"strategies": {id: {"time": [...], "pnl": [...]}}}.
+    Unrealized PnL is marked to the latest price, so the whole series is always returned,
+    LTTB-downsampled per strategy to ?points=N (0 for every trade).
+    """
+    points = request.args.get('points', API_DEFAULT_POINTS, type=int)
+    
+    with db_manager.checkout() as db:
+        payload = strategy_pnl_series_payload(db, points)
+    
+    return jsonify(payload)
+
+# Live updates: one thread per worker polls cheap (time, id) seeks every
+# STREAM_INTERVAL seconds per streamed portfolio and hands each open dashboard
+# the rows it has not been sent yet
+STREAM_INTERVAL = 2.0
+STREAM_HEARTBEAT = 15.0  # seconds of silence before a keep-alive comment
+STREAM_MAX_AGE = 300.0  # streams end after this long; EventSource resumes from Last-Event-ID
+STREAM_MAX_ROWS = 200  # per table per tick; a backlog drains over several ticks
+STREAM_RETRY_MS = 2000
+# Every open stream holds a server thread; past this many per worker new ones get a 503,
+# leaving the other threads (WEB_THREADS, see gunicorn.conf.py) for pages
+STREAM_MAX_CLIENTS = int(os.environ.get('STREAM_MAX_CLIENTS', max(1, int(os.environ.get('WEB_THREADS', 8)) // 2)))
+STREAM_BUSY_RETRY_MS = 10000
+# Writers commit out of key order, so a row can become visible behind the position
+# already streamed; every tick re-checks this far behind it for rows not yet sent
+STREAM_LATE_WINDOW = timedelta(seconds=10)
+
+# name: (table, columns, key columns); the key must be unique and indexed
+STREAM_TABLES = {
+    'orders': ('Trade_Order', ['order_id', 'time', 'strategy_id', 'price', 'qty', 'side', 'symbol'], ['time', 'order_id']),
+    'trades': ('Trade', ['trade_id', 'time', 'strategy_id', 'price', 'qty', 'side', 'symbol', 'volume'], ['time', 'trade_id']),
+    'logs': ('Log', ['log_id', 'time', 'message', 'portfolio_id'], ['time', 'log_id']),
+    'snapshots': ('Portfolio_Snapshot', ['time', 'fund', 'leverage', 'position', 'order_value'], ['time'])
+}
+
+def stream_filter(name, portfolio_id):
+    """Extra WHERE condition and parameters for a streamed table"""
+    if name == 'snapshots':
+        return "portfolio_id = %s", (portfolio_id,)
+    return None, ()
+
+@timed('latest_key')
+def latest_key(db_manager, name, portfolio_id):
+    """Key of the newest row of a streamed table as JSON-friendly values, or None if it is empty"""
+    table_name, _, key_columns = STREAM_TABLES[name]
+    condition, params = stream_filter(name, portfolio_id)
+    order = ', '.join(f"{column} DESC" for column in key_columns)
+    query = f"SELECT {', '.join(key_columns)} FROM {table_name}"
+    if condition:
+        query += f" WHERE {condition}"
+    db_manager.cursor.execute(query + f" ORDER BY {order} LIMIT 1", params)
+    row = db_manager.cursor.fetchone()
+    if row is None:
+        return None
+    return [value.isoformat() if hasattr(value, 'isoformat') else value for value in row]
+
+@timed('fetch_new_rows')
+def fetch_new_rows(db_manager, name, portfolio_id, after):
+    """
+    Fetch the rows of a streamed table past a key, oldest first.
+    
+    Args:
+        db_manager: DatabaseManager to query with
+        name: Key of STREAM_TABLES
+        portfolio_id: Portfolio whose snapshots are streamed
+        after: Last key already sent (None to start from the beginning)
+        
+    Returns:
+        List of row tuples, at most STREAM_MAX_ROWS
+    """
+    table_name, columns, key_columns = STREAM_TABLES[name]
+    condition, params = stream_filter(name, portfolio_id)
+    key = f"({', '.join(key_columns)})"
+    clauses = [condition] if condition else []
+    params = list(params)
+    if after is not None:
+        clauses.append(f"{key} > ({', '.join(['%s'] * len(key_columns))})")
+        params.extend(after)
+    
+    query = f"SELECT {', '.join(columns)} FROM {table_name}"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += f" ORDER BY {', '.join(key_columns)} LIMIT %s"
+    params.append(STREAM_MAX_ROWS)
+    
+    db_manager.cursor.execute(query, params)
+    return db_manager.cursor.fetchall()
+
+def late_window(name, portfolio_id, after):
+    """WHERE clause and parameters for the rows of a streamed table within STREAM_LATE_WINDOW at or behind after"""
+    _, _, key_columns = STREAM_TABLES[name]
+    condition, params = stream_filter(name, portfolio_id)
+    clauses = [condition] if condition else []
+    clauses.append(f"{key_columns[0]} >= %s")
+    clauses.append(f"({', '.join(key_columns)}) <= ({', '.join(['%s'] * len(key_columns))})")
+    params = list(params) + [datetime.fromisoformat(after[0]) - STREAM_LATE_WINDOW] + list(after)
+    return " WHERE " + " AND ".join(clauses), params
+
+def row_key(name, row):
+    """The key columns of a streamed row, as a hashable tuple"""
+    _, columns, key_columns = STREAM_TABLES[name]
+    return tuple(row[columns.index(column)] for column in key_columns)
+
+@timed('fetch_window_rows')
+def fetch_window_rows(db_manager, name, portfolio_id, after):
+    """Rows of a streamed table within STREAM_LATE_WINDOW at or behind after, oldest first"""
+    table_name, columns, key_columns = STREAM_TABLES[name]
+    where, params = late_window(name, portfolio_id, after)
+    db_manager.cursor.execute(f"SELECT {', '.join(columns)} FROM {table_name}{where} ORDER BY {', '.join(key_columns)}",
+                              params)
+    return db_manager.cursor.fetchall()
+
+@timed('fetch_late_rows')
+def fetch_late_rows(db_manager, name, portfolio_id, after, recent):
+    """
+    Fetch rows that became visible behind the stream position after it moved past them.
+    
+    Under READ COMMITTED a writer can commit a row with a smaller (time, id) key
+    after a row with a larger key was committed and streamed. Such rows are looked
+    for within STREAM_LATE_WINDOW behind the position: a COUNT(*) over the (time, id)
+    index is compared with the keys already sent there, and the window is only read
+    when they differ. Rows committed later than that behind the position are missed.
+    
+    Args:
+        db_manager: DatabaseManager to query with
+        name: Key of STREAM_TABLES
+        portfolio_id: Portfolio whose snapshots are streamed
+        after: Last key sent
+        recent: Keys already sent within the window
+        
+    Returns:
+        List of row tuples not sent yet, oldest first
+    """
+    table_name = STREAM_TABLES[name][0]
+    where, params = late_window(name, portfolio_id, after)
+    db_manager.cursor.execute(f"SELECT COUNT(*) FROM {table_name}{where}", params)
+    if db_manager.cursor.fetchone()[0] == len(recent):
+        return []
+    return [row for row in fetch_window_rows(db_manager, name, portfolio_id, after)
+            if row_key(name, row) not in recent]
+
+def remember_sent(name, rows, position, recent):
+    """Record the keys of sent rows and forget those that fell out of the window behind position"""
+    for row in rows:
+        key = row_key(name, row)
+        recent[key] = key[0]
+    horizon = datetime.fromisoformat(position[0]) - STREAM_LATE_WINDOW
+    for key in [key for key, key_time in recent.items() if key_time < horizon]:
+        del recent[key]
+
+def sent_window(db_manager, position, portfolio_id):
+    """Keys of the rows within STREAM_LATE_WINDOW at or behind position, taken as already sent"""
+    recent = {name: {} for name in STREAM_TABLES}
+    for name in STREAM_TABLES:
+        after = position.get(name)
+        if after is not None:
+            remember_sent(name, fetch_window_rows(db_manager, name, portfolio_id, after), after, recent[name])
+    return recent
+
+def poll_updates(db_manager, position, portfolio_id, include_series, recent):
+    """
+    Collect everything newer than position, plus rows that committed late behind it, and advance it.
+    
+    Args:
+        db_manager: DatabaseManager to query with
+        position: Dict of stream name to last key sent; updated in place
+        portfolio_id: Portfolio whose snapshots are streamed
+        include_series: Also send chart points (epoch-ms columns, as served by /api/series)
+        recent: Dict of stream name to the keys sent within STREAM_LATE_WINDOW; updated in place
+        
+    Returns:
+        Update dict with a list of display rows per stream name that has new rows, or None
+    """
+    update = {}
+    for name, (_, columns, key_columns) in STREAM_TABLES.items():
+        after = position.get(name)
+        late = fetch_late_rows(db_manager, name, portfolio_id, after, recent[name]) if after is not None else []
+        rows = late + fetch_new_rows(db_manager, name, portfolio_id, after)
+        if not rows:
+            continue
+        if len(rows) > len(late):
+            key_indices = [columns.index(column) for column in key_columns]
+            position[name] = [rows[-1][i].isoformat() if hasattr(rows[-1][i], 'isoformat') else rows[-1][i]
+                              for i in key_indices]
+        remember_sent(name, rows, position[name], recent[name])
+        # Rendered the way the dashboard template prints them
+        update[name] = [[str(value) for value in row] for row in rows]
+        
+        if include_series and name == 'snapshots':
+            points = rows
+            if late:
+                # Clients replace their points from the first one sent, so resend everything after a late one
+                db_manager.cursor.execute("""
+                    SELECT time, fund
+                    FROM Portfolio_Snapshot
+                    WHERE portfolio_id = %s AND time >= %s
+                    ORDER BY time
+                """, (portfolio_id, rows[0][0]))
+                points = db_manager.cursor.fetchall()
+            update['portfolio'] = {
+                'time': [to_epoch_ms(row[0]) for row in points],
+                'fund': [float(row[1]) for row in points]
+            }
+        if include_series and name == 'trades':
+            # The rollup is maintained in the inserting transaction, so it already covers these trades
+            db_manager.cursor.execute("""
+                SELECT hour, SUM(volume), SUM(fee)
+                FROM Trade_Hourly_Rollup
+                WHERE hour >= date_trunc('hour', %s::timestamp)
+                GROUP BY hour
+                ORDER BY hour
+            """, (rows[0][1],))
+            hourly = db_manager.cursor.fetchall()
+            update['hourly'] = {
+                'hour': [to_epoch_ms(row[0]) for row in hourly],
+                'volume': [float(row[1]) for row in hourly],
+                'fee': [float(row[2]) for row in hourly]
+            }
+    
+    return update or None
+
+def start_stream_feed(portfolio_id):
+    """Start the shared stream of a portfolio at the current newest rows"""
+    with db_manager.checkout() as db:
+        position = {name: latest_key(db, name, portfolio_id) for name in STREAM_TABLES}
+        return position, sent_window(db, position, portfolio_id)
+
+def poll_stream_feed(portfolio_id, position, recent):
+    """One shared poll for every stream of a portfolio; chart points are added for the clients that want them"""
+    with db_manager.checkout() as db:
+        return poll_updates(db, position, portfolio_id, True, recent)
+
+stream_feed = StreamFeed(start_stream_feed, poll_stream_feed, STREAM_MAX_CLIENTS, interval=STREAM_INTERVAL)
+
+@app.route('/api/stream')
+def api_stream():
+    """
+    Server-Sent Events feed of new orders, trades, logs and portfolio snapshots.
+    
+    Each 'update' event carries only the rows added since the previous one; its id
+    encodes the last key sent per table, so a reconnecting EventSource (Last-Event-ID)
+    or a client passing ?since=<id> resumes without gaps. Without either the stream
+    starts at the current newest rows. ?series=1 adds chart points to each update.
+    Rows are found by their (time, id) key. Rows that commit behind keys already
+    sent are still picked up within STREAM_LATE_WINDOW (see fetch_late_rows); on
+    resume, rows in that window are assumed to have been delivered.
+    
+    Updates come from the worker's shared poll (stream_feed). A resumed stream first
+    catches up on its own connection, then joins it. Past STREAM_MAX_CLIENTS open
+    streams the worker answers 503 with a retry delay.
+    """
+    portfolio_id = request.args.get('portfolio_id', 1718693033751000, type=int)
+    include_series = request.args.get('series', 0, type=int) == 1
+    token = request.headers.get('Last-Event-ID') or request.args.get('since')
+    
+    position = recent = None
+    if token:
+        try:
+            position = decode_stream_token(token)
+        except InvalidPageToken as e:
+            abort(400, description=str(e))
+        for name in STREAM_TABLES:
+            after = position.get(name)
+            if after is not None and (not isinstance(after, list) or len(after) != len(STREAM_TABLES[name][2])):
+                abort(400, description=f"Invalid stream token: bad position for {name}")
+        # Keys already sent within the late window, so rows found there again are not resent
+        with db_manager.checkout() as db:
+            try:
+                recent = sent_window(db, position, portfolio_id)
+            except (ValueError, TypeError) as e:
+                abort(400, description=f"Invalid stream token: {e}")
+    
+    subscription = stream_feed.subscribe(portfolio_id)
+    if subscription is None:
+        response = app.response_class(f"retry: {STREAM_BUSY_RETRY_MS}\n\n", status=503, mimetype='text/event-stream')
+        response.retry_after = STREAM_BUSY_RETRY_MS // 1000
+        return response
+    seq, feed_position = subscription
+    if token:
+        # Behind the shared poll until caught up
+        seq = None
+    else:
+        position = feed_position
+    
+    def events(position, recent, seq):
+        # An id-only event sets the resume point even if no update is ever sent
+        yield f"retry: {STREAM_RETRY_MS}\nid: {encode_stream_token(position)}\n\n"
+        # Rows sent while catching up, which the shared poll may deliver again
+        caught_up = set()
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < STREAM_MAX_AGE:
+            if seq is None:
+                # Catch up on a pooled connection (held only for the delta queries), then join the shared poll
+                mark = stream_feed.mark(portfolio_id)
+                with db_manager.checkout() as db:
+                    if recent is None:
+                        recent = sent_window(db, position, portfolio_id)
+                    update = poll_updates(db, position, portfolio_id, include_series, recent)
+                if update is None:
+                    seq = mark
+                    continue
+                for name in STREAM_TABLES:
+                    caught_up.update(tuple(row) for row in update.get(name, ()))
+                data = app.json.dumps(update)
+                yield f"id: {encode_stream_token(position)}\nevent: update\ndata: {data}\n\n"
+                last_sent = time.monotonic()
+                continue
             
-            <div class="col-md-6">
-                <!-- Orders Section -->
-                <div class="card section-card">
-                    <div class="card-header">
-                        <h5>Recent Orders</h5>
-                    </div>
-                    <div class="card-body">
-                        <table class="table table-striped table-sm">
-                            <thead>
-                                <tr>
-                                    <th>Order ID</th>
-                                    <th>Time</th>
-                                    <th>Strategy ID</th>
-                                    <th>Price</th>
-                                    <th>Qty</th>
-                                    <th>Side</th>
-                                    <th>Symbol</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                {% for order in orders %}
-                                <tr>
-                                    <td>{{ order.order_id }}</td>
-                                    <td>{{ order.time }}</td>
-                                    <td>{{ order.strategy_id }}</td>
-                                    <td>{{ order.price }}</td>
-                                    <td>{{ order.qty }}</td>
-                                    <td>{{ order.side }}</td>
-                                    <td>{{ order.symbol }}</td>
-                                </tr>
-                                {% endfor %}
-                            </tbody>
-                        </table>
-                    </div>
-                    <div class="card-footer">
-                        <a href="{{ url_for('orders') }}" class="btn btn-primary btn-sm">View All Orders</a>
-                    </div>
-                </div>
-                
-                <!-- Trades Section -->
-                <div class="card section-card">
-                    <div class="card-header">
-                        <h5>Recent Trades</h5>
-                    </div>
-                    <div class="card-body">
-                        <table class="table table-striped table-sm">
-                            <thead>
-                                <tr>
-                                    <th>Trade ID</th>
-                                    <th>Time</th>
-                                    <th>Strategy ID</th>
-                                    <th>Price</th>
-                                    <th>Qty</th>
-                                    <th>Side</th>
-                                    <th>Symbol</th>
-                                    <th>Volume</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                {% for trade in trades %}
-                                <tr>
-                                    <td>{{ trade.trade_id }}</td>
-                                    <td>{{ trade.time }}</td>
-                                    <td>{{ trade.strategy_id }}</td>
-                                    <td>{{ trade.price }}</td>
-                                    <td>{{ trade.qty }}</td>
-                                    <td>{{ trade.side }}</td>
-                                    <td>{{ trade.symbol }}</td>
-                                    <td>{{ trade.volume }}</td>
-                                </tr>
-                                {% endfor %}
-                            </tbody>
-                        </table>
-                    </div>
-                    <div class="card-footer">
-                        <a href="{{ url_for('trades') }}" class="btn btn-primary btn-sm">View All Trades</a>
-                    </div>
-                </div>
-                
-                <!-- Logs Section -->
-                <div class="card section-card">
-                    <div class="card-header">
-                        <h5>Recent Logs</h5>
-                    </div>
-                    <div class="card-body">
-                        <table class="table table-striped table-sm">
-                            <thead>
-                                <tr>
-                                    <th>Log ID</th>
-                                    <th>Time</th>
-                                    <th>Message</th>
-                                    <th>Portfolio ID</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                {% for log in logs %}
-                                <tr>
-                                    <td>{{ log.log_id }}</td>
-                                    <td>{{ log.time }}</td>
-                                    <td>{{ log.message }}</td>
-                                    <td>{{ log.portfolio_id }}</td>
-                                </tr>
-                                {% endfor %}
-                            </tbody>
-                        </table>
-                    </div>
-                    <div class="card-footer">
-                        <a href="{{ url_for('logs') }}" class="btn btn-primary btn-sm">View All Logs</a>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </div>
-    
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/js/bootstrap.bundle.min.js"></script>
-</body>
-</html>
-    ''')
+            wait = min(STREAM_HEARTBEAT - (time.monotonic() - last_sent), STREAM_MAX_AGE - (time.monotonic() - started))
+            updates = stream_feed.updates(portfolio_id, seq, max(wait, 0))
+            if updates is None:
+                # Fell out of the shared history; catch up again from the last key sent
+                seq = recent = None
+                continue
+            
+            for seq, shared, shared_position in updates:
+                update = {}
+                for name in STREAM_TABLES:
+                    rows = [row for row in shared.get(name, ()) if tuple(row) not in caught_up]
+                    if rows:
+                        update[name] = rows
+                        position[name] = shared_position[name]
+                if not update:
+                    continue
+                if include_series:
+                    update.update((key, shared[key]) for key in ('portfolio', 'hourly') if key in shared)
+                data = app.json.dumps(update)
+                yield f"id: {encode_stream_token(position)}\nevent: update\ndata: {data}\n\n"
+                last_sent = time.monotonic()
+            
+            if time.monotonic() - last_sent >= STREAM_HEARTBEAT:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+    
+    response = app.response_class(stream_with_context(events(position, recent, seq)), mimetype='text/event-stream')
+    response.call_on_close(lambda: stream_feed.unsubscribe(portfolio_id))
+    response.cache_control.no_cache = True
+    # Stop reverse proxies (nginx) from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.cli.command('precompile-templates')
+def precompile_templates():
+    """Compile every template into the bytecode cache; run once per deploy before starting workers"""
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    print(f"Precompiled {len(names)} templates into {TEMPLATE_CACHE_DIR}")
+
+@app.cli.command('update-pnl-state')
+@click.option('--rebuild', is_flag=True, help='Discard the saved state and replay every trade.')
+def update_pnl_state(rebuild):
+    """Apply new trades to the saved per-strategy PnL state; ingest does this too, the dashboard never does"""
+    with db_manager.checkout() as db:
+        if rebuild:
+            applied = rebuild_strategy_pnl_state(db)
+        else:
+            applied = update_strategy_pnl_state(db)
+    print(f"Applied {applied} trades to the strategy PnL state")
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,142 @@
+import threading
+from collections import deque
+
+class StreamFeed:
+    """
+    One poller per process shared by every open live-update stream.
+
+    Subscribers are grouped by a key (the portfolio they stream). A background
+    thread polls each key once per interval and appends what it found to a short
+    history of numbered updates; subscribers wait on the feed and read the updates
+    after the last one they saw. The database work per tick therefore follows the
+    number of keys, not the number of connections. The thread starts with the first
+    subscriber and exits after the last one leaves.
+
+    Each stream still holds a server thread, so the number of subscribers is capped;
+    subscribe() refuses new ones past max_clients.
+    """
+
+    def __init__(self, start, poll, max_clients: int, interval: float = 2.0, history: int = 30):
+        """
+        Initialize the feed
+
+        Args:
+            start: Called as start(key) in the feed thread; returns (position, state) for a new key
+            poll: Called as poll(key, position, state) in the feed thread; advances position in
+                place and returns an update, or None when nothing changed
+            max_clients: Maximum number of subscribers at once
+            interval: Seconds between polls
+            history: Number of updates kept per key for subscribers that fall behind
+        """
+        self.start = start
+        self.poll = poll
+        self.max_clients = max_clients
+        self.interval = interval
+        self.history = history
+        self.clients = 0
+        self._feeds = {}
+        self._condition = threading.Condition()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def subscribe(self, key, timeout: float = 10.0):
+        """
+        Register a subscriber and wait until the key has been started
+
+        Args:
+            key: Key to subscribe to
+            timeout: Seconds to wait for the first poll of a new key
+
+        Returns:
+            Tuple of (seq, position) to read updates after, or None if the feed is full
+            or the key could not be started in time; pass it on to updates()
+        """
+        with self._condition:
+            if self.clients >= self.max_clients:
+                return None
+            self.clients += 1
+            feed = self._feeds.get(key)
+            if feed is None:
+                feed = self._feeds[key] = {'subscribers': 0, 'ready': False, 'seq': 0,
+                                           'position': None, 'state': None, 'updates': deque(maxlen=self.history)}
+            feed['subscribers'] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stream-feed', daemon=True)
+                self._thread.start()
+            if not feed['ready']:
+                self._wake.set()
+                if not self._condition.wait_for(lambda: feed['ready'], timeout):
+                    self._release(key)
+                    return None
+            return feed['seq'], dict(feed['position'])
+
+    def unsubscribe(self, key):
+        """Remove a subscriber registered by subscribe()"""
+        with self._condition:
+            self._release(key)
+
+    def _release(self, key):
+        self.clients -= 1
+        feed = self._feeds[key]
+        feed['subscribers'] -= 1
+        if feed['subscribers'] == 0:
+            del self._feeds[key]
+
+    def mark(self, key) -> int:
+        """Number of the newest update of a subscribed key"""
+        with self._condition:
+            return self._feeds[key]['seq']
+
+    def updates(self, key, seq: int, timeout: float):
+        """
+        Wait for updates newer than seq
+
+        Args:
+            key: Subscribed key
+            seq: Number of the last update already read
+            timeout: Seconds to wait when there is nothing new
+
+        Returns:
+            List of (seq, update, position) tuples, oldest first (empty on timeout),
+            or None if updates after seq have already left the history
+        """
+        with self._condition:
+            feed = self._feeds[key]
+            self._condition.wait_for(lambda: feed['seq'] > seq, timeout)
+            updates = [entry for entry in feed['updates'] if entry[0] > seq]
+            if updates and updates[0][0] != seq + 1:
+                return None
+            return updates
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._feeds:
+                    self._thread = None
+                    return
+                feeds = list(self._feeds.items())
+
+            # Only this thread touches a feed's position and state outside the lock
+            for key, feed in feeds:
+                try:
+                    if not feed['ready']:
+                        position, state = self.start(key)
+                        with self._condition:
+                            feed['position'], feed['state'], feed['ready'] = position, state, True
+                            self._condition.notify_all()
+                        continue
+                    position = dict(feed['position'])
+                    update = self.poll(key, position, feed['state'])
+                except Exception as e:
+                    print(f"Error polling stream updates for {key}: {e}")
+                    continue
+                if update is None:
+                    continue
+                with self._condition:
+                    feed['seq'] += 1
+                    feed['position'] = position
+                    feed['updates'].append((feed['seq'], update, dict(position)))
+                    self._condition.notify_all()
+
+            self._wake.wait(self.interval)
+            self._wake.clear()
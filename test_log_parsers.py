@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+import db_manager
+
+BASE_MS = 1718693033751
+
+def log_line(data: dict) -> str:
+    """A log line as the trading system writes it, with the record after the 'Received data: ' marker."""
+    return f"2024-06-18 07:03:53.751 [INFO] Received data: {json.dumps({'data': data})}\n"
+
+def order_record(i: int, state: str = 'NEW', **overrides) -> dict:
+    record = {
+        'orderId': f'order-{i}',
+        'orderState': state,
+        'clientOrderId': f"{'LONG' if i % 2 else 'SHORT'}_strat{i % 3}_1718693033",
+        'createAt': str(BASE_MS + i * 1000),
+        'limitPrice': str(100 + i),
+        'orderQty': '0.5',
+        'side': 'BUY' if i % 2 else 'SELL',
+        'sym': 'BTCUSDT' if i % 3 else 'ETHUSDT',
+    }
+    record.update(overrides)
+    return record
+
+def trade_record(i: int, **overrides) -> dict:
+    record = {
+        'transactionId': f'trade-{i}',
+        'clientOrderId': f"{'LONG' if i % 2 else 'SHORT'}_strat{i % 3}_1718693033",
+        'createAt': str(BASE_MS + i * 1000),
+        'price': str(100 + i),
+        'quantity': '0.5',
+        'side': 'BUY' if i % 2 else 'SELL',
+        'sym': 'BTCUSDT' if i % 3 else 'ETHUSDT',
+    }
+    record.update(overrides)
+    return record
+
+@pytest.fixture
+def orders_log(tmp_path):
+    lines = [
+        # Accepted, but its strategy id cannot be extracted: later NEW records for it must still be ignored
+        log_line(order_record(0, clientOrderId=12345)),
+        # Accepted with a strategy, but the rest of the record fails to parse
+        log_line(order_record(1, limitPrice='not a price')),
+        "2024-06-18 07:03:53.751 [INFO] Received data: {\"data\": {\"orderState\": \"NEW\", broken\n",
+        "a line without a record\n",
+    ]
+    for i in range(2, 400):
+        lines.append(log_line(order_record(i)))
+        lines.append(log_line(order_record(i, 'FILLED')))
+        if i % 50 == 0:
+            # A repeated NEW record far from the first one, usually in another byte range
+            lines.append(log_line(order_record(i - 40, 'OPEN', limitPrice='1')))
+    lines.append(log_line(order_record(0)))
+    lines.append(log_line(order_record(1)))
+    path = tmp_path / 'Orders.log'
+    path.write_text(''.join(lines))
+    return str(path)
+
+@pytest.fixture
+def trades_log(tmp_path):
+    lines = [log_line(trade_record(i)) for i in range(300)]
+    lines.insert(10, log_line(trade_record(1000, quantity='not a quantity')))
+    lines.insert(20, "2024-06-18 07:03:53.751 [INFO] Received data: {\"data\": broken\n")
+    path = tmp_path / 'Trades.log'
+    path.write_text(''.join(lines))
+    return str(path)
+
+@pytest.mark.parametrize('workers', [1, 2, 4])
+def test_parallel_orders_match_sequential(orders_log, workers):
+    expected = db_manager.parse_orders_log(orders_log)
+    orders, unique_strategy_ids = db_manager.parse_orders_log_parallel(orders_log, workers=workers, ranges_per_worker=8)
+    assert orders == expected[0]
+    assert list(unique_strategy_ids.items()) == list(expected[1].items())
+
+def test_orders_fixture_covers_edge_cases(orders_log):
+    orders, unique_strategy_ids = db_manager.parse_orders_log(orders_log)
+    order_ids = [order[0] for order in orders]
+    assert 'order-0' not in order_ids
+    assert 'order-1' not in order_ids
+    assert len(order_ids) == len(set(order_ids)) == 398
+    assert all(order[3] != 1.0 for order in orders)
+    assert '' not in unique_strategy_ids
+
+@pytest.mark.parametrize('workers', [1, 2, 4])
+def test_parallel_trades_match_sequential(trades_log, workers):
+    expected = db_manager.parse_trades_log(trades_log)
+    trades, unique_strategy_ids = db_manager.parse_trades_log_parallel(trades_log, workers=workers, ranges_per_worker=8)
+    assert trades == expected[0]
+    assert list(unique_strategy_ids.items()) == list(expected[1].items())
@@ -0,0 +1,209 @@
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pytest
+
+import pnl_engine
+
+def reference_strategy_pnl(strategies: Sequence[Tuple], trades: Sequence[Tuple],
+                           latest_prices: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
+    """
+    The original pure-Python PnL loop from the dashboard, kept as the oracle for compute_strategy_pnl.
+
+    Takes the same arguments and returns the same structure as compute_strategy_pnl.
+    """
+    strategy_ids = [s[0] for s in strategies]
+
+    # Calculate PnL for each strategy over time
+    strategy_data = {}
+
+    for strategy_id in strategy_ids:
+        strategy_trades = [t for t in trades if t[0] == strategy_id]
+
+        if not strategy_trades:
+            continue
+
+        # Get the symbol for this strategy
+        symbol = next((s[1] for s in strategies if s[0] == strategy_id), None)
+        if not symbol:
+            continue
+
+        # Initialize PnL tracking
+        times = []
+        pnls = []
+        cumulative_pnl = 0
+        position = 0
+        avg_entry_price = 0
+
+        for trade in strategy_trades:
+            _, time, side, price, qty, volume = trade
+
+            # Update position and calculate realized PnL
+            if side == 'buy':
+                # If we're adding to position
+                if position >= 0:
+                    # Update average entry price
+                    total_cost = position * avg_entry_price + volume
+                    position += qty
+                    avg_entry_price = total_cost / position if position > 0 else 0
+                else:
+                    # We're covering a short position
+                    realized_pnl = (avg_entry_price - price) * min(abs(position), qty)
+                    cumulative_pnl += realized_pnl
+
+                    # Update position
+                    position += qty
+                    if position > 0:
+                        # We've flipped to long, reset avg price for remaining qty
+                        avg_entry_price = price
+                    elif position < 0:
+                        # Still short, avg price stays the same
+                        pass
+                    else:
+                        # Flat position
+                        avg_entry_price = 0
+            else:  # side == 'sell'
+                # If we're adding to short position
+                if position <= 0:
+                    # Update average entry price for short
+                    total_cost = abs(position) * avg_entry_price + volume
+                    position -= qty
+                    avg_entry_price = total_cost / abs(position) if position < 0 else 0
+                else:
+                    # We're selling a long position
+                    realized_pnl = (price - avg_entry_price) * min(position, qty)
+                    cumulative_pnl += realized_pnl
+
+                    # Update position
+                    position -= qty
+                    if position < 0:
+                        # We've flipped to short, reset avg price for remaining qty
+                        avg_entry_price = price
+                    elif position > 0:
+                        # Still long, avg price stays the same
+                        pass
+                    else:
+                        # Flat position
+                        avg_entry_price = 0
+
+            # Calculate unrealized PnL for current position
+            unrealized_pnl = 0
+            if position != 0 and symbol in latest_prices:
+                latest_price = latest_prices[symbol]
+                if position > 0:
+                    unrealized_pnl = (latest_price - avg_entry_price) * position
+                else:
+                    unrealized_pnl = (avg_entry_price - latest_price) * abs(position)
+
+            # Total PnL = realized + unrealized
+            total_pnl = cumulative_pnl + unrealized_pnl
+
+            times.append(time)
+            pnls.append(total_pnl)
+
+        strategy_data[strategy_id] = {
+            'times': times,
+            'pnls': pnls,
+            'final_pnl': pnls[-1] if pnls else 0
+        }
+
+    return strategy_data
+
+def generate_test_trades(num_trades: int, num_strategies: int = 6, seed: int = 11) -> Tuple[List[Tuple], List[Tuple], Dict[str, float]]:
+    """
+    Generate random (strategies, trades, latest_prices) with frequent position flips.
+
+    Quantities are drawn so buys and sells often cross through flat, and some trades
+    share a timestamp, to exercise every branch of the position logic.
+    """
+    rng = random.Random(seed)
+    symbols = ['BINANCE_PERP_BTC_USDT', 'BINANCE_PERP_ETH_USDT', 'BINANCE_PERP_SOL_USDT']
+    strategies = [(f"STRATEGY_{i}", symbols[i % len(symbols)], 'neutral') for i in range(num_strategies)]
+    # One strategy without trades and one without a symbol mirror the gaps the reference skips
+    strategies.append(('STRATEGY_IDLE', symbols[0], 'neutral'))
+    strategies.append(('STRATEGY_NO_SYMBOL', '', 'neutral'))
+
+    start = datetime(2024, 6, 18)
+    trades = []
+    for i in range(num_trades):
+        strategy_id = rng.choice(strategies[:num_strategies] + [strategies[-1]])[0]
+        price = round(rng.uniform(50, 150), 2)
+        qty = rng.choice([0.5, 1.0, 1.5, 2.0, rng.uniform(0.1, 3.0)])
+        trades.append((strategy_id, start + timedelta(seconds=i // 3), rng.choice(['buy', 'sell']),
+                       price, qty, price * qty))
+
+    # Trades come out of the database ordered by (strategy_id, time)
+    trades.sort(key=lambda trade: (trade[0], trade[1]))
+    latest_prices = {symbol: round(rng.uniform(50, 150), 2) for symbol in symbols[:2]}
+    return strategies, trades, latest_prices
+
+def to_decimal(strategies: List[Tuple], trades: List[Tuple], latest_prices: Dict[str, float]):
+    """Convert every price, quantity and volume to Decimal, as a NUMERIC column would return them"""
+    decimal_trades = [(strategy_id, time, side, Decimal(repr(price)), Decimal(repr(qty)), Decimal(repr(volume)))
+                      for strategy_id, time, side, price, qty, volume in trades]
+    decimal_prices = {symbol: Decimal(repr(price)) for symbol, price in latest_prices.items()}
+    return strategies, decimal_trades, decimal_prices
+
+def assert_same_pnl(actual: Dict[str, Dict[str, Any]], expected: Dict[str, Dict[str, Any]], approx: bool = False):
+    """Check two PnL results cover the same strategies with the same curves"""
+    assert list(actual) == list(expected)
+    for strategy_id, data in expected.items():
+        assert actual[strategy_id]['times'] == data['times'], strategy_id
+        if approx:
+            assert actual[strategy_id]['pnls'] == pytest.approx([float(pnl) for pnl in data['pnls']], rel=1e-9, abs=1e-6), strategy_id
+            assert actual[strategy_id]['final_pnl'] == pytest.approx(float(data['final_pnl']), rel=1e-9, abs=1e-6), strategy_id
+        else:
+            assert actual[strategy_id]['pnls'] == data['pnls'], strategy_id
+            assert actual[strategy_id]['final_pnl'] == data['final_pnl'], strategy_id
+
+def test_matches_reference():
+    strategies, trades, latest_prices = generate_test_trades(20000, num_strategies=20)
+    assert_same_pnl(pnl_engine.compute_strategy_pnl(strategies, trades, latest_prices),
+                    reference_strategy_pnl(strategies, trades, latest_prices))
+
+def test_matches_reference_on_decimal_inputs():
+    strategies, trades, latest_prices = to_decimal(*generate_test_trades(5000, num_strategies=10))
+    assert_same_pnl(pnl_engine.compute_strategy_pnl(strategies, trades, latest_prices),
+                    reference_strategy_pnl(strategies, trades, latest_prices), approx=True)
+
+def test_decimal_inputs_match_float_inputs():
+    float_inputs = generate_test_trades(5000, num_strategies=10)
+    assert_same_pnl(pnl_engine.compute_strategy_pnl(*to_decimal(*float_inputs)),
+                    pnl_engine.compute_strategy_pnl(*float_inputs))
+
+def test_skips_strategies_without_trades_or_symbol():
+    strategies, trades, latest_prices = generate_test_trades(1000)
+    result = pnl_engine.compute_strategy_pnl(strategies, trades, latest_prices)
+    assert 'STRATEGY_IDLE' not in result
+    assert 'STRATEGY_NO_SYMBOL' not in result
+    assert pnl_engine.compute_strategy_pnl(strategies, [], latest_prices) == {}
+
+def test_unpriced_symbol_counts_realized_pnl_only():
+    strategies = [('STRATEGY_0', 'BINANCE_PERP_BTC_USDT', 'neutral')]
+    start = datetime(2024, 6, 18)
+    trades = [('STRATEGY_0', start, 'buy', 100.0, 2.0, 200.0),
+              ('STRATEGY_0', start + timedelta(seconds=1), 'sell', 110.0, 1.0, 110.0)]
+    result = pnl_engine.compute_strategy_pnl(strategies, trades, {})
+    assert result['STRATEGY_0']['pnls'] == [0.0, 10.0]
+    assert result == reference_strategy_pnl(strategies, trades, {})
+
+def test_replay_resumes_from_saved_state():
+    # update_strategy_pnl_state replays only new trades, starting from the saved position
+    _, trades, _ = generate_test_trades(2000, num_strategies=1)
+    trades = [trade for trade in trades if trade[0] == 'STRATEGY_0']
+    is_buy = np.array([trade[2] == 'buy' for trade in trades])
+    prices, qtys, volumes = (np.array([trade[i] for trade in trades], dtype=float) for i in (3, 4, 5))
+
+    positions, avg_entry_prices, realized = pnl_engine.replay_positions(is_buy, prices, qtys, volumes)
+
+    split = len(trades) // 2
+    head = pnl_engine.replay_positions(is_buy[:split], prices[:split], qtys[:split], volumes[:split])
+    tail = pnl_engine.replay_positions(is_buy[split:], prices[split:], qtys[split:], volumes[split:],
+                                       position=head[0][-1].item(), avg_entry_price=head[1][-1].item())
+
+    assert np.concatenate((head[0], tail[0])).tolist() == positions.tolist()
+    assert np.concatenate((head[1], tail[1])).tolist() == avg_entry_prices.tolist()
+    assert np.concatenate((head[2], tail[2])).tolist() == realized.tolist()
@@ -0,0 +1,24 @@
+# Production entry point, loaded once by the gunicorn master (see gunicorn.conf.py):
+#     gunicorn -c gunicorn.conf.py wsgi:application
+# Everything imported or warmed up here is shared copy-on-write by the forked workers.
+import io
+
+from matplotlib.figure import Figure
+
+from server import app, db_manager
+
+def warm_up():
+    """Load the Agg renderer, font cache and PNG writer before forking, so workers don't each pay for it"""
+    fig = Figure(figsize=(1, 1))
+    ax = fig.subplots()
+    ax.plot([0, 1], [0, 1], label='warm-up')
+    ax.set_title('warm-up')
+    fig.savefig(io.BytesIO(), format='png')
+
+def post_fork():
+    """Per-worker setup after the fork: drop anything that must not be shared with the master"""
+    db_manager.reset_after_fork()
+
+warm_up()
+
+application = app